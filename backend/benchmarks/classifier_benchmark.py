@@ -0,0 +1,120 @@
+"""Micro-benchmark for the precompiled review classifier.
+
+Compares ReviewClassifier against the original per-call heuristics on the
+posts of a WordPress export, after checking both produce identical results.
+
+    cd backend && python -m benchmarks.classifier_benchmark [export.xml] [--repeat N]
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from review_classifier import review_classifier
+from wordpress_migration import WordPressMigrator
+
+DEFAULT_EXPORT = Path(__file__).resolve().parent.parent.parent / 'wordpress_export.xml'
+
+# Original implementations, kept as the reference for correctness and speed
+def legacy_is_movie_review(title: str, content: str) -> bool:
+    movie_keywords = [
+        'movie', 'film', 'review', 'cinema', 'bollywood',
+        'hollywood', 'director', 'actor', 'actress', 'cast',
+        'screenplay', 'plot', 'story', 'thriller', 'drama',
+        'comedy', 'action', 'rating', 'oscar', 'box office'
+    ]
+    text = (title + ' ' + content).lower()
+    keyword_count = sum(1 for keyword in movie_keywords if keyword in text)
+    return keyword_count >= 3
+
+def legacy_extract_rating(content: str) -> Optional[float]:
+    rating_patterns = [
+        r'(\d(?:\.\d)?)/5',
+        r'rating:?\s*(\d(?:\.\d)?)',
+        r'(\d(?:\.\d)?)\s*out\s*of\s*5',
+        r'(\d(?:\.\d)?)\s*stars?'
+    ]
+    for pattern in rating_patterns:
+        match = re.search(pattern, content.lower())
+        if match:
+            try:
+                return min(float(match.group(1)), 5.0)
+            except ValueError:
+                continue
+    return None
+
+def legacy_extract_movie_name(title: str) -> Optional[str]:
+    patterns_to_remove = [
+        r'\s+review.*$',
+        r'\s+movie.*$',
+        r'\s+film.*$',
+        r'^.*review:?\s*',
+        r'\s+the\s+movie.*$',
+        r'\s*-\s*my\s+review.*$',
+        r'\s*\.\.\.*$'
+    ]
+    movie_name = title.lower()
+    for pattern in patterns_to_remove:
+        movie_name = re.sub(pattern, '', movie_name, flags=re.IGNORECASE)
+    movie_name = movie_name.strip()
+    movie_name = re.sub(r'^(a|an|the)\s+', '', movie_name)
+    return movie_name if movie_name else None
+
+def legacy_classify(title: str, content: str) -> Dict:
+    return {
+        'is_movie_review': legacy_is_movie_review(title, content),
+        'rating': legacy_extract_rating(content),
+        'movie_name': legacy_extract_movie_name(title)
+    }
+
+def load_posts(xml_file_path: str) -> List[Tuple[str, str]]:
+    """Load cleaned (title, content) pairs for every post in an export"""
+    migrator = WordPressMigrator()
+    return [
+        (item['title'], migrator.clean_content(item['content_html']))
+        for item in migrator.iter_export_items(xml_file_path)
+    ]
+
+def time_it(func, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the review classifier")
+    parser.add_argument('export', nargs='?', default=str(DEFAULT_EXPORT))
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    posts = load_posts(args.export)
+    if not posts:
+        print("No posts found in export")
+        return 1
+
+    # Results must match the original heuristics exactly
+    expected = [legacy_classify(title, content) for title, content in posts]
+    actual = review_classifier.classify_batch(posts)
+    mismatches = [i for i, (a, b) in enumerate(zip(expected, actual)) if a != b]
+    if mismatches:
+        print(f"Classifier disagrees with the original heuristics on {len(mismatches)} posts")
+        for index in mismatches[:10]:
+            print(f"  {posts[index][0]!r}: {expected[index]} != {actual[index]}")
+        return 1
+
+    legacy_seconds = time_it(lambda: [legacy_classify(t, c) for t, c in posts], args.repeat)
+    batch_seconds = time_it(lambda: review_classifier.classify_batch(posts), args.repeat)
+
+    documents = len(posts) * args.repeat
+    print(f"Posts: {len(posts)} x {args.repeat} repeats, results identical")
+    print(f"Original heuristics:  {documents / legacy_seconds:10.0f} posts/sec")
+    print(f"Precompiled batch:    {documents / batch_seconds:10.0f} posts/sec")
+    print(f"Speedup: {legacy_seconds / batch_seconds:.2f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
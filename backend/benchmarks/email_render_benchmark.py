@@ -0,0 +1,118 @@
+"""Welcome email render throughput under a signup burst.
+
+Compares the original per-call inline jinja2.Template against the shared
+Environment (compiled once) and the pre-rendered per-recipient path, with
+the burst spread over a thread pool the way BackgroundTasks runs them.
+
+    cd backend && python -m benchmarks.email_render_benchmark --signups 20000 --threads 8
+"""
+import argparse
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jinja2 import Template
+
+from services.email_templates import EmailTemplates
+
+# Original inline template, compiled on every send_welcome_email call
+LEGACY_WELCOME = """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <style>
+                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+                .header { background: linear-gradient(135deg, #f97316, #dc2626); color: white; padding: 20px; text-align: center; }
+                .content { padding: 20px; }
+                .footer { background: #f8f9fa; padding: 15px; text-align: center; font-size: 12px; color: #666; }
+                .btn { display: inline-block; background: #f97316; color: white; padding: 12px 24px; text-decoration: none; border-radius: 5px; margin: 10px 0; }
+            </style>
+        </head>
+        <body>
+            <div class="header">
+                <h1>🎭 Filmwalla.com</h1>
+                <p>Your Gateway to Indian Entertainment</p>
+            </div>
+            <div class="content">
+                <h2>Welcome{% if name %} {{ name }}{% endif %}! 🙏</h2>
+                <p>Thank you for subscribing to <strong>Filmwalla.com</strong> - your premier destination for Indian cinema reviews and entertainment news.</p>
+                <h3>What to Expect:</h3>
+                <ul>
+                    <li>📧 Weekly digest of top movie reviews</li>
+                    <li>🎬 Latest Bollywood, South Indian, and International cinema coverage</li>
+                    <li>🌟 Expert reviews in Hindi and English</li>
+                    <li>🔥 Breaking entertainment news and updates</li>
+                </ul>
+                <p>Visit our website to explore the latest reviews and discover your next favorite film!</p>
+                <a href="https://filmwallaa.com" class="btn">Visit Website</a>
+                <p><strong>Follow us:</strong> Stay connected for the latest updates!</p>
+            </div>
+            <div class="footer">
+                <p>© 2025 Filmwalla.com | FILMWALLAA.COM</p>
+                <p>You're receiving this because you subscribed to our updates.</p>
+                <p><a href="{{ unsubscribe_url }}">Unsubscribe</a> | <a href="https://filmwallaa.com">Visit Website</a></p>
+            </div>
+        </body>
+        </html>
+        """
+
+def signups(count: int) -> List[Tuple[str, str]]:
+    # A third of quick-subscribe signups leave the name empty
+    return [
+        (None if i % 3 == 0 else f"Subscriber {i}", f"https://filmwallaa.com/unsubscribe?email=user{i}%40example.com")
+        for i in range(count)
+    ]
+
+def legacy_render(name: str, unsubscribe_url: str) -> str:
+    return Template(LEGACY_WELCOME).render(name=name, unsubscribe_url=unsubscribe_url)
+
+def measure(label: str, render: Callable, burst: List[Tuple[str, str]], threads: int) -> float:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda signup: render(*signup), burst))
+    elapsed = time.perf_counter() - started
+    rate = len(burst) / elapsed
+    print(f"{label:<28} {len(burst):>7} renders {elapsed:>8.3f}s {rate:>12.0f} renders/sec")
+    return rate
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark welcome email rendering")
+    parser.add_argument('--signups', type=int, default=20000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    # Startup cost with a cold and a warm bytecode cache
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for label in ('cold bytecode cache', 'warm bytecode cache'):
+            started = time.perf_counter()
+            templates = EmailTemplates(cache_dir=cache_dir)
+            templates.render_welcome('First', 'https://filmwallaa.com/unsubscribe')
+            templates.render('weekly_digest.html', reviews=[], date='', name='', unsubscribe_url='')
+            print(f"Startup + first renders, {label}: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    burst = signups(args.signups)
+    legacy_burst = burst[:max(1, args.signups // 20)]  # recompiling is slow; a sample is enough
+
+    print()
+    legacy = measure('inline Template per call', legacy_render, legacy_burst, args.threads)
+    environment = measure(
+        'shared Environment',
+        lambda name, url: (
+            templates.render('welcome.html', name=name, unsubscribe_url=url),
+            templates.render('welcome.txt', name=name, unsubscribe_url=url)
+        ),
+        burst,
+        args.threads
+    )
+    fast = measure('pre-rendered fast path', templates.render_welcome, burst, args.threads)
+
+    print(f"\nShared Environment: {environment / legacy:.1f}x, fast path: {fast / legacy:.1f}x the inline Template rate")
+    print("(the Environment and fast paths also render the plain text part)")
+
+if __name__ == "__main__":
+    main()
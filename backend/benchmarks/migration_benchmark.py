@@ -0,0 +1,254 @@
+"""Stage-by-stage benchmark of the WordPress migration pipeline.
+
+For each export size a synthetic WXR file is generated (and cached in the
+work directory), then every pipeline stage is measured in a fresh child
+process that runs the pipeline up to and including that stage:
+
+    parse     streaming iterparse of <item> elements (and attachment index)
+    clean     HTML to plain text
+    classify  movie review heuristics and post document assembly
+    dedupe    MinHash near-duplicate clustering
+    map       local title index + fake in-process TMDB
+    save      chunked bulk upserts (only with --mongo-url)
+
+Wall time, items/sec and the child's peak RSS are written to JSON so runs
+from different versions can be compared.
+
+    cd backend && python -m benchmarks.migration_benchmark --sizes 1000,10000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from benchmarks.wxr_generator import generate_catalog, generate_export
+from movie_matcher import normalize_title
+
+STAGES = ['parse', 'clean', 'classify', 'dedupe', 'map', 'save']
+BENCHMARK_DB = 'filmwalla_benchmark'
+
+class FakeTMDB:
+    """In-process stand-in for tmdb_service.search_movies over the generated catalog"""
+
+    def __init__(self, catalog: List[Dict], latency_ms: float = 0):
+        self.latency = latency_ms / 1000
+        self.movies = []
+        self.token_index = {}
+        for movie in catalog:
+            index = len(self.movies)
+            self.movies.append({
+                'tmdb_id': movie['tmdb_id'],
+                'title': movie['title'],
+                'original_title': movie['title'],
+                'title_hindi': movie['title_hindi'],
+                'year': movie['year'],
+                'rating': 3.5,
+                'genre': [],
+                'language': 'hi',
+                'poster': f"https://image.tmdb.org/t/p/w500/{movie['tmdb_id']}.jpg",
+                'backdrop': '',
+                'synopsis': '',
+                'director': 'Unknown',
+                'cast': [],
+                'trailer_url': None,
+                'industry': 'Bollywood'
+            })
+            for token in normalize_title(movie['title']).split():
+                self.token_index.setdefault(token, []).append(index)
+
+    def search_movies(self, query: str, language: str = "en-US") -> List[Dict]:
+        if self.latency:
+            time.sleep(self.latency)
+        hits = {}
+        for token in normalize_title(query).split():
+            for index in self.token_index.get(token, ()):
+                hits[index] = hits.get(index, 0) + 1
+        ranked = sorted(hits, key=hits.get, reverse=True)[:20]
+        return [dict(self.movies[index]) for index in ranked]
+
+async def run_stage(args) -> Dict:
+    """Run the pipeline up to args.run_stage and time every stage on the way"""
+    from review_classifier import review_classifier
+    from wordpress_migration import WordPressMigrator
+
+    # Per-post INFO logging would dominate the measurement
+    logging.disable(logging.INFO)
+
+    stop = STAGES.index(args.run_stage)
+    catalog = generate_catalog(max(200, args.posts // 5), args.seed)
+    migrator = WordPressMigrator(tmdb=FakeTMDB(catalog, args.tmdb_latency_ms))
+    timings = {stage: 0.0 for stage in STAGES[:stop + 1]}
+    counts = {stage: 0 for stage in STAGES[:stop + 1]}
+
+    async def records():
+        items = iter(migrator.iter_export_items(args.export))
+        while True:
+            started = time.perf_counter()
+            item = next(items, None)
+            timings['parse'] += time.perf_counter() - started
+            if item is None:
+                return
+            counts['parse'] += 1
+            if stop < STAGES.index('clean'):
+                continue
+
+            started = time.perf_counter()
+            content = migrator.clean_content(item['content_html'])
+            timings['clean'] += time.perf_counter() - started
+            counts['clean'] += 1
+            if stop < STAGES.index('classify'):
+                continue
+
+            started = time.perf_counter()
+            classification = review_classifier.classify(item['title'], content)
+            post = None
+            if classification['is_movie_review']:
+                post = migrator.assemble_post(item, content, classification)
+            timings['classify'] += time.perf_counter() - started
+            counts['classify'] += 1
+            if post is None or stop < STAGES.index('dedupe'):
+                continue
+
+            started = time.perf_counter()
+            migrator.duplicate_detector.assign(post)
+            timings['dedupe'] += time.perf_counter() - started
+            counts['dedupe'] += 1
+            if stop < STAGES.index('map'):
+                continue
+
+            started = time.perf_counter()
+            mapping, failure = await migrator.map_post(post)
+            timings['map'] += time.perf_counter() - started
+            counts['map'] += 1
+            if stop < STAGES.index('save'):
+                continue
+
+            yield post, mapping, failure
+
+    if args.run_stage == 'save':
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        os.environ['MONGO_URL'] = args.mongo_url
+        os.environ['DB_NAME'] = BENCHMARK_DB
+        client = AsyncIOMotorClient(args.mongo_url)
+        await client.drop_database(BENCHMARK_DB)
+        client.close()
+
+        started = time.perf_counter()
+        await migrator.save_to_database(records())
+        upstream = sum(seconds for stage, seconds in timings.items() if stage != 'save')
+        timings['save'] = time.perf_counter() - started - upstream
+        counts['save'] = migrator.stats['saved_documents']
+    else:
+        async for _ in records():
+            pass
+
+    return {
+        'stage': args.run_stage,
+        'wall_seconds': round(timings[args.run_stage], 4),
+        'items': counts[args.run_stage],
+        'items_per_second': round(counts[args.run_stage] / timings[args.run_stage], 1) if timings[args.run_stage] else 0,
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'tmdb_lookups': migrator.stats['tmdb_lookups'],
+        'local_matches': migrator.stats['local_matches'],
+        'duplicates': migrator.stats['duplicates']
+    }
+
+def measure_stage(stage: str, export: Path, posts: int, args) -> Dict:
+    """Measure one stage in a fresh process so peak RSS is per stage"""
+    command = [
+        sys.executable, '-m', 'benchmarks.migration_benchmark',
+        '--run-stage', stage,
+        '--export', str(export),
+        '--posts', str(posts),
+        '--seed', str(args.seed),
+        '--tmdb-latency-ms', str(args.tmdb_latency_ms)
+    ]
+    if args.mongo_url:
+        command += ['--mongo-url', args.mongo_url]
+    completed = subprocess.run(command, cwd=BACKEND_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Stage {stage} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the WordPress migration pipeline")
+    parser.add_argument('--sizes', default='1000,10000', help="Comma separated post counts, e.g. 1000,10000,100000,1000000")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--work-dir', default=os.path.join('/tmp', 'filmwalla-benchmarks'))
+    parser.add_argument('--output', help="JSON results path")
+    parser.add_argument('--mongo-url', help="Enables the save stage against this MongoDB")
+    parser.add_argument('--tmdb-latency-ms', type=float, default=0, help="Simulated latency per fake TMDB search")
+    parser.add_argument('--run-stage', choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument('--export', help=argparse.SUPPRESS)
+    parser.add_argument('--posts', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stage:
+        print(json.dumps(asyncio.run(run_stage(args))))
+        return
+
+    work_dir = Path(args.work_dir)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    stages = STAGES if args.mongo_url else STAGES[:-1]
+    results = {}
+
+    for size in [int(size) for size in args.sizes.split(',')]:
+        export = work_dir / f"wxr_{size}_{args.seed}.xml"
+        generated = None
+        if not export.exists():
+            print(f"Generating {export} ...")
+            generated = generate_export(str(export), size, seed=args.seed)
+
+        results[size] = {
+            'export_mb': round(export.stat().st_size / 1024 / 1024, 1),
+            'generated': generated,
+            'stages': {}
+        }
+        for stage in stages:
+            result = measure_stage(stage, export, size, args)
+            results[size]['stages'][stage] = result
+            print(
+                f"{size:>9} posts  {stage:<9} {result['wall_seconds']:>9.2f}s "
+                f"{result['items_per_second']:>11.0f}/s  peak RSS {result['peak_rss_mb']:>7.1f} MB"
+            )
+
+    report = {
+        'created_at': datetime.utcnow().isoformat(),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'tmdb_latency_ms': args.tmdb_latency_ms,
+        'results': results
+    }
+    output = Path(args.output) if args.output else (
+        BACKEND_DIR / 'benchmarks' / 'results' / f"migration_{report['git_revision']}_{datetime.utcnow():%Y%m%d%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
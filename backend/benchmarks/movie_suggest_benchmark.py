@@ -0,0 +1,112 @@
+"""Movie typeahead latency over a large synthetic catalogue, on one core.
+
+Builds the in-process suggest index from `--movies` generated movies with
+romanized Hindi titles (a quarter also carrying a Devanagari title) and
+replays typing: each session picks a title by popularity and sends every
+prefix of it, one keystroke at a time, in romanized or Devanagari script.
+Every `--add-every` keystrokes a newly cached movie is added, which also
+throws away the memoized rankings. Reports build time, keys and
+p50/p99 lookup latency.
+
+    cd backend && python -m benchmarks.movie_suggest_benchmark --movies 100000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.movie_suggest import MovieSuggestIndex
+
+SYLLABLES = (
+    "ka kha ga cha ja ta da na pa ba bha ma ya ra la va sha sa ha ki ku ke ko ri ru re ro li lu le lo "
+    "mi mu me mo ni nu ne no di du de do si su se so"
+).split()
+DEVANAGARI = {
+    'ka': 'क', 'kha': 'ख', 'ga': 'ग', 'cha': 'च', 'ja': 'ज', 'ta': 'त', 'da': 'द', 'na': 'न', 'pa': 'प', 'ba': 'ब',
+    'bha': 'भ', 'ma': 'म', 'ya': 'य', 'ra': 'र', 'la': 'ल', 'va': 'व', 'sha': 'श', 'sa': 'स', 'ha': 'ह'
+}
+SIGNS = {'a': '', 'i': 'ि', 'u': 'ु', 'e': 'े', 'o': 'ो'}
+
+def devanagari(word: str) -> str:
+    """Script for a word made of SYLLABLES: consonant letter plus vowel sign"""
+    out = []
+    for index in range(0, len(word), 2):
+        syllable = word[index:index + 2]
+        out.append(DEVANAGARI[syllable[0] + 'a'] + SIGNS[syllable[1]])
+    return ''.join(out)
+
+def generate_movies(args, rng: random.Random):
+    # Two-letter syllables only, so every word has a Devanagari spelling
+    syllables = [syllable for syllable in SYLLABLES if len(syllable) == 2]
+    words = [''.join(rng.choice(syllables) for _ in range(rng.randint(1, 4))) for _ in range(args.vocabulary)]
+    movies = []
+    for i in range(args.movies):
+        title_words = rng.choices(words, k=rng.randint(1, 5))
+        movies.append({
+            '_id': f"movie-{i}",
+            'tmdb_id': i,
+            'title': ' '.join(word.capitalize() for word in title_words),
+            'original_title': ' '.join(title_words),
+            'title_hindi': ' '.join(devanagari(word) for word in title_words) if rng.random() < 0.25 else None,
+            'year': rng.randint(1960, 2025),
+            'rating': round(rng.uniform(1, 5), 1),
+            'popularity': rng.paretovariate(1.2),
+            'vote_count': rng.randint(0, 20000)
+        })
+    return movies
+
+def percentile(values, share):
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the movie typeahead index")
+    parser.add_argument('--movies', type=int, default=100000)
+    parser.add_argument('--vocabulary', type=int, default=20000)
+    parser.add_argument('--sessions', type=int, default=2000, help="Titles typed keystroke by keystroke")
+    parser.add_argument('--devanagari-share', type=float, default=0.2, help="Share of sessions typed in Devanagari")
+    parser.add_argument('--add-every', type=int, default=200, help="Keystrokes between newly cached movies (0 to disable)")
+    parser.add_argument('--seed', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    movies = generate_movies(args, rng)
+
+    index = MovieSuggestIndex()
+    started = time.perf_counter()
+    index.add_many(movies)
+    build = time.perf_counter() - started
+    print(f"Indexed {len(index)} movies in {build:.1f}s: {len(index.entries)} keys")
+
+    # Popular movies get typed more often
+    by_popularity = sorted(movies, key=lambda movie: -movie['popularity'])
+    weights = [1 / (rank + 1) for rank in range(len(by_popularity))]
+    typed = rng.choices(by_popularity, weights=weights, k=args.sessions)
+
+    latencies = []
+    found = 0
+    added = 0
+    for movie in typed:
+        title = movie['title']
+        if movie['title_hindi'] and rng.random() < args.devanagari_share * 4:
+            title = movie['title_hindi']
+        for length in range(1, len(title) + 1):
+            if args.add_every and len(latencies) % args.add_every == 0:
+                added += 1
+                extra = dict(rng.choice(movies), tmdb_id=args.movies + added, _id=f"new-{added}")
+                index.add(extra)
+            started = time.perf_counter()
+            suggestions = index.suggest(title[:length])
+            latencies.append(time.perf_counter() - started)
+        found += any(suggestion['tmdb_id'] == movie['tmdb_id'] for suggestion in suggestions)
+
+    latencies.sort()
+    print(f"{len(latencies)} keystrokes over {args.sessions} titles, {added} movies added meanwhile: "
+          f"p50 {percentile(latencies, 0.5) * 1000:.3f}ms, p95 {percentile(latencies, 0.95) * 1000:.3f}ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.3f}ms, max {latencies[-1] * 1000:.2f}ms, "
+          f"typed title suggested by the last keystroke {found / len(typed):.1%}")
+
+if __name__ == "__main__":
+    main()
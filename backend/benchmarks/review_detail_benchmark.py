@@ -0,0 +1,161 @@
+"""Review detail reads with and without the review cache.
+
+Requests follow a Zipf distribution over the published reviews, mixed with
+crawler requests for ids that do not exist. The database lookup is simulated
+by a fixed latency followed by the real render (pydantic model to JSON
+bytes) of a review with a full-length body. Each run reports
+requests/sec, p50/p99 latency, cache hit rate and how many loads reached the
+database, for the uncached path and for `--workers` caches side by side.
+
+    cd backend && python -m benchmarks.review_detail_benchmark --requests 50000
+
+With --mongo-url the workers also share the MongoDB tier (in a throwaway
+database), so a review rendered by one worker is a shared hit for the others:
+
+    cd backend && python -m benchmarks.review_detail_benchmark --mongo-url mongodb://localhost:27017
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models import EditorialReviewResponse
+from services.review_cache import ReviewCache
+
+class FakeReviewSource:
+    """Published reviews behind a simulated database round trip"""
+
+    def __init__(self, reviews: int, latency_ms: float):
+        self.latency = latency_ms / 1000
+        self.loads = 0
+        paragraph = "A sweeping, heartfelt drama that rewards patience with a devastating final act. " * 12
+        self.reviews = {
+            f"review-{i}": {
+                'id': f"review-{i}",
+                'movie_id': str(1000 + i),
+                'title': f"Review {i}: A Film Worth Watching",
+                'title_hindi': "एक देखने लायक फ़िल्म",
+                'author': "Priya Sharma",
+                'content': "\n\n".join([paragraph] * 8),
+                'excerpt': paragraph[:200],
+                'rating': 4.0,
+                'tags': ["Bollywood", "Drama"],
+                'read_time': "8 min read",
+                'image': "https://images.unsplash.com/photo-1489599735429-c1fdf66d61e1?w=800&h=400&fit=crop",
+                'status': 'published',
+                'featured': False,
+                'created_at': datetime(2024, 1, 1),
+                'published_at': datetime(2024, 1, 2)
+            }
+            for i in range(reviews)
+        }
+
+    async def render(self, review_id: str):
+        self.loads += 1
+        await asyncio.sleep(self.latency)
+        review = self.reviews.get(review_id)
+        if review is None:
+            return None
+        return EditorialReviewResponse(**review).model_dump_json().encode()
+
+def workload(args):
+    rng = random.Random(args.seed)
+    ids = list(range(args.reviews))
+    weights = [1 / (rank + 1) ** args.zipf for rank in ids]
+    popular = rng.choices(ids, weights=weights, k=args.requests)
+    requests = []
+    for rank in popular:
+        if rng.random() < args.crawler_share:
+            # Crawlers walk a large space of dead links, revisiting some of them
+            requests.append(f"wp-{rng.randrange(args.dead_links)}")
+        else:
+            requests.append(f"review-{rank}")
+    return requests
+
+async def run(label: str, args, requests, get, invalidate=None):
+    latencies = []
+    slots = asyncio.Semaphore(args.concurrency)
+    rng = random.Random(args.seed + 1)
+
+    async def one(i, review_id):
+        async with slots:
+            if invalidate and args.edit_every and i % args.edit_every == 0:
+                # An editor touches a popular review
+                await invalidate(f"review-{rng.randrange(min(20, args.reviews))}")
+            started = time.perf_counter()
+            await get(i, review_id)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i, review_id) for i, review_id in enumerate(requests)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(f"{label:<22} {len(requests) / elapsed:>8.0f} req/s   p50 {latencies[len(latencies) // 2] * 1000:6.2f}ms   "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:6.2f}ms", end='')
+
+async def main_async(args):
+    requests = workload(args)
+    print(f"{args.requests} requests over {args.reviews} reviews (zipf {args.zipf}), "
+          f"{args.crawler_share:.0%} crawler 404s, {args.latency_ms}ms lookups, {args.concurrency} concurrent\n")
+
+    source = FakeReviewSource(args.reviews, args.latency_ms)
+    await run('uncached', args, requests, lambda i, review_id: source.render(review_id))
+    print(f"   database loads {source.loads}")
+
+    client = None
+    db = None
+    if args.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(args.mongo_url)
+        db = client['filmwalla_bench_review_cache']
+    try:
+        source = FakeReviewSource(args.reviews, args.latency_ms)
+        caches = [
+            ReviewCache(max_entries=args.cache_size, ttl=args.ttl, shared=db is not None)
+            for _ in range(args.workers)
+        ]
+        if db is not None:
+            await caches[0].ensure_indexes(db)
+
+        async def cached_get(i, review_id):
+            cache = caches[i % len(caches)]  # round-robin across workers, like a load balancer
+            await cache.get(db, review_id, lambda: source.render(review_id))
+
+        async def invalidate(review_id):
+            for cache in caches:
+                await cache.invalidate(db, [review_id])
+
+        label = f"cached x{args.workers}" + (" +shared" if db is not None else "")
+        await run(label, args, requests, cached_get, invalidate)
+        hits = {tier: sum(cache.hits[tier] for cache in caches) for tier in caches[0].hits}
+        lookups = sum(hits.values()) + sum(cache.loads for cache in caches)
+        print(f"   database loads {source.loads}, hit rate {sum(hits.values()) / lookups:.1%} {hits}")
+    finally:
+        if client is not None:
+            await client.drop_database('filmwalla_bench_review_cache')
+            client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the review detail cache")
+    parser.add_argument('--requests', type=int, default=50000)
+    parser.add_argument('--reviews', type=int, default=3000)
+    parser.add_argument('--zipf', type=float, default=1.1, help="Popularity skew of review requests")
+    parser.add_argument('--crawler-share', type=float, default=0.15, help="Share of requests for ids that do not exist")
+    parser.add_argument('--dead-links', type=int, default=2000, help="Distinct ids crawlers ask for")
+    parser.add_argument('--latency-ms', type=float, default=2.0, help="Simulated database lookup latency")
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=4, help="API workers, each with its own local cache")
+    parser.add_argument('--cache-size', type=int, default=5000)
+    parser.add_argument('--ttl', type=float, default=30)
+    parser.add_argument('--edit-every', type=int, default=5000, help="Invalidate a popular review every N requests (0 to disable)")
+    parser.add_argument('--mongo-url', help="Share a MongoDB tier between the workers")
+    parser.add_argument('--seed', type=int, default=11)
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Review search latency over a large synthetic corpus, on one core.
+
+Builds the in-process index from `--reviews` generated reviews, mixing
+English and Devanagari words with a Zipf word distribution so common terms
+have long postings, then runs one- to three-word queries drawn the same way
+and reports index build time, postings and p50/p95/p99 query latency.
+
+    cd backend && python -m benchmarks.review_search_benchmark --reviews 100000
+"""
+import argparse
+import random
+import resource
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.review_search import ReviewSearchIndex
+
+ENGLISH = (
+    "action drama thriller romance comedy performance direction screenplay music climax villain hero "
+    "heroine cinematography editing interval songs dance story plot twist family revenge friendship "
+    "folklore mythology politics village city police gangster cricket army spy biopic sequel remake "
+    "debut veteran superstar chemistry emotional gripping slow predictable brilliant stunning mediocre"
+).split()
+CONSONANTS = "क ख ग घ च छ ज झ ट ठ ड ढ त थ द ध न प फ ब भ म य र ल व श स ह".split()
+VOWEL_SIGNS = ["", "ा", "ि", "ी", "ु", "ू", "े", "ै", "ो", "ौ", "ं"]
+
+def vocabulary(size: int, rng: random.Random):
+    words = list(ENGLISH)
+    while len(words) < size:
+        if rng.random() < 0.5:
+            words.append(''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(4, 9))))
+        else:
+            words.append(''.join(rng.choice(CONSONANTS) + rng.choice(VOWEL_SIGNS) for _ in range(rng.randint(2, 4))))
+    return words
+
+class ZipfWords:
+    def __init__(self, words, skew: float, rng: random.Random):
+        self.words = words
+        self.rng = rng
+        self.cumulative = []
+        total = 0.0
+        for rank in range(len(words)):
+            total += 1 / (rank + 1) ** skew
+            self.cumulative.append(total)
+
+    def sample(self, count: int):
+        return self.rng.choices(self.words, cum_weights=self.cumulative, k=count)
+
+def generate_reviews(args, words: ZipfWords):
+    for i in range(args.reviews):
+        yield {
+            'id': f"review-{i}",
+            'movie_id': str(i),
+            'title': ' '.join(words.sample(4)),
+            'title_hindi': ' '.join(words.sample(3)),
+            'author': f"Critic {i % 40}",
+            'excerpt': ' '.join(words.sample(30)),
+            'content': ' '.join(words.sample(args.content_words)),
+            'tags': words.sample(3),
+            'rating': 4.0,
+            'status': 'published',
+            'published_at': datetime(2024, 1, 1)
+        }
+
+def percentile(values, share):
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the in-process review search index")
+    parser.add_argument('--reviews', type=int, default=100000)
+    parser.add_argument('--content-words', type=int, default=250, help="Words in each review body")
+    parser.add_argument('--vocabulary', type=int, default=50000)
+    parser.add_argument('--skew', type=float, default=1.0, help="Zipf skew of word frequencies")
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = ZipfWords(vocabulary(args.vocabulary, rng), args.skew, rng)
+
+    index = ReviewSearchIndex()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    build = 0.0
+    for review in generate_reviews(args, words):
+        started = time.perf_counter()
+        index.add(review)
+        build += time.perf_counter() - started
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    postings = sum(len(numbers) for numbers, _ in index.postings.values())
+    print(f"Indexed {len(index)} reviews in {build:.1f}s ({len(index) / build:.0f} reviews/s): "
+          f"{len(index.postings)} terms, {postings} postings, ~{(rss_after - rss_before) / 1024:.0f} MB")
+
+    # Queries skew towards common words too, the expensive case for an inverted index
+    queries = [' '.join(words.sample(rng.randint(1, 3))) for _ in range(args.queries)]
+    latencies = []
+    matched = 0
+    started = time.perf_counter()
+    for query in queries:
+        query_started = time.perf_counter()
+        matched += index.search(query, limit=20)['total']
+        latencies.append(time.perf_counter() - query_started)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(f"{len(queries)} queries: {len(queries) / elapsed:.0f} queries/s, "
+          f"p50 {percentile(latencies, 0.5) * 1000:.2f}ms, p95 {percentile(latencies, 0.95) * 1000:.2f}ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f}ms, max {latencies[-1] * 1000:.2f}ms, "
+          f"avg {matched / len(queries):.0f} matching reviews")
+
+if __name__ == "__main__":
+    main()
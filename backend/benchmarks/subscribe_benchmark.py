@@ -0,0 +1,108 @@
+"""Subscribe correctness under double-submits, and subscribe throughput.
+
+Compares the old find_one + insert_one subscribe against the single
+find_one_and_update upsert backed by the unique partial index. Needs a real
+MongoDB; everything happens in throwaway databases that are dropped after.
+
+    cd backend && python -m benchmarks.subscribe_benchmark --mongo-url mongodb://localhost:27017
+
+The concurrency check fires `--clicks` simultaneous subscribes for each of
+`--emails` addresses and counts active rows and "created" results per
+address; the atomic path must end with exactly one of each.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.subscription_store import subscribe, ensure_subscription_indexes
+
+async def legacy_subscribe(db, email: str, fields: dict):
+    """The original two-round-trip check-then-insert"""
+    existing = await db.subscriptions.find_one({'email': email, 'is_active': True})
+    if existing:
+        return existing, False
+    document = {**fields, 'email': email, 'is_active': True, 'subscribed_at': datetime.utcnow()}
+    await db.subscriptions.insert_one(document)
+    return document, True
+
+async def concurrency_check(label: str, db, handler, emails: int, clicks: int):
+    created = {}
+
+    async def click(email):
+        _, was_created = await handler(db, email, {'name': 'Double Click'})
+        created[email] = created.get(email, 0) + was_created
+
+    addresses = [f"race{i}@example.com" for i in range(emails)]
+    await asyncio.gather(*(click(email) for email in addresses for _ in range(clicks)))
+
+    duplicate_rows = 0
+    async for row in db.subscriptions.aggregate([
+        {'$match': {'is_active': True}},
+        {'$group': {'_id': '$email', 'count': {'$sum': 1}}},
+        {'$match': {'count': {'$gt': 1}}}
+    ]):
+        duplicate_rows += row['count'] - 1
+    extra_welcomes = sum(count - 1 for count in created.values() if count > 1)
+    missing_welcomes = sum(1 for email in addresses if not created.get(email))
+    print(f"{label:<10} {emails} addresses x {clicks} clicks: {duplicate_rows} duplicate active rows, "
+          f"{extra_welcomes} extra welcome emails, {missing_welcomes} addresses without one")
+
+async def throughput(label: str, db, handler, count: int, concurrency: int):
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with slots:
+            await handler(db, f"user{i}@example.com", {'name': f"Subscriber {i}"})
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    new_elapsed = time.perf_counter() - started
+
+    # Repeat signups of existing addresses, the common double-click case
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    repeat_elapsed = time.perf_counter() - started
+    print(f"{label:<10} new: {count / new_elapsed:>8.0f} subscribes/sec   "
+          f"existing: {count / repeat_elapsed:>8.0f} subscribes/sec   ({concurrency} concurrent)")
+
+async def run(args):
+    client = AsyncIOMotorClient(args.mongo_url)
+    databases = {'legacy': client['filmwalla_bench_subscribe_legacy'], 'atomic': client['filmwalla_bench_subscribe_atomic']}
+    try:
+        for db in databases.values():
+            await db.subscriptions.drop()
+        # The legacy path had no index on email at all
+        await ensure_subscription_indexes(databases['atomic'])
+
+        print("Concurrency check")
+        await concurrency_check('legacy', databases['legacy'], legacy_subscribe, args.emails, args.clicks)
+        await concurrency_check('atomic', databases['atomic'], subscribe, args.emails, args.clicks)
+
+        print("\nThroughput")
+        for db in databases.values():
+            await db.subscriptions.delete_many({})
+        await throughput('legacy', databases['legacy'], legacy_subscribe, args.count, args.concurrency)
+        await throughput('atomic', databases['atomic'], subscribe, args.count, args.concurrency)
+    finally:
+        for db in databases.values():
+            await client.drop_database(db.name)
+        client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark atomic subscribe against check-then-insert")
+    parser.add_argument('--mongo-url', required=True)
+    parser.add_argument('--emails', type=int, default=500, help="Addresses in the concurrency check")
+    parser.add_argument('--clicks', type=int, default=4, help="Simultaneous subscribes per address")
+    parser.add_argument('--count', type=int, default=5000, help="Subscribes in the throughput run")
+    parser.add_argument('--concurrency', type=int, default=50)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Welcome emails under a signup burst: one request per signup vs the batcher.
+
+SendGrid is simulated by a fixed per-request latency plus a small cost per
+personalization. The per-signup path runs on a 40-thread pool, the size of
+Starlette's default threadpool that BackgroundTasks used; the batcher path
+feeds the same signups through WelcomeMailBatcher.
+
+    cd backend && python -m benchmarks.welcome_burst_benchmark --signups 5000 --per-second 2000
+"""
+import argparse
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.email_service import email_service
+from services.welcome_batcher import WelcomeMailBatcher
+
+class FakeSendGrid:
+    """Counts requests and sleeps like a mail send call would"""
+
+    def __init__(self, request_ms: float, per_recipient_ms: float):
+        self.request = request_ms / 1000
+        self.per_recipient = per_recipient_ms / 1000
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def send_batch(self, index, batch, subject, html_content, plain_content=None):
+        with self.lock:
+            self.requests += 1
+        time.sleep(self.request + self.per_recipient * len(batch))
+        return {'batch': index, 'recipients': len(batch), 'status': 'sent', 'attempts': 1, 'seconds': 0.0, 'error': None}
+
+    def send_email(self, to_emails, subject, html_content, plain_content=None):
+        self.send_batch(0, to_emails, subject, html_content, plain_content)
+        return True
+
+async def arrive(signups: int, per_second: float, handle):
+    """Call `handle(i)` for each signup at a steady arrival rate"""
+    started = time.monotonic()
+    for i in range(signups):
+        delay = started + i / per_second - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        handle(i)
+
+async def per_signup(args):
+    # Like BackgroundTasks: every signup renders and sends on the shared threadpool
+    latencies = []
+    loop = asyncio.get_running_loop()
+    pool = ThreadPoolExecutor(max_workers=40)
+    futures = []
+
+    def handle(i):
+        queued = time.monotonic()
+
+        def send():
+            email_service.send_welcome_email(f"user{i}@example.com", f"Subscriber {i}" if i % 3 else None)
+            latencies.append(time.monotonic() - queued)
+
+        futures.append(loop.run_in_executor(pool, send))
+
+    started = time.monotonic()
+    await arrive(args.signups, args.per_second, handle)
+    await asyncio.gather(*futures)
+    pool.shutdown()
+    return time.monotonic() - started, latencies
+
+async def batched(args):
+    batcher = WelcomeMailBatcher(max_batch=args.batch_size, max_wait=args.max_wait)
+    started = time.monotonic()
+    await arrive(args.signups, args.per_second, lambda i: batcher.add(
+        f"user{i}@example.com", f"Subscriber {i}" if i % 3 else None
+    ))
+    await batcher.stop()
+    return time.monotonic() - started, batcher.report()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark welcome email sending under a signup burst")
+    parser.add_argument('--signups', type=int, default=5000)
+    parser.add_argument('--per-second', type=float, default=2000, help="Signup arrival rate")
+    parser.add_argument('--request-ms', type=float, default=250, help="Simulated SendGrid request latency")
+    parser.add_argument('--per-recipient-ms', type=float, default=0.5)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--max-wait', type=float, default=2.0)
+    args = parser.parse_args()
+
+    fake = FakeSendGrid(args.request_ms, args.per_recipient_ms)
+    email_service.sg = True  # bypass the "not configured" short-circuit; sends go to the fake
+    email_service.send_batch = fake.send_batch
+    email_service.send_email = fake.send_email
+    email_service.unsubscribe_secret = email_service.unsubscribe_secret or 'benchmark'
+
+    elapsed, latencies = asyncio.run(per_signup(args))
+    latencies.sort()
+    print(f"Per-signup sends:   {args.signups} emails in {elapsed:.2f}s, {fake.requests} SendGrid requests, "
+          f"time to send p50 {latencies[len(latencies) // 2]:.2f}s / max {latencies[-1]:.2f}s")
+
+    fake.requests = 0
+    elapsed, report = asyncio.run(batched(args))
+    print(f"Batched sends:      {report['sent']} emails in {elapsed:.2f}s, {fake.requests} SendGrid requests, "
+          f"{report['batches']} batches (avg {report['average_batch_size']}, max {report['largest_batch']})")
+    print(f"  latency added by batching: {report['added_latency_seconds']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""WhatsApp fan-out against a local fake Twilio Messages endpoint.
+
+The fake server answers POST /2010-04-01/Accounts/{sid}/Messages.json like
+Twilio does, after a configurable latency, and rejects a share of requests
+with 429 or 503 so the retry path is exercised. Each run reports messages/sec
+and the delivery report, next to a sequential one-at-a-time baseline.
+
+    cd backend && python -m benchmarks.whatsapp_fanout_benchmark --messages 2000 --rate 200
+
+The fake can also be run on its own for manual testing with
+TWILIO_API_BASE=http://127.0.0.1:8765:
+
+    cd backend && python -m benchmarks.whatsapp_fanout_benchmark --serve
+"""
+import argparse
+import asyncio
+import random
+import sys
+import uuid
+from pathlib import Path
+
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.whatsapp_fanout import WhatsAppFanOut
+
+class FakeTwilio:
+    """Minimal stand-in for the Twilio Messages API"""
+
+    def __init__(self, latency_ms: float = 80, rate_limit_ratio: float = 0.02, error_ratio: float = 0.01, seed: int = 7):
+        self.latency = latency_ms / 1000
+        self.rate_limit_ratio = rate_limit_ratio
+        self.error_ratio = error_ratio
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.delivered = {}  # to -> number of accepted messages
+
+    async def create_message(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        form = await request.post()
+        await asyncio.sleep(self.latency)
+
+        roll = self.random.random()
+        if roll < self.rate_limit_ratio:
+            return web.json_response({'code': 20429, 'message': 'Too Many Requests'}, status=429, headers={'Retry-After': '0.2'})
+        if roll < self.rate_limit_ratio + self.error_ratio:
+            return web.json_response({'code': 20503, 'message': 'Service Unavailable'}, status=503)
+        if not form.get('To', '').startswith('whatsapp:'):
+            return web.json_response({'code': 21211, 'message': "Invalid 'To' Phone Number"}, status=400)
+
+        self.delivered[form['To']] = self.delivered.get(form['To'], 0) + 1
+        return web.json_response({
+            'sid': f"SM{uuid.uuid4().hex}",
+            'status': 'queued',
+            'to': form['To'],
+            'from': form.get('From'),
+            'account_sid': request.match_info['sid']
+        }, status=201)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/2010-04-01/Accounts/{sid}/Messages.json', self.create_message)
+        return app
+
+async def start_fake(fake: FakeTwilio, port: int) -> web.AppRunner:
+    runner = web.AppRunner(fake.app())
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    return runner
+
+async def run(args):
+    fake = FakeTwilio(args.latency_ms, args.rate_limit_ratio, args.error_ratio)
+    runner = await start_fake(fake, args.port)
+    base_url = f"http://127.0.0.1:{args.port}"
+    messages = [(f"+9198{i:08d}", f"🎬 New Review Alert! Hi subscriber {i}") for i in range(args.messages)]
+
+    try:
+        # Baseline: one request at a time, like the old send_bulk_messages loop
+        sample = messages[:args.sequential_sample]
+        sequential = WhatsAppFanOut('ACfake', 'token', 'whatsapp:+14155238886', base_url=base_url,
+                                    messages_per_second=10_000, max_concurrency=1)
+        baseline = await sequential.send_all(sample)
+
+        fanout = WhatsAppFanOut('ACfake', 'token', 'whatsapp:+14155238886', base_url=base_url,
+                                messages_per_second=args.rate, max_concurrency=args.concurrency)
+        fake.delivered.clear()
+        report = await fanout.send_all(messages)
+    finally:
+        await runner.cleanup()
+
+    duplicates = sum(1 for count in fake.delivered.values() if count > 1)
+    print(f"Sequential baseline: {baseline['sent']}/{len(sample)} sent, {baseline['messages_per_second']} msg/sec")
+    print(f"Fan-out ({args.concurrency} in flight, {args.rate}/s bucket): {report['sent']}/{report['total']} sent "
+          f"in {report['seconds']}s, {report['messages_per_second']} msg/sec")
+    print(f"  retried {report['retried']}, failed {report['failed']}, attempts {report['attempts']}, "
+          f"errors {report['errors_by_status']}, duplicate deliveries {duplicates}")
+    if baseline['messages_per_second']:
+        print(f"  {report['messages_per_second'] / baseline['messages_per_second']:.1f}x the sequential rate")
+    print(f"  At this rate 50k alerts take {50000 / report['messages_per_second'] / 60:.1f} min "
+          f"(sequential: {50000 / baseline['messages_per_second'] / 3600:.1f} h)")
+
+async def serve(args):
+    await start_fake(FakeTwilio(args.latency_ms, args.rate_limit_ratio, args.error_ratio), args.port)
+    print(f"Fake Twilio listening on http://127.0.0.1:{args.port}")
+    await asyncio.Event().wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark WhatsApp fan-out against a fake Twilio")
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--rate', type=float, default=200, help="Token bucket messages per second")
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--sequential-sample', type=int, default=50)
+    parser.add_argument('--latency-ms', type=float, default=80)
+    parser.add_argument('--rate-limit-ratio', type=float, default=0.02)
+    parser.add_argument('--error-ratio', type=float, default=0.01)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--serve', action='store_true', help="Only run the fake Twilio server")
+    args = parser.parse_args()
+    asyncio.run(serve(args) if args.serve else run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""Synthetic WordPress (WXR) export generator for migration benchmarks.
+
+Produces exports shaped like the real Filmwalla one: HTML review bodies,
+categories, attachments with _thumbnail_id links (some before and some
+after their posts), recurring titles, reposted near-duplicates, Hindi text
+and a share of non-review posts. Output is streamed, so 1M-post exports
+can be written without holding them in memory.
+
+    cd backend && python -m benchmarks.wxr_generator out.xml --posts 10000
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+from typing import List, Dict
+
+SITE = "https://filmwalla.example.com"
+
+TITLE_WORDS = [
+    'Dil', 'Pyaar', 'Dhadkan', 'Zindagi', 'Sapne', 'Raat', 'Jung', 'Safar',
+    'Kahani', 'Toofan', 'Baazi', 'Dosti', 'Shikar', 'Mission', 'Shadow',
+    'Empire', 'Monsoon', 'Circuit', 'Frontier', 'Legacy', 'Echo', 'Inferno'
+]
+TITLE_SUFFIXES = ['', ' 2', ' Returns', ' Begins', ' Express', ' Chapter 1']
+HINDI_WORDS = ['दिल', 'प्यार', 'धड़कन', 'ज़िंदगी', 'सपने', 'रात', 'जंग', 'सफ़र', 'कहानी', 'तूफ़ान']
+
+# Review sentence templates; slots are filled per sentence so posts differ
+REVIEW_SENTENCES = [
+    "The director {verb} the story with a {adj} screenplay in the {part}.",
+    "{name} {verb} the film with a {adj} turn as the {role}.",
+    "The actress {name} brings {adj} {noun} to a plot that needed more drama.",
+    "As a thriller it is {adj}, though the comedy around the {role} feels {adj2}.",
+    "The supporting cast, especially {name}, is {adj} and the {noun} lifts the {part}.",
+    "Bollywood has seen this story before but the {noun} here is {adj}.",
+    "This movie should do {adj} business at the box office thanks to {name}.",
+    "The cinematography by {name} is {adj}, every frame of the {part} looks like a painting.",
+    "Some scenes in the {part} drag and the {noun} could have been {adj2}.",
+    "Fans of {name} will find the {noun} {adj} in this film."
+]
+NAMES = [
+    'Aamir', 'Kareena', 'Ranbir', 'Deepika', 'Vicky', 'Alia', 'Rajkummar', 'Tabu',
+    'Nawazuddin', 'Vidya', 'Ayushmann', 'Taapsee', 'Manoj', 'Konkona', 'Irrfan',
+    'Pankaj', 'Radhika', 'Fahadh', 'Nayanthara', 'Dhanush', 'Samantha', 'Prabhas'
+]
+ADJECTIVES = [
+    'assured', 'uneven', 'electric', 'restrained', 'luminous', 'clumsy', 'brave',
+    'predictable', 'haunting', 'breezy', 'overlong', 'tender', 'gritty', 'sharp',
+    'muddled', 'soulful', 'relentless', 'quiet', 'bold', 'stilted'
+]
+NOUNS = [
+    'music', 'editing', 'background score', 'production design', 'dialogue',
+    'climax', 'choreography', 'costume work', 'sound design', 'pacing', 'writing'
+]
+VERBS = ['anchors', 'elevates', 'carries', 'drives', 'grounds', 'steers', 'shapes']
+ROLES = ['cop', 'father', 'villain', 'teacher', 'rebel', 'journalist', 'sidekick', 'mother']
+PARTS = ['first half', 'second half', 'interval block', 'opening act', 'finale']
+HINDI_SENTENCES = [
+    "यह फ़िल्म परिवार के साथ देखने लायक है।",
+    "कहानी थोड़ी धीमी है लेकिन अभिनय शानदार है।",
+    "संगीत और निर्देशन दोनों ने दिल जीत लिया।"
+]
+OTHER_SENTENCES = [
+    "We drove up to the hills early in the morning to beat the traffic.",
+    "The recipe needs fresh ginger, a pinch of salt and patience.",
+    "Quarterly numbers were better than expected across all regions.",
+    "The garden finally bloomed after weeks of rain.",
+    "A short note on what I learned from running every weekend."
+]
+CATEGORIES = ['Entertainment', 'Movies', 'Bollywood', 'Hollywood', 'South Indian', 'Reviews', 'Opinion']
+TITLE_FORMATS = [
+    "{movie} review",
+    "{movie} the Movie...my review.",
+    "Review: {movie}",
+    "{movie} - my review",
+    "{movie} movie review"
+]
+
+def generate_catalog(size: int, seed: int = 42) -> List[Dict]:
+    """Deterministic fake movie catalog shared with the benchmark's fake TMDB"""
+    rng = random.Random(seed)
+    catalog = []
+    seen = set()
+    while len(catalog) < size:
+        words = rng.sample(range(len(TITLE_WORDS)), 2)
+        title = f"{TITLE_WORDS[words[0]]} {TITLE_WORDS[words[1]]}{rng.choice(TITLE_SUFFIXES)}"
+        if title in seen:
+            title = f"{title} {len(catalog)}"
+        seen.add(title)
+        catalog.append({
+            'tmdb_id': 100000 + len(catalog),
+            'title': title,
+            'title_hindi': ' '.join(HINDI_WORDS[w % len(HINDI_WORDS)] for w in words),
+            'year': rng.randint(1990, 2024)
+        })
+    return catalog
+
+def cdata(text: str) -> str:
+    return "<![CDATA[" + text.replace("]]>", "]]]]><![CDATA[>") + "]]>"
+
+def review_sentence(rng: random.Random) -> str:
+    return rng.choice(REVIEW_SENTENCES).format(
+        name=rng.choice(NAMES),
+        adj=rng.choice(ADJECTIVES),
+        adj2=rng.choice(ADJECTIVES),
+        noun=rng.choice(NOUNS),
+        verb=rng.choice(VERBS),
+        role=rng.choice(ROLES),
+        part=rng.choice(PARTS)
+    )
+
+def review_html(rng: random.Random, movie: Dict, hindi_ratio: float) -> str:
+    paragraphs = [
+        f"<p>{' '.join(review_sentence(rng) for _ in range(3))}</p>"
+        for _ in range(rng.randint(3, 8))
+    ]
+    paragraphs.insert(0, f"<h2>{movie['title']} ({movie['year']})</h2>")
+    if rng.random() < hindi_ratio:
+        paragraphs.append(f"<p>{movie['title_hindi']}: {' '.join(rng.sample(HINDI_SENTENCES, 2))}</p>")
+    if rng.random() < 0.3:
+        paragraphs.append(f"<p><strong>Rating: {rng.choice(['3', '3.5', '4', '4.5'])}/5</strong></p>")
+    return '\n'.join(paragraphs)
+
+def other_html(rng: random.Random) -> str:
+    return '\n'.join(f"<p>{' '.join(rng.sample(OTHER_SENTENCES, 3))}</p>" for _ in range(rng.randint(2, 5)))
+
+def post_item(post_id: int, title: str, html: str, published: datetime, categories: List[str],
+              thumbnail_id: int = None) -> str:
+    slug = f"post-{post_id}"
+    meta = ""
+    if thumbnail_id is not None:
+        meta = (
+            "\t\t<wp:postmeta>\n"
+            f"\t\t<wp:meta_key>{cdata('_thumbnail_id')}</wp:meta_key>\n"
+            f"\t\t<wp:meta_value>{cdata(str(thumbnail_id))}</wp:meta_value>\n"
+            "\t\t</wp:postmeta>\n"
+        )
+    category_xml = ''.join(
+        f'\t\t<category domain="category" nicename="{c.lower().replace(" ", "-")}">{cdata(c)}</category>\n'
+        for c in categories
+    )
+    return (
+        "\t<item>\n"
+        f"\t\t<title>{cdata(title)}</title>\n"
+        f"\t\t<link>{SITE}/{published:%Y/%m/%d}/{slug}/</link>\n"
+        f"\t\t<pubDate>{published:%a, %d %b %Y %H:%M:%S} +0000</pubDate>\n"
+        f"\t\t<dc:creator>{cdata('gaurangbookseller')}</dc:creator>\n"
+        f"\t\t<content:encoded>{cdata(html)}</content:encoded>\n"
+        f"\t\t<wp:post_id>{post_id}</wp:post_id>\n"
+        f"\t\t<wp:post_date>{cdata(published.strftime('%Y-%m-%d %H:%M:%S'))}</wp:post_date>\n"
+        f"\t\t<wp:post_name>{cdata(slug)}</wp:post_name>\n"
+        f"\t\t<wp:status>{cdata('publish')}</wp:status>\n"
+        f"\t\t<wp:post_type>{cdata('post')}</wp:post_type>\n"
+        f"{category_xml}{meta}"
+        "\t</item>\n"
+    )
+
+def attachment_item(attachment_id: int, published: datetime) -> str:
+    url = f"{SITE}/wp-content/uploads/{published:%Y/%m}/still-{attachment_id}.jpg"
+    return (
+        "\t<item>\n"
+        f"\t\t<title>{cdata(f'still-{attachment_id}')}</title>\n"
+        f"\t\t<wp:post_id>{attachment_id}</wp:post_id>\n"
+        f"\t\t<wp:post_type>{cdata('attachment')}</wp:post_type>\n"
+        f"\t\t<wp:attachment_url>{cdata(url)}</wp:attachment_url>\n"
+        "\t</item>\n"
+    )
+
+def generate_export(
+    path: str,
+    posts: int,
+    seed: int = 42,
+    attachment_ratio: float = 0.6,
+    duplicate_ratio: float = 0.05,
+    hindi_ratio: float = 0.2,
+    non_review_ratio: float = 0.15
+) -> Dict:
+    """Write a synthetic WXR export and return a summary of what it contains"""
+    rng = random.Random(seed)
+    catalog = generate_catalog(max(200, posts // 5), seed)
+    recent = []  # recent (title, html) pairs to repost as near duplicates
+    delayed_attachments = []  # attachments written after their posts
+    counts = {'posts': 0, 'reviews': 0, 'duplicates': 0, 'attachments': 0}
+    started = datetime(2010, 1, 1)
+    next_id = 1
+
+    with open(path, 'w', encoding='utf-8') as out:
+        out.write(
+            '<?xml version="1.0" encoding="UTF-8" ?>\n'
+            '<rss version="2.0"\n'
+            '\txmlns:excerpt="http://wordpress.org/export/1.2/excerpt/"\n'
+            '\txmlns:content="http://purl.org/rss/1.0/modules/content/"\n'
+            '\txmlns:wfw="http://wellformedweb.org/CommentAPI/"\n'
+            '\txmlns:dc="http://purl.org/dc/elements/1.1/"\n'
+            '\txmlns:wp="http://wordpress.org/export/1.2/"\n'
+            '>\n<channel>\n'
+            f'\t<title>Synthetic Filmwalla export</title>\n\t<link>{SITE}</link>\n'
+        )
+
+        for index in range(posts):
+            post_id = next_id
+            next_id += 1
+            published = started + timedelta(minutes=index * 97)
+
+            if recent and rng.random() < duplicate_ratio:
+                # Repost with a light edit, as syndicated copies tend to be
+                title, html = rng.choice(recent)
+                html = html.replace("<p>", "<p>Reposted: ", 1) + "\n<p>Originally published on our blog.</p>"
+                counts['duplicates'] += 1
+                counts['reviews'] += 1
+            elif rng.random() < non_review_ratio:
+                title = f"Weekend notes {index}"
+                html = other_html(rng)
+            else:
+                movie = rng.choice(catalog)
+                title = rng.choice(TITLE_FORMATS).format(movie=movie['title'])
+                html = review_html(rng, movie, hindi_ratio)
+                recent.append((title, html))
+                recent = recent[-100:]
+                counts['reviews'] += 1
+
+            thumbnail_id = None
+            if rng.random() < attachment_ratio:
+                thumbnail_id = next_id
+                next_id += 1
+                counts['attachments'] += 1
+                if rng.random() < 0.5:
+                    out.write(attachment_item(thumbnail_id, published))
+                else:
+                    delayed_attachments.append((thumbnail_id, published))
+
+            out.write(post_item(post_id, title, html, published, rng.sample(CATEGORIES, 2), thumbnail_id))
+            counts['posts'] += 1
+
+            if len(delayed_attachments) >= 50:
+                for attachment_id, when in delayed_attachments:
+                    out.write(attachment_item(attachment_id, when))
+                delayed_attachments = []
+
+        for attachment_id, when in delayed_attachments:
+            out.write(attachment_item(attachment_id, when))
+        out.write('</channel>\n</rss>\n')
+
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic WordPress export")
+    parser.add_argument('output')
+    parser.add_argument('--posts', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    counts = generate_export(args.output, args.posts, seed=args.seed)
+    print(f"Wrote {args.output}: {counts}")
+
+if __name__ == "__main__":
+    main()
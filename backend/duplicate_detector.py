@@ -0,0 +1,115 @@
+import re
+from hashlib import blake2b
+from typing import List, Dict, Optional, Tuple
+import numpy as np
+
+# Words in English or Devanagari text (Devanagari vowel signs are not \w)
+WORD_PATTERN = re.compile(r'[\w\u0900-\u097F]+')
+
+class DuplicateDetector:
+    """MinHash signatures with an LSH band index for near-duplicate lookup
+
+    Each post gets a ``num_perm`` value MinHash signature over its word
+    shingles. Signatures are split into bands of ``rows`` values; posts that
+    agree on a whole band land in the same bucket, so only those candidates
+    are compared, and a candidate counts as a duplicate when the estimated
+    Jaccard similarity reaches ``threshold``.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.7,
+        num_perm: int = 32,
+        rows: int = 4,
+        shingle_size: int = 3,
+        min_words: int = 20,
+        seed: int = 1
+    ):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.rows = rows
+        self.bands = num_perm // rows
+        self.shingle_size = shingle_size
+        self.min_words = min_words
+
+        # Multiply-shift hash family; fixed seed keeps signatures comparable across runs
+        generator = np.random.default_rng(seed)
+        self.multipliers = generator.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.offsets = generator.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+        self.buckets = [{} for _ in range(self.bands)]  # band bytes -> [representative index]
+        self.signatures = []
+        self.post_ids = []
+
+    @property
+    def representatives(self) -> int:
+        return len(self.post_ids)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash signature over word shingles, or None for very short texts"""
+        words = WORD_PATTERN.findall(text.lower())
+        if len(words) < self.min_words:
+            return None
+
+        size = self.shingle_size
+        shingles = {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+        hashes = np.fromiter(
+            (int.from_bytes(blake2b(s.encode('utf-8'), digest_size=8).digest(), 'big') for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+
+        # (num_perm x shingles) permuted hashes; uint64 arithmetic wraps mod 2^64
+        permuted = (np.outer(self.multipliers, hashes) + self.offsets[:, None]) >> np.uint64(32)
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def band_keys(self, signature: np.ndarray) -> List[bytes]:
+        """Split a signature into its band bucket keys"""
+        return [
+            signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+    def find(self, signature: np.ndarray) -> Optional[Tuple[str, float]]:
+        """Most similar indexed representative as (post_id, similarity), if any"""
+        candidates = set()
+        for band, key in enumerate(self.band_keys(signature)):
+            candidates.update(self.buckets[band].get(key, ()))
+
+        best = None
+        for index in candidates:
+            similarity = float(np.mean(self.signatures[index] == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (self.post_ids[index], similarity)
+        return best
+
+    def add(self, post_id: str, signature: np.ndarray):
+        """Index a representative post"""
+        index = len(self.post_ids)
+        self.post_ids.append(post_id)
+        self.signatures.append(signature)
+        for band, key in enumerate(self.band_keys(signature)):
+            self.buckets[band].setdefault(key, []).append(index)
+
+    def assign(self, post: Dict) -> Dict:
+        """Fingerprint a post and attach it to a duplicate cluster"""
+        # The first post of a cluster is its representative; only
+        # representatives are indexed
+        signature = self.signature(post['title'] + ' ' + post['content'])
+        post['fingerprint'] = signature.tobytes().hex() if signature is not None else None
+        post['cluster_id'] = post['id']
+        post['duplicate_of'] = None
+        post['similarity'] = None
+
+        if signature is None:
+            return post
+
+        match = self.find(signature)
+        if match:
+            post_id, similarity = match
+            post['cluster_id'] = post_id
+            post['duplicate_of'] = post_id
+            post['similarity'] = round(similarity, 4)
+        else:
+            self.add(post['id'], signature)
+        return post
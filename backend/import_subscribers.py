@@ -0,0 +1,102 @@
+"""Bulk-load a mailing list into subscriptions without going through the API.
+
+Streams a CSV (header row required) or NDJSON file, validates emails and
+phone numbers, and writes unordered bulk upserts. Addresses that already
+have an active subscription are skipped unless --update-existing is given.
+
+    python import_subscribers.py mailing_list.csv
+    python import_subscribers.py export.ndjson --update-existing --send-welcome --errors errors.ndjson
+
+Recognised columns: email, name, phone_number (or phone/mobile/whatsapp),
+email_notifications, whatsapp_notifications, industries (; separated), language.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import AsyncIterator
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from services.subscriber_import import SubscriberImporter, ROW_READERS
+from services.subscription_store import ensure_subscription_indexes
+from services.welcome_batcher import welcome_batcher
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 256 * 1024
+
+async def read_chunks(path: Path) -> AsyncIterator[bytes]:
+    with open(path, 'rb') as handle:
+        while True:
+            chunk = await asyncio.to_thread(handle.read, CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+async def import_file(args) -> int:
+    path = Path(args.file)
+    file_format = args.format or ('ndjson' if path.suffix in ('.ndjson', '.jsonl', '.json') else 'csv')
+
+    client = AsyncIOMotorClient(args.mongo_url)
+    db = client[args.db_name]
+    try:
+        await ensure_subscription_indexes(db)
+        importer = SubscriberImporter(
+            db,
+            batch_size=args.batch_size,
+            send_welcome=args.send_welcome,
+            update_existing=args.update_existing
+        )
+        report = await importer.run(read_chunks(path), file_format)
+        if args.send_welcome:
+            # Flush the welcome emails still waiting for a batch
+            await welcome_batcher.stop()
+    finally:
+        client.close()
+
+    print(f"Imported {path}: {report['rows']} rows in {report['seconds']}s ({report['rows_per_second']} rows/sec)")
+    print(f"  created {report['created']}, already subscribed {report['existing']}, "
+          f"updated {report['updated']}, invalid {report['invalid']}")
+    if args.send_welcome:
+        print(f"  welcome emails: {welcome_batcher.report()['sent']} sent")
+    if args.errors:
+        with open(args.errors, 'w') as handle:
+            for error in report['errors']:
+                handle.write(json.dumps(error) + '\n')
+        print(f"  errors written to {args.errors}" + (" (truncated)" if report['errors_truncated'] else ""))
+    else:
+        for error in report['errors'][:20]:
+            print(f"  line {error['line']}: {error['error']}")
+        if report['invalid'] > 20:
+            print(f"  ... {report['invalid'] - 20} more (use --errors to save them all)")
+    return 0 if not report['invalid'] else 1
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Bulk import subscribers from CSV or NDJSON")
+    parser.add_argument('file')
+    parser.add_argument('--format', choices=sorted(ROW_READERS), help="Defaults from the file extension")
+    parser.add_argument('--batch-size', type=int, default=1000, help="Rows per bulk write")
+    parser.add_argument('--send-welcome', action='store_true', help="Send welcome emails to new subscriptions")
+    parser.add_argument('--update-existing', action='store_true', help="Refresh name, phone and preferences of active subscriptions")
+    parser.add_argument('--errors', help="Write per-row errors to this NDJSON file")
+    parser.add_argument('--mongo-url', default=os.environ.get('MONGO_URL'))
+    parser.add_argument('--db-name', default=os.environ.get('DB_NAME'))
+    args = parser.parse_args()
+
+    if not (args.mongo_url and args.db_name):
+        logger.error("--mongo-url and --db-name (or MONGO_URL/DB_NAME) are required")
+        return 2
+    return asyncio.run(import_file(args))
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv(Path(__file__).parent / '.env')
+    logging.basicConfig(
+        level=logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    sys.exit(main())
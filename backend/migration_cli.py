@@ -0,0 +1,321 @@
+"""Command-line WordPress migration for batch machines.
+
+Runs the parse -> clean -> classify -> dedupe -> map pipeline outside the
+API. Cleaning and classification (the CPU heavy part) run in a pool of
+worker processes; parsing, duplicate detection and movie mapping stay in the
+main process because they share state across posts.
+
+    # Write NDJSON shards, matching only against an exported movies file
+    python migration_cli.py run export.xml --workers 4 --movies movies.ndjson --no-tmdb --output-dir out/
+
+    # Load previously written shards into MongoDB
+    python migration_cli.py load out/ --mongo-url mongodb://localhost:27017 --db-name filmwalla
+
+    # Migrate straight into MongoDB, or just measure throughput
+    python migration_cli.py run export.xml --workers 4 --mongo-url mongodb://localhost:27017 --db-name filmwalla
+    python migration_cli.py run export.xml --workers 4 --dry-run
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Optional, Iterable, Iterator, AsyncIterator, Tuple
+
+from bson import json_util
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from review_classifier import review_classifier
+from wordpress_migration import WordPressMigrator, MigrationRecord
+
+logger = logging.getLogger(__name__)
+
+SHARD_PREFIX = 'records'
+LATE_IMAGES_FILE = 'late_images.ndjson'
+MANIFEST_FILE = 'manifest.json'
+
+class LocalOnlyTMDB:
+    """TMDB stand-in for offline runs: every search comes back empty"""
+
+    def search_movies(self, query: str, language: str = "en-US") -> List[Dict]:
+        return []
+
+# Per worker process migrator, created by the pool initializer
+_worker_migrator = None
+
+def init_worker():
+    global _worker_migrator
+    _worker_migrator = WordPressMigrator(tmdb=LocalOnlyTMDB())
+
+def prepare_batch(items: List[Dict]) -> List[Tuple[Dict, str, Dict]]:
+    """Clean and classify export items, keeping only movie reviews"""
+    migrator = _worker_migrator or WordPressMigrator(tmdb=LocalOnlyTMDB())
+    prepared = []
+    for item in items:
+        content_text = migrator.clean_content(item.pop('content_html'))
+        classification = review_classifier.classify(item['title'], content_text)
+        if classification['is_movie_review']:
+            prepared.append((item, content_text, classification))
+    return prepared
+
+class MigrationPipeline:
+    """Streams an export through the migrator with a pool of cleaning workers"""
+
+    def __init__(self, migrator: WordPressMigrator, workers: int = 1, batch_size: int = 200):
+        self.migrator = migrator
+        self.workers = workers
+        self.batch_size = batch_size
+        self.items_parsed = 0
+
+    def iter_batches(self, xml_file_path: str) -> Iterator[List[Dict]]:
+        batch = []
+        for item in self.migrator.iter_export_items(xml_file_path):
+            self.items_parsed += 1
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def iter_prepared(self, xml_file_path: str) -> Iterator[List[Tuple[Dict, str, Dict]]]:
+        """Prepared batches in export order"""
+        if self.workers <= 1:
+            for batch in self.iter_batches(xml_file_path):
+                yield prepare_batch(batch)
+            return
+
+        # Only a few batches per worker are queued at a time, so memory stays
+        # bounded no matter how large the export is. Attachments are indexed
+        # here in the main process as the parser reaches them.
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker) as pool:
+            queued = deque()
+            for batch in self.iter_batches(xml_file_path):
+                queued.append(pool.submit(prepare_batch, batch))
+                if len(queued) >= self.workers * 2:
+                    yield queued.popleft().result()
+            while queued:
+                yield queued.popleft().result()
+
+    async def iter_records(self, xml_file_path: str) -> AsyncIterator[MigrationRecord]:
+        """Assemble, deduplicate and map prepared posts in export order"""
+        for prepared in self.iter_prepared(xml_file_path):
+            for item, content_text, classification in prepared:
+                post = self.migrator.assemble_post(item, content_text, classification)
+                self.migrator.duplicate_detector.assign(post)
+                mapping, failure = await self.migrator.map_post(post)
+                yield post, mapping, failure
+
+class ShardWriter:
+    """Writes migration records as size-capped NDJSON shards"""
+
+    def __init__(self, output_dir: Path, shard_size: int = 10000):
+        self.output_dir = output_dir
+        self.shard_size = shard_size
+        self.shards = []
+        self.current = None
+        self.current_count = 0
+
+    def write(self, post: Dict, mapping: Optional[Dict], failure: Optional[Dict]):
+        if self.current is None or self.current_count >= self.shard_size:
+            self.rotate()
+        # Extended JSON keeps datetimes intact for the load command
+        self.current.write(json_util.dumps({'post': post, 'mapping': mapping, 'failure': failure}))
+        self.current.write('\n')
+        self.current_count += 1
+
+    def rotate(self):
+        self.close()
+        path = self.output_dir / f"{SHARD_PREFIX}-{len(self.shards):05d}.ndjson"
+        self.shards.append(path.name)
+        self.current = open(path, 'w', encoding='utf-8')
+        self.current_count = 0
+
+    def close(self):
+        if self.current is not None:
+            self.current.close()
+            self.current = None
+
+def read_ndjson(path: Path) -> Iterator[Dict]:
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            if line.strip():
+                yield json_util.loads(line)
+
+def iter_shard_records(input_dir: Path) -> Iterator[MigrationRecord]:
+    for path in sorted(input_dir.glob(f"{SHARD_PREFIX}-*.ndjson")):
+        for record in read_ndjson(path):
+            yield record['post'], record['mapping'], record['failure']
+
+async def load_movie_index(migrator: WordPressMigrator, args) -> int:
+    """Fill the local title index from an NDJSON movies file or MongoDB"""
+    if args.movies:
+        for movie in read_ndjson(Path(args.movies)):
+            migrator.movie_index.add(movie)
+        return len(migrator.movie_index)
+    if args.mongo_url:
+        client = AsyncIOMotorClient(args.mongo_url)
+        try:
+            return await migrator.movie_index.load(client[args.db_name])
+        finally:
+            client.close()
+    return 0
+
+def print_report(report: Dict, throughput: Dict):
+    print("\n=== MIGRATION REPORT ===")
+    print(f"Export items parsed: {throughput['items_parsed']}")
+    print(f"Total posts found: {report['total_posts_found']}")
+    print(f"Successfully mapped: {report['successfully_mapped']}")
+    print(f"Failed mappings: {report['failed_mappings']}")
+    print(f"Success rate: {report['success_rate']:.1f}%")
+    print(f"Posts with ratings: {report['posts_with_ratings']}")
+    print(f"Near duplicates: {report['duplicates']}")
+    print(f"Matched locally: {report['local_matches']} (TMDB lookups: {report['tmdb_lookups']})")
+    if report['saved_documents']:
+        print(f"Documents saved: {report['saved_documents']} ({report['save_errors']} errors)")
+    print(f"Elapsed: {throughput['elapsed_seconds']:.1f}s")
+    print(f"Throughput: {throughput['items_per_second']:.0f} items/sec, {throughput['posts_per_second']:.0f} posts/sec")
+    print(f"Peak memory (main process): {report['peak_memory_mb']} MB")
+
+    if report['failed_mappings_list']:
+        print("\nFailed mappings (first 10):")
+        for failed in report['failed_mappings_list']:
+            print(f"  - {failed['post_title']} ({failed['reason']})")
+
+async def run_command(args) -> int:
+    if not (args.output_dir or args.mongo_url or args.dry_run):
+        logger.error("Choose --output-dir, --mongo-url or --dry-run")
+        return 2
+
+    migrator = WordPressMigrator(
+        chunk_size=args.chunk_size,
+        max_in_flight=args.max_in_flight,
+        tmdb=LocalOnlyTMDB() if args.no_tmdb else None
+    )
+    indexed = await load_movie_index(migrator, args)
+    print(f"Local title index holds {indexed} movies")
+
+    pipeline = MigrationPipeline(migrator, workers=args.workers, batch_size=args.batch_size)
+    records = pipeline.iter_records(args.export)
+    started = time.monotonic()
+
+    writer = None
+    if args.dry_run:
+        async for post, mapping, failure in records:
+            migrator.track_record(post, mapping, failure)
+    elif args.output_dir:
+        output_dir = Path(args.output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        writer = ShardWriter(output_dir, args.shard_size)
+        try:
+            async for post, mapping, failure in records:
+                migrator.track_record(post, mapping, failure)
+                writer.write(post, mapping, failure)
+        finally:
+            writer.close()
+
+        # Featured images whose attachment came after the post was written
+        with open(output_dir / LATE_IMAGES_FILE, 'w', encoding='utf-8') as handle:
+            for post_id, url in migrator.attachments.resolved_late:
+                handle.write(json.dumps({'id': post_id, 'featured_image': url}) + '\n')
+    else:
+        os.environ['MONGO_URL'] = args.mongo_url
+        os.environ['DB_NAME'] = args.db_name
+        if not await migrator.save_to_database(records):
+            return 1
+
+    elapsed = time.monotonic() - started
+    report = migrator.generate_migration_report()
+    throughput = {
+        'items_parsed': pipeline.items_parsed,
+        'elapsed_seconds': round(elapsed, 2),
+        'items_per_second': pipeline.items_parsed / elapsed if elapsed else 0,
+        'posts_per_second': report['total_posts_found'] / elapsed if elapsed else 0,
+        'workers': args.workers
+    }
+
+    if writer is not None:
+        manifest = {
+            'export': os.path.abspath(args.export),
+            'shards': writer.shards,
+            'late_images': LATE_IMAGES_FILE,
+            'report': report,
+            'throughput': throughput
+        }
+        with open(Path(args.output_dir) / MANIFEST_FILE, 'w', encoding='utf-8') as handle:
+            handle.write(json_util.dumps(manifest, indent=2))
+
+    print_report(report, throughput)
+    return 0
+
+async def load_command(args) -> int:
+    input_dir = Path(args.input_dir)
+    migrator = WordPressMigrator(chunk_size=args.chunk_size, max_in_flight=args.max_in_flight)
+
+    late_images = input_dir / LATE_IMAGES_FILE
+    if late_images.exists():
+        migrator.attachments.resolved_late = [
+            (image['id'], image['featured_image']) for image in read_ndjson(late_images)
+        ]
+
+    os.environ['MONGO_URL'] = args.mongo_url
+    os.environ['DB_NAME'] = args.db_name
+    if not await migrator.save_to_database(iter_shard_records(input_dir)):
+        return 1
+
+    report = migrator.generate_migration_report()
+    print(f"Loaded {report['total_posts_found']} posts from {input_dir}")
+    print(f"Documents saved: {report['saved_documents']} ({report['save_errors']} errors)")
+    print(f"Throughput: {report['documents_per_second']:.0f} docs/sec")
+    for error in report['save_errors_list']:
+        print(f"  - {error}")
+    return 0 if not report['save_errors'] else 1
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Migrate a WordPress export without the API server")
+    parser.add_argument('--verbose', action='store_true', help="Log every post")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_mongo_options(command):
+        command.add_argument('--mongo-url', default=os.environ.get('MONGO_URL'))
+        command.add_argument('--db-name', default=os.environ.get('DB_NAME'))
+        command.add_argument('--chunk-size', type=int, default=500, help="Documents per bulk write")
+        command.add_argument('--max-in-flight', type=int, default=4, help="Concurrent bulk writes")
+
+    run = commands.add_parser('run', help="Parse, clean, classify and map an export")
+    run.add_argument('export', help="WordPress WXR export file")
+    run.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Cleaning/classification processes")
+    run.add_argument('--batch-size', type=int, default=200, help="Export items per worker task")
+    run.add_argument('--movies', help="NDJSON movies file (e.g. mongoexport output) for the local title index")
+    run.add_argument('--no-tmdb', action='store_true', help="Only match against the local title index")
+    run.add_argument('--output-dir', help="Write NDJSON shards here instead of MongoDB")
+    run.add_argument('--shard-size', type=int, default=10000, help="Records per NDJSON shard")
+    run.add_argument('--dry-run', action='store_true', help="Run the pipeline and print stats without writing")
+    add_mongo_options(run)
+
+    load = commands.add_parser('load', help="Load NDJSON shards into MongoDB")
+    load.add_argument('input_dir', help="Directory written by the run command")
+    add_mongo_options(load)
+    return parser
+
+def main(argv: Iterable[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    # wordpress_migration logs every post at INFO, which swamps batch runs
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+    if args.command == 'load' or (args.mongo_url and not (args.output_dir or args.dry_run)):
+        if not (args.mongo_url and args.db_name):
+            logger.error("--mongo-url and --db-name (or MONGO_URL/DB_NAME) are required to write to MongoDB")
+            return 2
+
+    if args.command == 'run':
+        return asyncio.run(run_command(args))
+    return asyncio.run(load_command(args))
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -65,6 +65,7 @@ class Subscription(BaseModel):
     subscription_type: str = "weekly_digest"  # weekly_digest, instant_notifications
     email_notifications: bool = True
     whatsapp_notifications: bool = False
+    preferences: dict = {}  # industries: [Bollywood, South Indian, International], language: en | hi
     is_active: bool = True
     subscribed_at: datetime = Field(default_factory=datetime.utcnow)
     unsubscribed_at: Optional[datetime] = None
@@ -76,6 +77,7 @@ class SubscriptionCreate(BaseModel):
     subscription_type: str = "weekly_digest"
     email_notifications: bool = True
     whatsapp_notifications: bool = False
+    preferences: dict = {}
 
 class SubscriptionResponse(BaseModel):
     id: str
@@ -85,6 +87,7 @@ class SubscriptionResponse(BaseModel):
     subscription_type: str
     email_notifications: bool
     whatsapp_notifications: bool
+    preferences: dict = {}
     is_active: bool
     subscribed_at: datetime
 
@@ -123,13 +126,23 @@ class EditorialReviewCreate(BaseModel):
     read_time: str
     image: str
 
-class EditorialReviewResponse(BaseModel):
+class EditorialReviewUpdate(BaseModel):
+    title: Optional[str] = None
+    title_hindi: Optional[str] = None
+    excerpt: Optional[str] = None
+    rating: Optional[float] = None
+    tags: Optional[List[str]] = None
+    read_time: Optional[str] = None
+    image: Optional[str] = None
+    featured: Optional[bool] = None
+
+class EditorialReviewSummary(BaseModel):
+    """A review as listed; the body is only sent with the full review"""
     id: str
-    movie_id: str
+    movie_id: Optional[str] = None  # None for migrated posts published without a movie mapping
     title: str
     title_hindi: Optional[str] = None
     author: str
-    content: str
     excerpt: str
     rating: float
     tags: List[str]
@@ -140,6 +153,9 @@ class EditorialReviewResponse(BaseModel):
     created_at: datetime
     published_at: Optional[datetime] = None
 
+class EditorialReviewResponse(EditorialReviewSummary):
+    content: str
+
 # Newsletter Models
 class Newsletter(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
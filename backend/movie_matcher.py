@@ -0,0 +1,185 @@
+import heapq
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from typing import List, Dict
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fields kept in the index for each movie, matching tmdb_service.format_movie_data
+MOVIE_FIELDS = [
+    'tmdb_id', 'title', 'original_title', 'title_hindi', 'alternative_titles',
+    'year', 'rating', 'genre', 'language', 'poster', 'backdrop', 'synopsis',
+    'director', 'cast', 'trailer_url', 'industry'
+]
+
+# Words ignored when comparing titles
+STOPWORDS = {'a', 'an', 'the'}
+
+# Anything that is not a word character or Devanagari (whose vowel signs
+# are not \w) separates tokens
+NON_TITLE_CHARS = re.compile(r'[^\w\u0900-\u097F]+')
+
+# The main title of "Baahubali 2: The Conclusion" or "K.G.F - Chapter 1"
+SUBTITLE = re.compile(r'\s*(?::|\s-\s).*$')
+
+def normalize_title(title: str) -> str:
+    """Normalize a title for fuzzy comparison"""
+    if not title:
+        return ""
+    title = unicodedata.normalize('NFKC', title).lower()
+    tokens = [token for token in NON_TITLE_CHARS.sub(' ', title).split() if token not in STOPWORDS]
+    return ' '.join(tokens)
+
+def confidence_label(score: float) -> str:
+    """Map a similarity score to the confidence labels used in movie_mappings"""
+    if score >= 0.9:
+        return 'high'
+    if score >= 0.75:
+        return 'medium'
+    return 'low'
+
+class MovieTitleIndex:
+    """In-memory fuzzy title index over the movies collection"""
+
+    def __init__(self, year_boost: float = 0.1, max_candidates: int = 50):
+        self.year_boost = year_boost
+        self.max_candidates = max_candidates
+        self.movies = []
+        self.by_tmdb_id = {}
+        self.variants = []  # (normalized title, movie index)
+        self.token_index = {}  # token -> variant indexes
+
+    def __len__(self):
+        return len(self.movies)
+
+    async def load(self, db) -> int:
+        """Build the index from the movies collection"""
+        projection = {field: 1 for field in MOVIE_FIELDS}
+        projection['_id'] = 0
+        async for movie in db.movies.find({}, projection):
+            self.add(movie)
+        logger.info(f"Loaded {len(self.movies)} movies into the local title index")
+        return len(self.movies)
+
+    def add(self, movie: Dict):
+        """Add a movie to the index unless it is already present"""
+        tmdb_id = movie.get('tmdb_id')
+        if tmdb_id is not None and tmdb_id in self.by_tmdb_id:
+            return
+
+        movie_index = len(self.movies)
+        self.movies.append({field: movie[field] for field in MOVIE_FIELDS if field in movie})
+        if tmdb_id is not None:
+            self.by_tmdb_id[tmdb_id] = movie_index
+
+        for normalized in self.title_variants(movie):
+            variant_index = len(self.variants)
+            self.variants.append((normalized, movie_index))
+            for token in set(normalized.split()):
+                self.token_index.setdefault(token, []).append(variant_index)
+
+    @staticmethod
+    def title_variants(movie: Dict, main_titles: bool = False) -> List[str]:
+        """Distinct normalized titles of a movie, optionally with their subtitles cut off"""
+        titles = [movie.get('title'), movie.get('original_title'), movie.get('title_hindi')]
+        titles.extend(movie.get('alternative_titles') or [])
+        if main_titles:
+            titles.extend(SUBTITLE.sub('', title) for title in list(titles) if title)
+        variants = []
+        for title in titles:
+            normalized = normalize_title(title)
+            if normalized and normalized not in variants:
+                variants.append(normalized)
+        return variants
+
+    def boost(self, similarity: float, query_year: int = None, movie_year: int = None) -> float:
+        """Apply the year-proximity boost to a title similarity"""
+        # Reviews usually come out in the release year or the one after
+        if query_year and movie_year:
+            distance = abs(query_year - movie_year)
+            similarity += max(0.0, self.year_boost - distance * self.year_boost / 2)
+
+        return min(similarity, 1.0)
+
+    def search(self, title: str, year: int = None, limit: int = 5) -> List[Dict]:
+        """Return ranked candidates for a title as {'movie', 'score', 'matched_title'}"""
+        query = normalize_title(title)
+        if not query:
+            return []
+
+        # Only variants sharing tokens with the query are scored, and of
+        # those only the ones sharing the most, so common words stay cheap
+        overlap = {}
+        for token in set(query.split()):
+            for variant_index in self.token_index.get(token, ()):
+                overlap[variant_index] = overlap.get(variant_index, 0) + 1
+        if len(overlap) > self.max_candidates:
+            variant_indexes = heapq.nlargest(self.max_candidates, overlap, key=overlap.get)
+        else:
+            variant_indexes = overlap
+
+        # SequenceMatcher caches its analysis of the second sequence
+        matcher = SequenceMatcher(None)
+        matcher.set_seq2(query)
+
+        best = {}
+        floor = -1.0  # lowest score currently in the top `limit`
+        for variant_index in variant_indexes:
+            normalized, movie_index = self.variants[variant_index]
+            movie = self.movies[movie_index]
+            matcher.set_seq1(normalized)
+
+            # Cheap upper bounds first; a variant that cannot reach the
+            # current top `limit` never gets the full ratio computed
+            if self.boost(matcher.real_quick_ratio(), year, movie.get('year')) <= floor:
+                continue
+            if self.boost(matcher.quick_ratio(), year, movie.get('year')) <= floor:
+                continue
+
+            score = self.boost(matcher.ratio(), year, movie.get('year'))
+            if movie_index not in best or score > best[movie_index]['score']:
+                best[movie_index] = {
+                    'movie': movie,
+                    'score': round(score, 4),
+                    'matched_title': normalized
+                }
+                if len(best) >= limit:
+                    floor = heapq.nlargest(limit, (c['score'] for c in best.values()))[-1]
+
+        ranked = sorted(best.values(), key=lambda candidate: candidate['score'], reverse=True)
+        return ranked[:limit]
+
+    def rank(self, title: str, movies: List[Dict], year: int = None) -> List[Dict]:
+        """Score an external candidate list (e.g. TMDB results) the same way
+
+        Every movie is scored, not only those sharing a word with the title:
+        the provider already chose them, and "kgf" shares none with
+        "K.G.F: Chapter 1". Titles are also compared without their subtitles,
+        and spelled without spaces so acronyms match.
+        """
+        query = normalize_title(title)
+        if not query:
+            return []
+        unspaced = query.replace(' ', '')
+
+        matcher = SequenceMatcher(None)
+        matcher.set_seq2(query)
+
+        ranked = []
+        for movie in movies:
+            best = None
+            for normalized in self.title_variants(movie, main_titles=True):
+                matcher.set_seq1(normalized)
+                similarity = 1.0 if normalized.replace(' ', '') == unspaced else matcher.ratio()
+                score = self.boost(similarity, year, movie.get('year'))
+                if best is None or score > best['score']:
+                    best = {
+                        'movie': {field: movie[field] for field in MOVIE_FIELDS if field in movie},
+                        'score': round(score, 4),
+                        'matched_title': normalized
+                    }
+            if best:
+                ranked.append(best)
+        return sorted(ranked, key=lambda candidate: candidate['score'], reverse=True)
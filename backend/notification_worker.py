@@ -0,0 +1,137 @@
+"""Notification worker: drains the Mongo outbox of digests and review alerts.
+
+Run one or more of these next to the API; they coordinate through leases in
+MongoDB, so scaling out is just starting more processes. Each worker also
+runs the scheduler (weekly digest cron); a leader lock in MongoDB makes sure
+only one of them fires a schedule.
+
+    python notification_worker.py [--worker-id NAME] [--email-batch-size 500] [--once] [--no-scheduler]
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import logging
+from motor.motor_asyncio import AsyncIOMotorClient
+from services.notification_outbox import NotificationOutbox
+from services.email_service import email_service
+from services.scheduler import Scheduler
+
+logger = logging.getLogger(__name__)
+
+class NotificationWorker:
+    """Polls the outbox: expands new jobs, then sends due messages per channel"""
+
+    def __init__(
+        self,
+        outbox: NotificationOutbox,
+        email_batch_size: int = 500,
+        whatsapp_batch_size: int = 200,
+        poll_interval: float = 2.0,
+        scheduler: Scheduler = None
+    ):
+        self.outbox = outbox
+        self.scheduler = scheduler
+        self.batch_sizes = {'email': email_batch_size, 'whatsapp': whatsapp_batch_size}
+        self.poll_interval = poll_interval
+        self.stopping = asyncio.Event()
+
+    async def run_once(self) -> int:
+        """One pass over the outbox; returns how much work was done"""
+        work = 0
+        job = await self.outbox.claim_job()
+        if job:
+            await self.outbox.expand_job(job)
+            work += 1
+        for channel, batch_size in self.batch_sizes.items():
+            work += await self.outbox.process_channel(channel, batch_size)
+        work += await self.outbox.complete_jobs()
+        return work
+
+    async def run(self):
+        await self.outbox.ensure_indexes()
+        logger.info(f"Notification worker {self.outbox.worker_id} started")
+        scheduler_task = asyncio.create_task(self.scheduler.run(self.stopping)) if self.scheduler else None
+        while not self.stopping.is_set():
+            try:
+                work = await self.run_once()
+            except Exception as e:
+                logger.error(f"Notification worker pass failed: {e}")
+                work = 0
+            if not work:
+                # Idle: wait for the next poll unless asked to stop
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        if scheduler_task:
+            await scheduler_task
+        logger.info(f"Notification worker {self.outbox.worker_id} stopped")
+
+    def stop(self):
+        self.stopping.set()
+
+def create_worker(db, args=None) -> NotificationWorker:
+    worker_id = getattr(args, 'worker_id', None) or f"{socket.gethostname()}-{os.getpid()}"
+    outbox = NotificationOutbox(
+        db,
+        worker_id=worker_id,
+        lease_seconds=getattr(args, 'lease_seconds', 120),
+        max_attempts=getattr(args, 'max_attempts', 5),
+        expand_batch_size=getattr(args, 'expand_batch_size', 1000)
+    )
+    scheduler = None
+    if not getattr(args, 'no_scheduler', False) and os.environ.get('RUN_SCHEDULER', '1') == '1':
+        scheduler = Scheduler(db, owner_id=worker_id)
+    return NotificationWorker(
+        outbox,
+        email_batch_size=getattr(args, 'email_batch_size', 500),
+        whatsapp_batch_size=getattr(args, 'whatsapp_batch_size', 200),
+        poll_interval=getattr(args, 'poll_interval', 2.0),
+        scheduler=scheduler
+    )
+
+async def main(args):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    await email_service.load_unsubscribe_secret(db)
+    worker = create_worker(db, args)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        # Finish the current batch, then exit; unfinished leases expire for others
+        loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        if args.once:
+            await worker.outbox.ensure_indexes()
+            while await worker.run_once():
+                pass
+        else:
+            await worker.run()
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from pathlib import Path
+    load_dotenv(Path(__file__).parent / '.env')
+
+    parser = argparse.ArgumentParser(description="Send queued email and WhatsApp notifications")
+    parser.add_argument('--worker-id', help="Defaults to hostname-pid")
+    parser.add_argument('--email-batch-size', type=int, default=500, help="Personalizations per SendGrid request (max 1000)")
+    parser.add_argument('--whatsapp-batch-size', type=int, default=200)
+    parser.add_argument('--expand-batch-size', type=int, default=1000, help="Subscribers read per cursor batch when expanding a job")
+    parser.add_argument('--lease-seconds', type=int, default=120)
+    parser.add_argument('--max-attempts', type=int, default=5)
+    parser.add_argument('--poll-interval', type=float, default=2.0)
+    parser.add_argument('--once', action='store_true', help="Drain what is due now and exit")
+    parser.add_argument('--no-scheduler', action='store_true', help="Only send; never fire scheduled digests")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(main(args))
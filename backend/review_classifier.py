@@ -0,0 +1,118 @@
+import re
+from typing import List, Dict, Optional, Iterable, Tuple
+
+# Keywords that suggest a post is about cinema
+MOVIE_KEYWORDS = [
+    'movie', 'film', 'review', 'cinema', 'bollywood',
+    'hollywood', 'director', 'actor', 'actress', 'cast',
+    'screenplay', 'plot', 'story', 'thriller', 'drama',
+    'comedy', 'action', 'rating', 'oscar', 'box office'
+]
+
+# Patterns like "4/5", "3.5/5", "Rating: 4", in priority order, each with a
+# literal that must appear in the text for the pattern to possibly match
+RATING_PATTERNS = [
+    ('/5', r'(\d(?:\.\d)?)/5'),
+    ('rating', r'rating:?\s*(\d(?:\.\d)?)'),
+    ('out', r'(\d(?:\.\d)?)\s*out\s*of\s*5'),
+    ('star', r'(\d(?:\.\d)?)\s*stars?')
+]
+
+# Review-related words stripped from post titles, applied in order
+TITLE_PATTERNS = [
+    r'\s+review.*$',
+    r'\s+movie.*$',
+    r'\s+film.*$',
+    r'^.*review:?\s*',
+    r'\s+the\s+movie.*$',
+    r'\s*-\s*my\s+review.*$',
+    r'\s*\.\.\.*$'
+]
+
+class ReviewClassifier:
+    """Precompiled text heuristics for WordPress movie review posts"""
+
+    def __init__(self, keywords: List[str] = None, min_keywords: int = 3):
+        self.keywords = keywords or MOVIE_KEYWORDS
+        self.min_keywords = min_keywords
+
+        self.rating_patterns = [
+            (literal, re.compile(pattern)) for literal, pattern in RATING_PATTERNS
+        ]
+        self.digit_pattern = re.compile(r'\d')
+        self.title_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in TITLE_PATTERNS]
+        self.article_pattern = re.compile(r'^(a|an|the)\s+')
+
+    def count_keywords(self, text: str, stop_at: int = None) -> int:
+        """Count distinct movie keywords in lowercased text"""
+        # Plain substring tests run in C and beat a regex alternation here;
+        # the win comes from stopping once the threshold is reached
+        count = 0
+        for keyword in self.keywords:
+            if keyword in text:
+                count += 1
+                if stop_at is not None and count >= stop_at:
+                    break
+        return count
+
+    def is_movie_review(self, title: str, content: str) -> bool:
+        """Check if post is a movie review"""
+        text = (title + ' ' + content).lower()
+        return self.is_movie_review_text(text)
+
+    def is_movie_review_text(self, text: str) -> bool:
+        """Check already lowercased title + content for movie keywords"""
+        return self.count_keywords(text, stop_at=self.min_keywords) >= self.min_keywords
+
+    def extract_rating(self, content: str) -> Optional[float]:
+        """Extract rating from review content"""
+        return self.extract_rating_text(content.lower())
+
+    def extract_rating_text(self, content: str) -> Optional[float]:
+        """Extract rating from already lowercased content"""
+        # Every pattern needs a digit, so most reviews bail out here
+        if not self.digit_pattern.search(content):
+            return None
+
+        for literal, pattern in self.rating_patterns:
+            if literal not in content:
+                continue
+            match = pattern.search(content)
+            if match:
+                try:
+                    rating = float(match.group(1))
+                    return min(rating, 5.0)  # Cap at 5
+                except ValueError:
+                    continue
+
+        return None
+
+    def extract_movie_name(self, title: str) -> Optional[str]:
+        """Extract movie name from post title"""
+        movie_name = title.lower()
+        for pattern in self.title_patterns:
+            movie_name = pattern.sub('', movie_name)
+
+        movie_name = movie_name.strip()
+
+        # Clean up common words
+        movie_name = self.article_pattern.sub('', movie_name)
+
+        return movie_name if movie_name else None
+
+    def classify(self, title: str, content: str) -> Dict:
+        """Run every heuristic over one post, lowercasing it once"""
+        title_lower = title.lower()
+        content_lower = content.lower()
+        return {
+            'is_movie_review': self.is_movie_review_text(title_lower + ' ' + content_lower),
+            'rating': self.extract_rating_text(content_lower),
+            'movie_name': self.extract_movie_name(title)
+        }
+
+    def classify_batch(self, posts: Iterable[Tuple[str, str]]) -> List[Dict]:
+        """Classify many (title, content) pairs at once"""
+        return [self.classify(title, content) for title, content in posts]
+
+# Global classifier instance
+review_classifier = ReviewClassifier()
@@ -0,0 +1,269 @@
+import argparse
+import asyncio
+import os
+import zlib
+from typing import List, Dict, Optional, Tuple
+import logging
+
+import bson
+from bson import Binary
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReplaceOne, UpdateOne
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, zlib is always available
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Side collection holding compressed bodies, keyed by review id. A migrated
+# review and the editorial review it is approved into share the same id, so
+# approval never has to copy the body.
+BODY_COLLECTION = 'review_bodies'
+
+# Collections whose documents may keep their body in BODY_COLLECTION
+REVIEW_COLLECTIONS = ['migrated_reviews', 'editorial_reviews']
+
+class ReviewBodyStore:
+    """Optional compressed storage for long review bodies"""
+
+    def __init__(self, mode: str = None, codec: str = None, level: int = None, min_length: int = 512):
+        # 'inline' keeps content in the review document, 'compressed' moves it
+        # to BODY_COLLECTION. Reads handle both, so the mode can be switched.
+        self.mode = mode or os.getenv('REVIEW_BODY_STORAGE', 'inline')
+        self.codec = codec or os.getenv('REVIEW_BODY_CODEC') or ('zstd' if zstandard else 'zlib')
+        if self.codec == 'zstd' and zstandard is None:
+            logger.warning("zstandard is not installed, compressing review bodies with zlib")
+            self.codec = 'zlib'
+        self.level = level if level is not None else (10 if self.codec == 'zstd' else 6)
+        self.min_length = min_length  # shorter bodies stay inline
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode == 'compressed'
+
+    def compress(self, text: str) -> bytes:
+        data = text.encode('utf-8')
+        if self.codec == 'zstd':
+            return zstandard.ZstdCompressor(level=self.level).compress(data)
+        return zlib.compress(data, self.level)
+
+    def decompress(self, codec: str, data: bytes) -> str:
+        if codec == 'zstd':
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to read zstd compressed review bodies")
+            return zstandard.ZstdDecompressor().decompress(data).decode('utf-8')
+        return zlib.decompress(data).decode('utf-8')
+
+    def body_document(self, review_id: str, content: str) -> Dict:
+        compressed = self.compress(content)
+        return {
+            '_id': review_id,
+            'codec': self.codec,
+            'body': Binary(compressed),
+            'length': len(content.encode('utf-8')),  # bytes, comparable with compressed_length
+            'compressed_length': len(compressed)
+        }
+
+    def split(self, review: Dict, force: bool = False) -> Tuple[Dict, Optional[Dict]]:
+        """Return (review without content, body document) when the body should be compressed"""
+        content = review.get('content')
+        if not (self.enabled or force) or content is None or len(content) < self.min_length:
+            return review, None
+        stripped = {key: value for key, value in review.items() if key != 'content'}
+        stripped['content_storage'] = 'compressed'
+        return stripped, self.body_document(review['id'], content)
+
+    async def save_bodies(self, db, bodies: List[Dict]):
+        if bodies:
+            await db[BODY_COLLECTION].bulk_write(
+                [ReplaceOne({'_id': body['_id']}, body, upsert=True) for body in bodies],
+                ordered=False
+            )
+
+    async def hydrate(self, db, reviews: List[Dict]) -> List[Dict]:
+        """Fill in content for reviews whose body is stored compressed, in one query"""
+        missing = [
+            review for review in reviews
+            if review.get('content_storage') == 'compressed' and review.get('content') is None
+        ]
+        if not missing:
+            return reviews
+
+        bodies = {}
+        async for body in db[BODY_COLLECTION].find({'_id': {'$in': [review['id'] for review in missing]}}):
+            bodies[body['_id']] = self.decompress(body['codec'], body['body'])
+        for review in missing:
+            review['content'] = bodies.get(review['id'], '')
+            if review['id'] not in bodies:
+                logger.warning(f"Compressed body missing for review {review['id']}")
+        return reviews
+
+    async def delete_orphans(self, db) -> int:
+        """Remove bodies no longer referenced by any review collection"""
+        referenced = set()
+        for collection in REVIEW_COLLECTIONS:
+            referenced.update(await db[collection].distinct('id', {'content_storage': 'compressed'}))
+        orphans = [
+            body['_id'] async for body in db[BODY_COLLECTION].find({}, {'_id': 1})
+            if body['_id'] not in referenced
+        ]
+        for start in range(0, len(orphans), 1000):
+            await db[BODY_COLLECTION].delete_many({'_id': {'$in': orphans[start:start + 1000]}})
+        return len(orphans)
+
+    async def compress_collection(self, db, collection: str, batch_size: int = 500, dry_run: bool = False) -> Dict:
+        """Move inline bodies of existing documents into BODY_COLLECTION"""
+        stats = {
+            'collection': collection,
+            'documents': 0,
+            'compressed': 0,
+            'content_bytes': 0,
+            'compressed_bytes': 0,
+            'document_bytes_before': 0,
+            'document_bytes_after': 0
+        }
+        batch = []
+
+        async def flush():
+            bodies = [body for _, body in batch]
+            if not dry_run:
+                await self.save_bodies(db, bodies)
+                # Bodies are written first so an interrupted run never leaves
+                # a review without its content
+                await db[collection].bulk_write([
+                    UpdateOne(
+                        {'_id': review['_id']},
+                        {'$unset': {'content': ''}, '$set': {'content_storage': 'compressed'}}
+                    )
+                    for review, _ in batch
+                ], ordered=False)
+            batch.clear()
+
+        async for review in db[collection].find({'content': {'$type': 'string'}}):
+            stats['documents'] += 1
+            before = len(bson.encode(review))
+            stats['document_bytes_before'] += before
+
+            stripped, body = self.split(review, force=True)
+            if body is None:
+                stats['document_bytes_after'] += before
+                continue
+
+            stats['compressed'] += 1
+            stats['content_bytes'] += body['length']
+            stats['compressed_bytes'] += body['compressed_length']
+            stats['document_bytes_after'] += len(bson.encode(stripped))
+            batch.append((review, body))
+            if len(batch) >= batch_size:
+                await flush()
+
+        if batch:
+            await flush()
+
+        stats['compression_ratio'] = round(stats['content_bytes'] / stats['compressed_bytes'], 2) if stats['compressed_bytes'] else 0
+        stats['bytes_saved'] = stats['content_bytes'] - stats['compressed_bytes']
+        # What list queries now read per document versus before
+        stats['avg_document_bytes_before'] = stats['document_bytes_before'] // stats['documents'] if stats['documents'] else 0
+        stats['avg_document_bytes_after'] = stats['document_bytes_after'] // stats['documents'] if stats['documents'] else 0
+        return stats
+
+    async def inline_collection(self, db, collection: str, batch_size: int = 500) -> int:
+        """Move compressed bodies back into their review documents"""
+        restored = 0
+        cursor = db[collection].find({'content_storage': 'compressed'}, {'_id': 1, 'id': 1, 'content_storage': 1})
+        batch = []
+        async for review in cursor:
+            batch.append(review)
+            if len(batch) >= batch_size:
+                restored += await self.restore_batch(db, collection, batch)
+                batch = []
+        if batch:
+            restored += await self.restore_batch(db, collection, batch)
+        return restored
+
+    async def restore_batch(self, db, collection: str, reviews: List[Dict]) -> int:
+        await self.hydrate(db, reviews)
+        await db[collection].bulk_write([
+            UpdateOne(
+                {'_id': review['_id']},
+                {'$set': {'content': review['content']}, '$unset': {'content_storage': ''}}
+            )
+            for review in reviews
+        ], ordered=False)
+        return len(reviews)
+
+async def collection_sizes(db, collection: str) -> Dict:
+    """Storage figures from collStats (storage shrinks only after compaction)"""
+    try:
+        stats = await db.command('collStats', collection)
+    except Exception as e:
+        logger.warning(f"collStats failed for {collection}: {e}")
+        return {}
+    return {
+        'count': stats.get('count', 0),
+        'size': stats.get('size', 0),
+        'avg_obj_size': stats.get('avgObjSize', 0),
+        'storage_size': stats.get('storageSize', 0)
+    }
+
+# Global review body store instance
+review_body_store = ReviewBodyStore()
+
+async def run_storage_migration(args) -> Dict:
+    client = AsyncIOMotorClient(args.mongo_url)
+    db = client[args.db_name]
+    store = ReviewBodyStore(mode='compressed', codec=args.codec)
+    report = {'codec': store.codec, 'collections': {}}
+    try:
+        for collection in args.collections:
+            before = await collection_sizes(db, collection)
+            if args.command == 'compress':
+                result = await store.compress_collection(db, collection, args.batch_size, args.dry_run)
+            else:
+                result = {'restored': await store.inline_collection(db, collection, args.batch_size)}
+            result['collstats_before'] = before
+            result['collstats_after'] = await collection_sizes(db, collection)
+            report['collections'][collection] = result
+        if args.command == 'inline' and not args.dry_run:
+            report['orphaned_bodies_removed'] = await store.delete_orphans(db)
+        report['body_collection'] = await collection_sizes(db, BODY_COLLECTION)
+    finally:
+        client.close()
+    return report
+
+def print_storage_report(report: Dict):
+    print(f"\n=== REVIEW BODY STORAGE ({report['codec']}) ===")
+    for collection, result in report['collections'].items():
+        print(f"\n{collection}:")
+        if 'restored' in result:
+            print(f"  Bodies moved back inline: {result['restored']}")
+        else:
+            print(f"  Documents scanned: {result['documents']} ({result['compressed']} compressed)")
+            print(f"  Body bytes: {result['content_bytes']} -> {result['compressed_bytes']} "
+                  f"({result['compression_ratio']}x, {result['bytes_saved']} saved)")
+            print(f"  Avg document read by list queries: {result['avg_document_bytes_before']} -> "
+                  f"{result['avg_document_bytes_after']} bytes")
+        before, after = result['collstats_before'], result['collstats_after']
+        if before and after:
+            print(f"  collStats size: {before['size']} -> {after['size']} bytes "
+                  f"(storageSize {before['storage_size']} -> {after['storage_size']}, run compact to reclaim)")
+    if report.get('body_collection'):
+        print(f"\n{BODY_COLLECTION}: {report['body_collection']['count']} bodies, "
+              f"{report['body_collection']['size']} bytes")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move review bodies between inline and compressed storage")
+    parser.add_argument('command', choices=['compress', 'inline'])
+    parser.add_argument('--mongo-url', default=os.environ.get('MONGO_URL'))
+    parser.add_argument('--db-name', default=os.environ.get('DB_NAME'))
+    parser.add_argument('--collections', nargs='+', default=REVIEW_COLLECTIONS, choices=REVIEW_COLLECTIONS)
+    parser.add_argument('--codec', choices=['zstd', 'zlib'])
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--dry-run', action='store_true', help="compress only: report the savings without writing")
+    args = parser.parse_args()
+    if not (args.mongo_url and args.db_name):
+        parser.error("--mongo-url and --db-name (or MONGO_URL/DB_NAME) are required")
+
+    print_storage_report(asyncio.run(run_storage_migration(args)))
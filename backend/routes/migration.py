@@ -1,10 +1,15 @@
 from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import List, Dict
+from typing import List, Dict, Optional, Union
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
 import os
 from datetime import datetime
 import logging
 from wordpress_migration import migrate_wordpress_posts, WordPressMigrator
+from review_storage import review_body_store
+from services.stats import increment, get_counters, reconcile_counters
+from services.review_cache import review_cache
+from services.review_search import review_search
 from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
@@ -22,12 +27,55 @@ class MigrationStatus(BaseModel):
 class ReviewApproval(BaseModel):
     review_id: str
     approved: bool
-    movie_id: str = None
+    # The dashboard sends back the post's TMDB id, a number
+    movie_id: Optional[Union[str, int]] = None
     title: str = None
     excerpt: str = None
     rating: float = None
     tags: List[str] = []
 
+class BulkReviewApproval(BaseModel):
+    approved: bool = True
+    review_ids: List[str] = []
+    # Used when review_ids is empty: select migrated drafts by mapping quality
+    mapped_only: bool = True
+    min_confidence: Optional[float] = None
+    # Near duplicates are left for an editor to look at unless asked for
+    include_duplicates: bool = False
+    batch_size: int = 500
+
+def build_editorial_review(migrated_review: Dict, approval: ReviewApproval = None) -> Dict:
+    """Build the published editorial review for a migrated post"""
+    # Migrated posts carry the TMDB id as an int and may have no rating at all
+    movie_id = (approval and approval.movie_id) or migrated_review.get('movie_id')
+    rating = (approval and approval.rating) or migrated_review.get('rating')
+    return {
+        "id": migrated_review['id'],
+        "movie_id": str(movie_id) if movie_id is not None else None,
+        "title": (approval and approval.title) or migrated_review['title'],
+        "author": migrated_review['author'],
+        # Compressed bodies live in review_bodies under the same id and are shared
+        "content": migrated_review.get('content'),
+        "content_storage": migrated_review.get('content_storage', 'inline'),
+        "excerpt": (approval and approval.excerpt) or migrated_review['excerpt'],
+        "rating": rating if rating is not None else 4.0,
+        "tags": (approval and approval.tags) or migrated_review['tags'],
+        "read_time": migrated_review['read_time'],
+        "image": migrated_review['image'],
+        "status": "published",
+        "featured": False,
+        "created_at": migrated_review['migrated_at'],
+        "published_at": migrated_review['published_at'],
+        "updated_at": datetime.utcnow(),
+        "migrated_from_wordpress": True,
+        "original_url": migrated_review.get('original_url')
+    }
+
+async def supports_transactions(db) -> bool:
+    """Transactions need a replica set or sharded cluster"""
+    hello = await db.command('hello')
+    return 'setName' in hello or hello.get('msg') == 'isdbgrid'
+
 @router.post("/start-wordpress-migration")
 async def start_wordpress_migration(background_tasks: BackgroundTasks):
     """Start WordPress migration process"""
@@ -66,10 +114,11 @@ async def get_migration_status():
         client = AsyncIOMotorClient(mongo_url)
         db = client[os.environ['DB_NAME']]
         
-        # Count migrated posts
-        total_posts = await db.migrated_reviews.count_documents({})
-        mapped_movies = await db.movie_mappings.count_documents({})
-        failed_mappings = await db.failed_mappings.count_documents({})
+        # Maintained counters rather than collection scans on every poll
+        counters = (await get_counters(db, ['migration']))['migration']
+        total_posts = counters['migrated_reviews']
+        mapped_movies = counters['movie_mappings']
+        failed_mappings = counters['failed_mappings']
         
         return MigrationStatus(
             status="completed" if total_posts > 0 else "not_started",
@@ -85,7 +134,12 @@ async def get_migration_status():
         raise HTTPException(status_code=500, detail="Failed to get migration status")
 
 @router.get("/preview-posts")
-async def get_migrated_posts_preview(limit: int = 20, skip: int = 0):
+async def get_migrated_posts_preview(
+    limit: int = 20,
+    skip: int = 0,
+    collapse_duplicates: bool = False,
+    include_content: bool = False
+):
     """Get preview of migrated posts for review"""
     try:
         # MongoDB connection
@@ -93,17 +147,41 @@ async def get_migrated_posts_preview(limit: int = 20, skip: int = 0):
         client = AsyncIOMotorClient(mongo_url)
         db = client[os.environ['DB_NAME']]
         
+        # When collapsing, only cluster representatives are listed
+        query = {"duplicate_of": None} if collapse_duplicates else {}
+        
         # Get migrated posts
-        posts = await db.migrated_reviews.find().skip(skip).limit(limit).to_list(limit)
+        projection = None if include_content else {"content": 0}
+        posts = await db.migrated_reviews.find(query, projection).skip(skip).limit(limit).to_list(limit)
+        if include_content:
+            await review_body_store.hydrate(db, posts)
         
         # Convert ObjectId to string
         for post in posts:
             if '_id' in post:
                 post['_id'] = str(post['_id'])
         
+        if collapse_duplicates and posts:
+            # Attach each representative's near duplicates in one query
+            duplicates = await db.migrated_reviews.find(
+                {"duplicate_of": {"$in": [post['id'] for post in posts]}},
+                {"_id": 0, "id": 1, "title": 1, "duplicate_of": 1, "similarity": 1, "original_url": 1}
+            ).to_list(None)
+            
+            by_representative = {}
+            for duplicate in duplicates:
+                by_representative.setdefault(duplicate['duplicate_of'], []).append(duplicate)
+            for post in posts:
+                post['duplicates'] = by_representative.get(post['id'], [])
+        
+        if collapse_duplicates:
+            total = await db.migrated_reviews.count_documents(query)
+        else:
+            total = (await get_counters(db, ['migration']))['migration']['migrated_reviews']
+        
         return {
             "posts": posts,
-            "total": await db.migrated_reviews.count_documents({}),
+            "total": total,
             "skip": skip,
             "limit": limit
         }
@@ -112,6 +190,56 @@ async def get_migrated_posts_preview(limit: int = 20, skip: int = 0):
         logger.error(f"Error getting posts preview: {e}")
         raise HTTPException(status_code=500, detail="Failed to get posts preview")
 
+@router.get("/duplicate-clusters")
+async def get_duplicate_clusters(limit: int = 20, skip: int = 0):
+    """Get groups of near-duplicate migrated posts"""
+    try:
+        # MongoDB connection
+        mongo_url = os.environ['MONGO_URL']
+        client = AsyncIOMotorClient(mongo_url)
+        db = client[os.environ['DB_NAME']]
+        
+        clusters = await db.migrated_reviews.aggregate([
+            {"$match": {"duplicate_of": {"$ne": None}}},
+            {"$group": {
+                "_id": "$cluster_id",
+                "duplicates": {"$push": {
+                    "id": "$id",
+                    "title": "$title",
+                    "similarity": "$similarity",
+                    "original_url": "$original_url"
+                }},
+                "size": {"$sum": 1}
+            }},
+            {"$sort": {"size": -1}},
+            {"$skip": skip},
+            {"$limit": limit},
+            {"$lookup": {
+                "from": "migrated_reviews",
+                "localField": "_id",
+                "foreignField": "id",
+                "pipeline": [{"$project": {"_id": 0, "id": 1, "title": 1, "original_url": 1, "tmdb_id": 1}}],
+                "as": "representative"
+            }},
+            {"$project": {
+                "_id": 0,
+                "cluster_id": "$_id",
+                "representative": {"$first": "$representative"},
+                "duplicates": 1,
+                "size": 1
+            }}
+        ]).to_list(limit)
+        
+        return {
+            "clusters": clusters,
+            "skip": skip,
+            "limit": limit
+        }
+        
+    except Exception as e:
+        logger.error(f"Error getting duplicate clusters: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get duplicate clusters")
+
 @router.get("/failed-mappings")
 async def get_failed_mappings():
     """Get posts that failed TMDB mapping"""
@@ -153,31 +281,21 @@ async def approve_review(approval: ReviewApproval):
         
         if approval.approved:
             # Create final review document
-            review_data = {
-                "id": migrated_review['id'],
-                "movie_id": approval.movie_id or migrated_review.get('movie_id'),
-                "title": approval.title or migrated_review['title'],
-                "author": migrated_review['author'],
-                "content": migrated_review['content'],
-                "excerpt": approval.excerpt or migrated_review['excerpt'],
-                "rating": approval.rating or migrated_review.get('rating', 4.0),
-                "tags": approval.tags or migrated_review['tags'],
-                "read_time": migrated_review['read_time'],
-                "image": migrated_review['image'],
-                "status": "published",
-                "featured": False,
-                "created_at": migrated_review['migrated_at'],
-                "published_at": migrated_review['published_at'],
-                "updated_at": datetime.utcnow(),
-                "migrated_from_wordpress": True,
-                "original_url": migrated_review.get('original_url')
-            }
+            review_data = build_editorial_review(migrated_review, approval)
             
             # Insert into editorial_reviews collection
             await db.editorial_reviews.insert_one(review_data)
             
             # Remove from migrated_reviews
-            await db.migrated_reviews.delete_one({"id": approval.review_id})
+            result = await db.migrated_reviews.delete_one({"id": approval.review_id})
+            # The review may have been requested (and cached as missing) before it was published
+            await review_cache.invalidate(db, [approval.review_id])
+            review_search.refresh_in_background(db)
+            await increment(db, 'reviews', {'published': 1})
+            await increment(db, 'migration', {
+                'migrated_reviews': -result.deleted_count,
+                'rejected_reviews': -result.deleted_count if migrated_review.get('status') == 'rejected' else 0
+            })
             
             return {
                 "status": "approved",
@@ -186,10 +304,13 @@ async def approve_review(approval: ReviewApproval):
             }
         else:
             # Mark as rejected
-            await db.migrated_reviews.update_one(
+            previous = await db.migrated_reviews.find_one_and_update(
                 {"id": approval.review_id},
-                {"$set": {"status": "rejected", "rejected_at": datetime.utcnow()}}
+                {"$set": {"status": "rejected", "rejected_at": datetime.utcnow()}},
+                projection={"_id": 0, "status": 1}
             )
+            if previous and previous.get('status') != 'rejected':
+                await increment(db, 'migration', {'rejected_reviews': 1})
             
             return {
                 "status": "rejected",
@@ -203,6 +324,116 @@ async def approve_review(approval: ReviewApproval):
         logger.error(f"Error approving review: {e}")
         raise HTTPException(status_code=500, detail="Failed to approve review")
 
+@router.post("/bulk-approve")
+async def bulk_approve_reviews(bulk_approval: BulkReviewApproval):
+    """Approve or reject many migrated reviews in server-side batches"""
+    try:
+        # MongoDB connection
+        mongo_url = os.environ['MONGO_URL']
+        client = AsyncIOMotorClient(mongo_url)
+        db = client[os.environ['DB_NAME']]
+        
+        if bulk_approval.review_ids:
+            review_ids = list(dict.fromkeys(bulk_approval.review_ids))
+        else:
+            query = {"status": "draft"}
+            if bulk_approval.mapped_only:
+                query["tmdb_id"] = {"$ne": None}
+            if bulk_approval.min_confidence is not None:
+                query["mapping_confidence"] = {"$gte": bulk_approval.min_confidence}
+            if not bulk_approval.include_duplicates:
+                query["duplicate_of"] = None
+            review_ids = [
+                doc['id'] async for doc in db.migrated_reviews.find(query, {"_id": 0, "id": 1})
+            ]
+        
+        use_transactions = bulk_approval.approved and await supports_transactions(db)
+        batch_size = max(1, bulk_approval.batch_size)
+        results = []
+        errors = []
+        
+        for start in range(0, len(review_ids), batch_size):
+            batch = review_ids[start:start + batch_size]
+            try:
+                if bulk_approval.approved:
+                    outcomes = await approve_batch(client, db, batch, use_transactions)
+                else:
+                    outcomes = await reject_batch(db, batch)
+            except Exception as e:
+                # Earlier batches are committed; report this one and carry on
+                logger.error(f"Bulk approval batch of {len(batch)} reviews failed: {e}")
+                errors.append({"review_ids": batch, "error": str(e)})
+                outcomes = {review_id: "error" for review_id in batch}
+            results.extend({"review_id": review_id, "status": outcomes[review_id]} for review_id in batch)
+        
+        summary = {}
+        for result in results:
+            summary[result['status']] = summary.get(result['status'], 0) + 1
+        
+        return {
+            "status": "partial" if errors else "success",
+            "message": f"Processed {len(results)} migrated reviews",
+            "summary": summary,
+            "results": results,
+            "errors": errors
+        }
+        
+    except Exception as e:
+        logger.error(f"Error bulk approving reviews: {e}")
+        raise HTTPException(status_code=500, detail="Failed to bulk approve reviews")
+
+async def approve_batch(client, db, review_ids: List[str], use_transactions: bool) -> Dict[str, str]:
+    """Move one batch of migrated reviews into editorial_reviews"""
+    migrated = await db.migrated_reviews.find({"id": {"$in": review_ids}}).to_list(None)
+    outcomes = {review_id: "not_found" for review_id in review_ids}
+    if not migrated:
+        return outcomes
+    
+    # Upserting on id means a batch interrupted between the two writes can
+    # simply be re-run without creating duplicates
+    operations = [
+        UpdateOne({"id": review['id']}, {"$setOnInsert": build_editorial_review(review)}, upsert=True)
+        for review in migrated
+    ]
+    moved_ids = [review['id'] for review in migrated]
+    rejected = sum(1 for review in migrated if review.get('status') == 'rejected')
+    
+    if use_transactions:
+        async with await client.start_session() as session:
+            async with session.start_transaction():
+                published = await db.editorial_reviews.bulk_write(operations, ordered=False, session=session)
+                deleted = await db.migrated_reviews.delete_many({"id": {"$in": moved_ids}}, session=session)
+    else:
+        published = await db.editorial_reviews.bulk_write(operations, ordered=False)
+        deleted = await db.migrated_reviews.delete_many({"id": {"$in": moved_ids}})
+    
+    await review_cache.invalidate(db, moved_ids)
+    review_search.refresh_in_background(db)
+    await increment(db, 'reviews', {'published': published.upserted_count})
+    await increment(db, 'migration', {
+        'migrated_reviews': -deleted.deleted_count,
+        'rejected_reviews': -min(rejected, deleted.deleted_count)
+    })
+    
+    for review_id in moved_ids:
+        outcomes[review_id] = "approved"
+    return outcomes
+
+async def reject_batch(db, review_ids: List[str]) -> Dict[str, str]:
+    """Mark one batch of migrated reviews as rejected"""
+    found = await db.migrated_reviews.distinct("id", {"id": {"$in": review_ids}})
+    newly_rejected = await db.migrated_reviews.count_documents({"id": {"$in": found}, "status": {"$ne": "rejected"}})
+    await db.migrated_reviews.update_many(
+        {"id": {"$in": found}},
+        {"$set": {"status": "rejected", "rejected_at": datetime.utcnow()}}
+    )
+    await increment(db, 'migration', {'rejected_reviews': newly_rejected})
+    found = set(found)
+    return {
+        review_id: "rejected" if review_id in found else "not_found"
+        for review_id in review_ids
+    }
+
 @router.post("/manual-movie-mapping")
 async def create_manual_movie_mapping(
     post_id: str,
@@ -232,6 +463,7 @@ async def create_manual_movie_mapping(
                     "tmdb_id": tmdb_id,
                     "tmdb_data": movie_data,
                     "image": movie_data.get('poster'),
+                    "mapping_confidence": 1.0,
                     "manual_mapping": True
                 }
             }
@@ -250,7 +482,8 @@ async def create_manual_movie_mapping(
         await db.movie_mappings.insert_one(mapping_data)
         
         # Remove from failed mappings if exists
-        await db.failed_mappings.delete_one({"post_id": post_id})
+        result = await db.failed_mappings.delete_one({"post_id": post_id})
+        await increment(db, 'migration', {'movie_mappings': 1, 'failed_mappings': -result.deleted_count})
         
         return {
             "status": "success",
@@ -278,6 +511,8 @@ async def clear_migration_data():
         await db.migrated_reviews.delete_many({})
         await db.movie_mappings.delete_many({})
         await db.failed_mappings.delete_many({})
+        await review_body_store.delete_orphans(db)
+        await reconcile_counters(db, ['migration'])
         
         return {
             "status": "success",
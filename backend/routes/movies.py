@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
+import asyncio
 import os
 from datetime import datetime
 import logging
@@ -9,10 +10,17 @@ import sys
 sys.path.append('/app/backend')
 from models import MovieResponse, MovieCreate
 from tmdb_service import tmdb_service
+from services.movie_suggest import movie_suggest
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
 
 logger = logging.getLogger(__name__)
 
+# Shared connection for the typeahead, which is hit on every keystroke
+mongo_url = os.environ['MONGO_URL']
+client = AsyncIOMotorClient(mongo_url)
+db = client[os.environ['DB_NAME']]
+
 router = APIRouter(prefix="/movies", tags=["movies"])
 
 @router.get("/featured", response_model=List[MovieResponse])
@@ -49,6 +57,7 @@ async def get_featured_movies():
                 # Insert new movie
                 result = await db.movies.insert_one(movie_data)
                 movie_data['id'] = str(result.inserted_id)
+                movie_suggest.add(movie_data)
                 featured_movies.append(MovieResponse(**movie_data))
         
         return featured_movies
@@ -57,38 +66,64 @@ async def get_featured_movies():
         logger.error(f"Error fetching featured movies: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch featured movies")
 
+@router.get("/suggest")
+async def suggest_movies(
+    q: str = Query(..., max_length=100, description="Partly typed title, romanized or Devanagari"),
+    limit: int = Query(8, ge=1, le=20, description="Number of suggestions")
+):
+    """Autocomplete movie titles from the local index, without calling TMDB"""
+    try:
+        return await movie_suggest.lookup(db, q, limit)
+        
+    except Exception as e:
+        logger.error(f"Error suggesting movies for '{q}': {e}")
+        raise HTTPException(status_code=500, detail="Failed to suggest movies")
+
 @router.get("/search", response_model=List[MovieResponse])
 async def search_movies(
     q: str = Query(..., description="Search query"),
     language: str = Query("en-US", description="Language code"),
     limit: int = Query(20, le=50, description="Number of movies to fetch")
 ):
-    """Search movies by title"""
+    """Search movies by title on TMDB; typeahead uses /movies/suggest, this runs on submit"""
     try:
         # MongoDB connection
         mongo_url = os.environ['MONGO_URL']
         client = AsyncIOMotorClient(mongo_url)
         db = client[os.environ['DB_NAME']]
         
-        movies = tmdb_service.search_movies(query=q, language=language)
+        # The TMDB client is blocking; keep it off the event loop
+        movies = await asyncio.to_thread(tmdb_service.search_movies, query=q, language=language)
         
         if not movies:
             return []
         
-        # Cache and return search results
+        # Cache new results in one round trip, keeping movies already cached as they are
+        now = datetime.utcnow()
+        movies = movies[:limit]
+        result = await db.movies.bulk_write([
+            UpdateOne(
+                {"tmdb_id": movie_data['tmdb_id']},
+                {"$setOnInsert": {**movie_data, 'created_at': now, 'updated_at': now}},
+                upsert=True
+            )
+            for movie_data in movies
+        ], ordered=False)
+        
+        cached = {
+            movie['tmdb_id']: movie
+            for movie in await db.movies.find({"tmdb_id": {"$in": [m['tmdb_id'] for m in movies]}}).to_list(None)
+        }
+        if result.upserted_count:
+            # Newly cached movies are suggested from the next keystroke
+            movie_suggest.add_many([cached[movies[index]['tmdb_id']] for index in result.upserted_ids])
+        
         search_results = []
-        for movie_data in movies[:limit]:
-            movie_data['created_at'] = datetime.utcnow()
-            movie_data['updated_at'] = datetime.utcnow()
-            
-            existing_movie = await db.movies.find_one({"tmdb_id": movie_data['tmdb_id']})
-            if existing_movie:
-                existing_movie['id'] = str(existing_movie.pop('_id'))
-                search_results.append(MovieResponse(**existing_movie))
-            else:
-                result = await db.movies.insert_one(movie_data)
-                movie_data['id'] = str(result.inserted_id)
-                search_results.append(MovieResponse(**movie_data))
+        for movie_data in movies:
+            movie = cached.get(movie_data['tmdb_id'])
+            if movie:
+                movie['id'] = str(movie.pop('_id'))
+                search_results.append(MovieResponse(**movie))
         
         return search_results
         
@@ -100,9 +135,15 @@ async def search_movies(
 async def get_movie_details(movie_id: str):
     """Get detailed movie information"""
     try:
+        # MongoDB connection
+        mongo_url = os.environ['MONGO_URL']
+        client = AsyncIOMotorClient(mongo_url)
+        db = client[os.environ['DB_NAME']]
+        
         # Try to find movie in database first
         movie = await db.movies.find_one({"id": movie_id})
         if movie:
+            movie['id'] = str(movie.pop('_id'))
             return MovieResponse(**movie)
         
         # Try finding by TMDB ID
@@ -110,6 +151,7 @@ async def get_movie_details(movie_id: str):
             tmdb_id = int(movie_id)
             movie = await db.movies.find_one({"tmdb_id": tmdb_id})
             if movie:
+                movie['id'] = str(movie.pop('_id'))
                 return MovieResponse(**movie)
             
             # Fetch from TMDB if not in database
@@ -120,6 +162,7 @@ async def get_movie_details(movie_id: str):
                 
                 result = await db.movies.insert_one(movie_data)
                 movie_data['id'] = str(result.inserted_id)
+                movie_suggest.add(movie_data)
                 return MovieResponse(**movie_data)
                 
         except ValueError:
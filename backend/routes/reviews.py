@@ -1,8 +1,13 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from models import EditorialReviewResponse
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import List, Optional
+from models import EditorialReviewResponse, EditorialReviewSummary, EditorialReviewUpdate
+from review_storage import review_body_store
+from services.review_cache import review_cache
+from services.review_search import review_search
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
 import os
+import time
 from datetime import datetime
 import logging
 
@@ -15,12 +20,13 @@ db = client[os.environ['DB_NAME']]
 
 router = APIRouter(prefix="/reviews", tags=["reviews"])
 
-@router.get("/latest", response_model=List[EditorialReviewResponse])
+@router.get("/latest", response_model=List[EditorialReviewSummary])
 async def get_latest_reviews(limit: int = 10):
     """Get latest published editorial reviews"""
     try:
+        # Bodies are only read, and decompressed, for GET /reviews/{id}
         reviews = await db.editorial_reviews.find(
-            {"status": "published"}
+            {"status": "published"}, {"content": 0}
         ).sort("published_at", -1).limit(limit).to_list(limit)
         
         if not reviews:
@@ -59,10 +65,92 @@ async def get_latest_reviews(limit: int = 10):
                     "published_at": datetime.utcnow()
                 }
             ]
-            return [EditorialReviewResponse(**review) for review in mock_reviews]
+            return [EditorialReviewSummary(**review) for review in mock_reviews]
         
-        return [EditorialReviewResponse(**review) for review in reviews]
+        return [EditorialReviewSummary(**review) for review in reviews]
         
     except Exception as e:
         logger.error(f"Error fetching latest reviews: {e}")
-        raise HTTPException(status_code=500, detail="Failed to fetch latest reviews")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to fetch latest reviews")
+
+@router.get("/search")
+async def search_reviews(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=50),
+    skip: int = Query(0, ge=0, le=1000)
+):
+    """Search published reviews by title, Hindi title, excerpt, body, tags and author"""
+    try:
+        started = time.perf_counter()
+        result = await review_search.query(db, q, limit, skip)
+        return {
+            "query": q,
+            **result,
+            "skip": skip,
+            "limit": limit,
+            "took_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+    
+    except Exception as e:
+        logger.error(f"Error searching reviews for {q!r}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to search reviews")
+
+async def render_review(review_id: str) -> Optional[bytes]:
+    """Serialized detail response of a published review, or None"""
+    review = await db.editorial_reviews.find_one({"id": review_id, "status": "published"}, {"_id": 0})
+    if review is None:
+        return None
+    await review_body_store.hydrate(db, [review])
+    return EditorialReviewResponse(**review).model_dump_json().encode()
+
+@router.get("/{review_id}", response_model=EditorialReviewResponse)
+async def get_review(review_id: str, request: Request):
+    """Get a published editorial review, served from the review cache"""
+    try:
+        cached = await review_cache.get(db, review_id, lambda: render_review(review_id))
+    except Exception as e:
+        logger.error(f"Error fetching review {review_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch review")
+    
+    if cached is None:
+        raise HTTPException(status_code=404, detail="Review not found")
+    
+    body, etag = cached
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=60"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.patch("/{review_id}", response_model=EditorialReviewResponse)
+async def update_review(review_id: str, update: EditorialReviewUpdate):
+    """Edit or feature a published review (admin endpoint)"""
+    try:
+        changes = update.dict(exclude_none=True)
+        if not changes:
+            raise HTTPException(status_code=400, detail="Nothing to update")
+        changes["updated_at"] = datetime.utcnow()
+        
+        review = await db.editorial_reviews.find_one_and_update(
+            {"id": review_id},
+            {"$set": changes},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        if review is None:
+            raise HTTPException(status_code=404, detail="Review not found")
+        await review_cache.invalidate(db, [review_id])
+        review_search.refresh_in_background(db)
+        
+        await review_body_store.hydrate(db, [review])
+        return EditorialReviewResponse(**review)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error updating review {review_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to update review")
+
+@router.get("/cache/stats")
+async def get_review_cache_stats():
+    """Review cache hit rate and size in this worker (admin endpoint)"""
+    return review_cache.report()
@@ -1,11 +1,19 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Query
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Request
+from typing import List, Optional
 from models import (
     SubscriptionCreate, SubscriptionResponse, Subscription, 
     QuickSubscribe
 )
 from services.email_service import email_service
-from services.whatsapp_service import whatsapp_service
+from services.digest_builder import normalize_preferences
+from services.scheduler import get_scheduler_state
+from services.welcome_batcher import welcome_batcher
+from services.subscription_store import subscribe
+from services.stats import increment, subscription_deltas, get_counters
+from services.subscriber_import import SubscriberImporter, ROW_READERS
+from services.notification_outbox import (
+    enqueue_job, queue_weekly_digest, get_job_status, get_campaign_summary, count_audience
+)
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from datetime import datetime
@@ -18,10 +26,7 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/subscriptions", tags=["subscriptions"])
 
 @router.post("/subscribe", response_model=SubscriptionResponse)
-async def create_subscription(
-    subscription: SubscriptionCreate, 
-    background_tasks: BackgroundTasks
-):
+async def create_subscription(subscription: SubscriptionCreate):
     """Create a new subscription with full preferences"""
     try:
         # MongoDB connection
@@ -29,30 +34,17 @@ async def create_subscription(
         client = AsyncIOMotorClient(mongo_url)
         db = client[os.environ['DB_NAME']]
         
-        # Check if email already subscribed
-        existing_sub = await db.subscriptions.find_one({
-            "email": subscription.email,
-            "is_active": True
-        })
-        
-        if existing_sub:
-            existing_sub['id'] = str(existing_sub.pop('_id'))
-            return SubscriptionResponse(**existing_sub)
-        
-        # Create new subscription
         sub_data = subscription.dict()
-        sub_data['subscribed_at'] = datetime.utcnow()
-        sub_data['is_active'] = True
+        # Stored in canonical form so digest segments group cleanly
+        sub_data['preferences'] = normalize_preferences(sub_data.get('preferences'))
         
-        result = await db.subscriptions.insert_one(sub_data)
-        sub_data['id'] = str(result.inserted_id)
+        # Returns the existing active subscription, or creates it atomically
+        sub_data, created = await subscribe(db, subscription.email, sub_data)
+        sub_data['id'] = str(sub_data.pop('_id'))
         
-        # Send welcome email in background
-        background_tasks.add_task(
-            email_service.send_welcome_email,
-            subscription.email,
-            subscription.name
-        )
+        if created:
+            # Welcome emails are coalesced into batched sends
+            welcome_batcher.add(subscription.email, subscription.name)
         
         return SubscriptionResponse(**sub_data)
     
@@ -61,10 +53,7 @@ async def create_subscription(
         raise HTTPException(status_code=500, detail="Failed to create subscription")
 
 @router.post("/quick-subscribe", response_model=dict)
-async def quick_subscribe(
-    subscription: QuickSubscribe,
-    background_tasks: BackgroundTasks
-):
+async def quick_subscribe(subscription: QuickSubscribe):
     """Quick email subscription (newsletter signup)"""
     try:
         # MongoDB connection
@@ -72,49 +61,69 @@ async def quick_subscribe(
         client = AsyncIOMotorClient(mongo_url)
         db = client[os.environ['DB_NAME']]
         
-        # Check if email already subscribed
-        existing_sub = await db.subscriptions.find_one({
-            "email": subscription.email,
-            "is_active": True
+        # New subscription with default settings, unless one is already active
+        sub_data, created = await subscribe(db, subscription.email, {
+            "name": subscription.name,
+            "subscription_type": "weekly_digest",
+            "email_notifications": True,
+            "whatsapp_notifications": False
         })
         
-        if existing_sub:
+        if not created:
             return {
                 "status": "success",
                 "message": "You're already subscribed to our weekly digest!",
                 "already_subscribed": True
             }
         
-        # Create new subscription with default settings
-        sub_data = {
-            "email": subscription.email,
-            "name": subscription.name,
-            "subscription_type": "weekly_digest",
-            "email_notifications": True,
-            "whatsapp_notifications": False,
-            "is_active": True,
-            "subscribed_at": datetime.utcnow()
-        }
-        
-        result = await db.subscriptions.insert_one(sub_data)
-        
-        # Send welcome email in background
-        background_tasks.add_task(
-            email_service.send_welcome_email,
-            subscription.email,
-            subscription.name
-        )
+        # Welcome emails are coalesced into batched sends
+        welcome_batcher.add(subscription.email, subscription.name)
         
         return {
             "status": "success",
             "message": "Successfully subscribed to weekly cinema digest!",
-            "subscription_id": str(result.inserted_id)
+            "subscription_id": str(sub_data['_id'])
         }
     
     except Exception as e:
         logger.error(f"Error in quick subscribe: {e}")
         raise HTTPException(status_code=500, detail="Failed to subscribe")
 
+@router.post("/import")
+async def import_subscribers(
+    request: Request,
+    format: Optional[str] = Query(None, description="csv or ndjson; defaults from Content-Type"),
+    send_welcome: bool = Query(False, description="Send welcome emails to newly created subscriptions"),
+    update_existing: bool = Query(False, description="Refresh name, phone and preferences of active subscriptions"),
+    batch_size: int = Query(1000, ge=1, le=10000, description="Rows per bulk write")
+):
+    """Bulk import subscribers from a CSV or NDJSON request body (admin endpoint)
+    
+    The body is streamed, validated and written in unordered bulk upserts;
+    the response lists per-row errors and rows/sec.
+    """
+    file_format = format or ('ndjson' if 'json' in request.headers.get('content-type', '') else 'csv')
+    if file_format not in ROW_READERS:
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+    
+    try:
+        # MongoDB connection
+        mongo_url = os.environ['MONGO_URL']
+        client = AsyncIOMotorClient(mongo_url)
+        db = client[os.environ['DB_NAME']]
+        
+        importer = SubscriberImporter(db, batch_size=batch_size, send_welcome=send_welcome, update_existing=update_existing)
+        report = await importer.run(request.stream(), file_format)
+        logger.info(
+            f"Imported subscribers: {report['created']} created, {report['existing']} existing, "
+            f"{report['invalid']} invalid, {report['rows_per_second']} rows/sec"
+        )
+        return report
+    
+    except Exception as e:
+        logger.error(f"Error importing subscribers: {e}")
+        raise HTTPException(status_code=500, detail="Failed to import subscribers")
+
 @router.get("/", response_model=List[SubscriptionResponse])
 async def get_subscriptions(
     active_only: bool = Query(True, description="Filter active subscriptions only"),
@@ -141,31 +150,38 @@ async def get_subscriptions(
 
 @router.post("/unsubscribe")
 async def unsubscribe_email(
-    email: str = Query(..., description="Email to unsubscribe")
+    email: str = Query(..., description="Email to unsubscribe"),
+    token: str = Query(None, description="Signature from the unsubscribe link in our emails")
 ):
     """Unsubscribe email from all notifications"""
+    if token is not None and not email_service.verify_unsubscribe_token(email, token):
+        raise HTTPException(status_code=400, detail="Invalid unsubscribe link")
+    
     try:
         # MongoDB connection
         mongo_url = os.environ['MONGO_URL']
         client = AsyncIOMotorClient(mongo_url)
         db = client[os.environ['DB_NAME']]
         
-        result = await db.subscriptions.update_one(
+        subscription = await db.subscriptions.find_one_and_update(
             {"email": email, "is_active": True},
             {
                 "$set": {
                     "is_active": False,
                     "unsubscribed_at": datetime.utcnow()
                 }
-            }
+            },
+            projection={"_id": 0, "email_notifications": 1, "whatsapp_notifications": 1, "phone_number": 1}
         )
         
-        if result.modified_count == 0:
+        if subscription is None:
             return {
                 "status": "info",
                 "message": "Email not found or already unsubscribed"
             }
         
+        await increment(db, 'subscriptions', subscription_deltas(subscription, -1))
+        
         return {
             "status": "success",
             "message": "Successfully unsubscribed from all notifications"
@@ -176,62 +192,34 @@ async def unsubscribe_email(
         raise HTTPException(status_code=500, detail="Failed to unsubscribe")
 
 @router.post("/send-weekly-digest")
-async def send_weekly_digest_manually(
-    background_tasks: BackgroundTasks
-):
-    """Manually trigger weekly digest (admin endpoint)"""
+async def send_weekly_digest_manually(campaign: Optional[str] = Query(None, description="Defaults to the current ISO week")):
+    """Manually trigger weekly digest (admin endpoint); repeat triggers resume the same campaign"""
     try:
         # MongoDB connection
         mongo_url = os.environ['MONGO_URL']
         client = AsyncIOMotorClient(mongo_url)
         db = client[os.environ['DB_NAME']]
         
-        # Get active subscribers
-        subscribers = await db.subscriptions.find({
-            "is_active": True,
-            "email_notifications": True
-        }).to_list(1000)
+        # The worker streams subscribers and renders each segment when it expands the job
+        job = await queue_weekly_digest(db, campaign=campaign)
         
-        if not subscribers:
+        if not job:
             return {
                 "status": "info",
                 "message": "No active subscribers found"
             }
         
-        # Get latest published reviews (last 7 days)
-        from datetime import timedelta
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        
-        reviews = await db.editorial_reviews.find({
-            "status": "published",
-            "published_at": {"$gte": week_ago}
-        }).sort("published_at", -1).limit(10).to_list(10)
-        
-        if not reviews:
-            # If no reviews in last 7 days, get latest 5 reviews
-            reviews = await db.editorial_reviews.find({
-                "status": "published"
-            }).sort("published_at", -1).limit(5).to_list(5)
-        
-        # Send email digest in background
-        background_tasks.add_task(
-            email_service.send_weekly_digest,
-            subscribers,
-            reviews
-        )
-        
-        # Send WhatsApp notifications
-        background_tasks.add_task(
-            whatsapp_service.send_weekly_digest_notification,
-            subscribers,
-            len(reviews)
-        )
-        
         return {
             "status": "success",
-            "message": f"Weekly digest queued for {len(subscribers)} subscribers",
-            "subscriber_count": len(subscribers),
-            "review_count": len(reviews)
+            "message": (
+                f"Weekly digest already in progress for campaign {job['campaign']}" if job['reused']
+                else f"Weekly digest queued for {job['audience_count']} subscribers"
+            ),
+            "job_id": job['id'],
+            "campaign": job['campaign'],
+            "reused": job['reused'],
+            "subscriber_count": job['audience_count'],
+            "review_count": job['review_count']
         }
     
     except Exception as e:
@@ -239,10 +227,7 @@ async def send_weekly_digest_manually(
         raise HTTPException(status_code=500, detail="Failed to send weekly digest")
 
 @router.post("/notify-new-review/{review_id}")
-async def notify_new_review(
-    review_id: str,
-    background_tasks: BackgroundTasks
-):
+async def notify_new_review(review_id: str):
     """Send notifications for new review publication"""
     try:
         # MongoDB connection
@@ -251,36 +236,110 @@ async def notify_new_review(
         db = client[os.environ['DB_NAME']]
         
         # Get the review
-        review = await db.editorial_reviews.find_one({"id": review_id})
+        review = await db.editorial_reviews.find_one({"id": review_id}, {"_id": 0, "id": 1})
         if not review:
             raise HTTPException(status_code=404, detail="Review not found")
         
-        # Get WhatsApp subscribers only (instant notifications)
-        subscribers = await db.subscriptions.find({
-            "is_active": True,
-            "whatsapp_notifications": True,
-            "phone_number": {"$exists": True, "$ne": None}
-        }).to_list(1000)
+        # WhatsApp subscribers only (instant notifications)
+        subscriber_count = await count_audience(db, "new_review")
         
-        if not subscribers:
+        if not subscriber_count:
             return {
                 "status": "info",
                 "message": "No WhatsApp subscribers found"
             }
         
-        # Send WhatsApp notifications in background
-        background_tasks.add_task(
-            whatsapp_service.send_new_review_notification,
-            subscribers,
-            review
-        )
+        job = await enqueue_job(db, "new_review", {"review_id": review_id}, audience_count=subscriber_count)
         
         return {
             "status": "success",
-            "message": f"Review notifications queued for {len(subscribers)} WhatsApp subscribers",
-            "subscriber_count": len(subscribers)
+            "message": (
+                f"Review notifications already in progress for campaign {job['campaign']}" if job['reused']
+                else f"Review notifications queued for {subscriber_count} WhatsApp subscribers"
+            ),
+            "job_id": job['id'],
+            "campaign": job['campaign'],
+            "reused": job['reused'],
+            "subscriber_count": subscriber_count
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error sending review notifications: {e}")
-        raise HTTPException(status_code=500, detail="Failed to send notifications")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to send notifications")
+
+@router.get("/notification-jobs/{job_id}")
+async def get_notification_job(job_id: str):
+    """Progress of a queued digest or review alert (admin endpoint)"""
+    try:
+        # MongoDB connection
+        mongo_url = os.environ['MONGO_URL']
+        client = AsyncIOMotorClient(mongo_url)
+        db = client[os.environ['DB_NAME']]
+        
+        job = await get_job_status(db, job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Notification job not found")
+        return job
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching notification job: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch notification job")
+
+@router.get("/campaigns/{campaign}")
+async def get_notification_campaign(campaign: str):
+    """Delivery counters of a digest or review alert campaign (admin endpoint)"""
+    try:
+        # MongoDB connection
+        mongo_url = os.environ['MONGO_URL']
+        client = AsyncIOMotorClient(mongo_url)
+        db = client[os.environ['DB_NAME']]
+        
+        summary = await get_campaign_summary(db, campaign)
+        if not summary:
+            raise HTTPException(status_code=404, detail="Campaign not found")
+        return summary
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching campaign {campaign}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch campaign")
+
+@router.get("/schedules")
+async def get_notification_schedules():
+    """Scheduled sends, their next runs and the leading worker (admin endpoint)"""
+    try:
+        # MongoDB connection
+        mongo_url = os.environ['MONGO_URL']
+        client = AsyncIOMotorClient(mongo_url)
+        db = client[os.environ['DB_NAME']]
+        
+        return await get_scheduler_state(db)
+    
+    except Exception as e:
+        logger.error(f"Error fetching schedules: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch schedules")
+
+@router.get("/welcome-stats")
+async def get_welcome_stats():
+    """Welcome email batch sizes and the latency batching adds (admin endpoint)"""
+    return welcome_batcher.report()
+
+@router.get("/stats")
+async def get_subscription_stats():
+    """Active subscribers by channel and published reviews, from maintained counters (admin endpoint)"""
+    try:
+        # MongoDB connection
+        mongo_url = os.environ['MONGO_URL']
+        client = AsyncIOMotorClient(mongo_url)
+        db = client[os.environ['DB_NAME']]
+        
+        return await get_counters(db, ['subscriptions', 'reviews'])
+    
+    except Exception as e:
+        logger.error(f"Error fetching subscription stats: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch subscription stats")
@@ -3,6 +3,7 @@ from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
@@ -60,16 +61,36 @@ async def get_status_checks():
     return [StatusCheck(**status_check) for status_check in status_checks]
 
 # Import route modules after environment is loaded
+from routes.movies import router as movies_router
 from routes.reviews import router as reviews_router
 from routes.subscriptions import router as subscriptions_router
+from routes.migration import router as migration_router
+from services.welcome_batcher import welcome_batcher
+from services.email_service import email_service
+from services.rate_limiter import RateLimitMiddleware, create_rate_limiter
+from services.review_cache import review_cache
+from services.review_search import review_search
+from services.movie_suggest import movie_suggest
+
+# Signup throttling and per-route-class concurrency caps
+rate_limiter = create_rate_limiter(db)
+
+@api_router.get("/rate-limits")
+async def rate_limit_stats():
+    return rate_limiter.report()
 
 # Include route modules
+api_router.include_router(movies_router)
 api_router.include_router(reviews_router)
 api_router.include_router(subscriptions_router)
+api_router.include_router(migration_router)
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Added before CORS so rejections still carry CORS headers
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -85,11 +106,37 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+notification_worker = None
+
 @app.on_event("startup")
 async def startup_event():
+    global notification_worker
+    from services.notification_outbox import ensure_audience_indexes
+    from services.subscription_store import ensure_subscription_indexes
+    await ensure_audience_indexes(db)
+    await ensure_subscription_indexes(db)
+    await email_service.load_unsubscribe_secret(db)
+    await rate_limiter.ensure_indexes()
+    await review_cache.ensure_indexes(db)
+    await review_search.ensure_indexes(db)
+    await movie_suggest.ensure_indexes(db)
+    # Builds the in-process search indexes without holding up startup
+    asyncio.create_task(review_search.refresh(db))
+    asyncio.create_task(movie_suggest.refresh(db))
+    # Single-process deployments can drain the notification outbox in the API;
+    # otherwise run notification_worker.py separately
+    if os.environ.get('RUN_NOTIFICATION_WORKER') == '1':
+        from notification_worker import create_worker
+        notification_worker = create_worker(db)
+        asyncio.create_task(notification_worker.run())
+    welcome_batcher.start()
     logger.info("Filmwalla.com API started successfully")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    if notification_worker:
+        notification_worker.stop()
+    # Send any welcome emails still waiting for their batch
+    await welcome_batcher.stop()
     client.close()
     logger.info("Database connection closed")
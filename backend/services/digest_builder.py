@@ -0,0 +1,167 @@
+from typing import Dict, Iterable, List, Optional
+import logging
+from bson import ObjectId
+from services.email_service import email_service
+from services.whatsapp_service import whatsapp_service
+
+logger = logging.getLogger(__name__)
+
+# Values subscribers can pick in preferences.industries; same names as Movie.industry
+INDUSTRIES = ('Bollywood', 'South Indian', 'International')
+LANGUAGES = ('en', 'hi')
+DEFAULT_LANGUAGE = 'en'
+
+# Review tags that place a review in an industry when its movie is unknown
+TAG_INDUSTRIES = {
+    'bollywood': 'Bollywood',
+    'hindi': 'Bollywood',
+    'south indian': 'South Indian',
+    'tollywood': 'South Indian',
+    'kollywood': 'South Indian',
+    'mollywood': 'South Indian',
+    'sandalwood': 'South Indian',
+    'tamil': 'South Indian',
+    'telugu': 'South Indian',
+    'malayalam': 'South Indian',
+    'kannada': 'South Indian',
+    'hollywood': 'International',
+    'international': 'International'
+}
+
+def normalize_preferences(preferences: Optional[Dict]) -> Dict:
+    """Canonical digest preferences: known industries in a fixed order and a known language"""
+    preferences = dict(preferences or {})
+    industries = preferences.get('industries') or []
+    if isinstance(industries, str):
+        industries = [industries]
+    lowered = {str(industry).strip().lower() for industry in industries}
+    preferences['industries'] = [industry for industry in INDUSTRIES if industry.lower() in lowered]
+    language = str(preferences.get('language') or DEFAULT_LANGUAGE).lower()
+    preferences['language'] = language if language in LANGUAGES else DEFAULT_LANGUAGE
+    return preferences
+
+def segment_key(preferences: Optional[Dict]) -> str:
+    """Digest segment of a subscriber, e.g. 'Bollywood+South Indian|hi' or 'all|en'"""
+    preferences = normalize_preferences(preferences)
+    return f"{'+'.join(preferences['industries']) or 'all'}|{preferences['language']}"
+
+def parse_segment_key(key: str) -> Dict:
+    industries, language = key.split('|')
+    return {'industries': [] if industries == 'all' else industries.split('+'), 'language': language}
+
+class DigestBuilder:
+    """Builds the weekly digest once per audience segment
+
+    Subscribers are grouped into segments (preferred industries x language)
+    by a single aggregation; reviews are loaded once, then picked and
+    rendered for each segment. Work grows with the number of segments, of
+    which there are at most a few dozen, not with the number of subscribers.
+    """
+
+    def __init__(self, db, max_reviews: int = 10, min_reviews: int = 3):
+        self.db = db
+        self.max_reviews = max_reviews
+        self.min_reviews = min_reviews
+
+    async def segments(self, query: Dict) -> Dict[str, Dict]:
+        """Subscriber counts per segment and channel for the audience `query`"""
+        pipeline = [
+            {'$match': query},
+            {'$group': {
+                '_id': {
+                    'industries': {'$ifNull': ['$preferences.industries', []]},
+                    'language': {'$ifNull': ['$preferences.language', DEFAULT_LANGUAGE]}
+                },
+                'subscribers': {'$sum': 1},
+                'whatsapp': {'$sum': {'$cond': [
+                    {'$and': ['$whatsapp_notifications', {'$gt': ['$phone_number', None]}]}, 1, 0
+                ]}}
+            }}
+        ]
+        segments = {}
+        async for row in self.db.subscriptions.aggregate(pipeline):
+            # Documents written before preferences were normalized may group
+            # separately but still land in the same segment
+            key = segment_key(row['_id'])
+            segment = segments.setdefault(key, {'subscribers': 0, 'whatsapp': 0})
+            segment['subscribers'] += row['subscribers']
+            segment['whatsapp'] += row['whatsapp']
+        return segments
+
+    async def load_reviews(self, review_ids: List[str]) -> List[Dict]:
+        """Candidate reviews in the given order, each tagged with its industry"""
+        reviews = await self.db.editorial_reviews.find(
+            {'id': {'$in': review_ids}}, {'_id': 0, 'content': 0}
+        ).to_list(None)
+        reviews.sort(key=lambda review: review_ids.index(review['id']))
+
+        movies = await self.load_movies({review['movie_id'] for review in reviews if review.get('movie_id')})
+        for review in reviews:
+            movie = movies.get(str(review.get('movie_id')), {})
+            review['industry'] = movie.get('industry') or self.industry_from_tags(review.get('tags', []))
+        return reviews
+
+    async def load_movies(self, movie_ids: Iterable) -> Dict[str, Dict]:
+        """Cached movies by the str() of the review movie_id that names them
+
+        Reviews refer to movies by TMDB id (int, or str once published) or by
+        the cached document's _id as the movies API returns it.
+        """
+        tmdb_ids = []
+        object_ids = []
+        for movie_id in movie_ids:
+            try:
+                tmdb_ids.append(int(movie_id))
+            except (TypeError, ValueError):
+                if ObjectId.is_valid(str(movie_id)):
+                    object_ids.append(ObjectId(str(movie_id)))
+        clauses = []
+        if tmdb_ids:
+            clauses.append({'tmdb_id': {'$in': tmdb_ids}})
+        if object_ids:
+            clauses.append({'_id': {'$in': object_ids}})
+        movies = {}
+        if clauses:
+            async for movie in self.db.movies.find({'$or': clauses}, {'tmdb_id': 1, 'industry': 1, 'language': 1}):
+                movies[str(movie['_id'])] = movie
+                if movie.get('tmdb_id') is not None:
+                    movies[str(movie['tmdb_id'])] = movie
+        return movies
+
+    @staticmethod
+    def industry_from_tags(tags: Iterable[str]) -> Optional[str]:
+        for tag in tags:
+            industry = TAG_INDUSTRIES.get(str(tag).strip().lower())
+            if industry:
+                return industry
+        return None
+
+    def pick_reviews(self, reviews: List[Dict], industries: List[str]) -> List[Dict]:
+        """Reviews for a segment: its industries first, topped up with the rest"""
+        if not industries:
+            return reviews[:self.max_reviews]
+        picked = [review for review in reviews if review.get('industry') in industries][:self.max_reviews]
+        if len(picked) < self.min_reviews:
+            # Too little in the preferred industries this week; don't send a near-empty digest
+            picked += [review for review in reviews if review not in picked][:self.min_reviews - len(picked)]
+        return picked
+
+    async def build(self, review_ids: List[str], query: Dict) -> Dict:
+        """Render email and WhatsApp content for every segment of the audience"""
+        reviews = await self.load_reviews(review_ids)
+        segments = await self.segments(query)
+        # Subscribers who join between now and expansion fall back to the default segment
+        segments.setdefault(segment_key({}), {'subscribers': 0, 'whatsapp': 0})
+
+        content = {}
+        for key, counts in segments.items():
+            preferences = parse_segment_key(key)
+            picked = self.pick_reviews(reviews, preferences['industries'])
+            content[key] = {
+                'review_ids': [review['id'] for review in picked],
+                'counts': counts,
+                'email': email_service.render_weekly_digest(picked, **preferences),
+                'whatsapp': whatsapp_service.weekly_digest_message(len(picked), preferences['industries'])
+            }
+        logger.info(f"Built weekly digest for {len(content)} segments from {len(reviews)} reviews")
+        return {'segments': content}
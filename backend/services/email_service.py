@@ -1,13 +1,36 @@
 import os
-from typing import List, Optional
+import hashlib
+import hmac
+import random
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
+from urllib.parse import urlencode
 from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, To
+from sendgrid.helpers.mail import Mail, To, From, Personalization, Substitution
+from python_http_client.exceptions import HTTPError
+from markupsafe import escape
+from pymongo import ReturnDocument
 from datetime import datetime, timedelta
 import logging
-from jinja2 import Template
+from services.email_templates import email_templates
 
 logger = logging.getLogger(__name__)
 
+# SendGrid accepts at most 1,000 personalizations per mail send request
+MAX_PERSONALIZATIONS = 1000
+
+# Substitution tags replaced per recipient by SendGrid. Substitutions are not
+# escaped, so HTML parts use NAME_TAG (filled with the escaped name) and
+# plain text parts NAME_TEXT_TAG (filled with the name as typed)
+NAME_TAG = '-name-'
+NAME_TEXT_TAG = '-name_text-'
+UNSUBSCRIBE_TAG = '-unsubscribe_url-'
+
+# Holds the generated unsubscribe secret when UNSUBSCRIBE_SECRET is not set
+SECRETS_COLLECTION = 'app_secrets'
+
 class EmailService:
     def __init__(self):
         self.api_key = os.getenv('SENDGRID_API_KEY', 'your_sendgrid_key_here')
@@ -15,6 +38,50 @@ class EmailService:
         self.sender_name = os.getenv('SENDER_NAME', 'Filmwalla.com')
         self.sg = SendGridAPIClient(self.api_key) if self.api_key != 'your_sendgrid_key_here' else None
         
+        # Signs unsubscribe links so they cannot be forged for other addresses.
+        # Never the SendGrid key: a credential, and a known placeholder when unset
+        self.unsubscribe_secret = os.getenv('UNSUBSCRIBE_SECRET') or None
+        
+        # Batched sends: concurrent requests and retries per batch
+        self.batch_concurrency = int(os.getenv('SENDGRID_BATCH_CONCURRENCY', '4'))
+        self.batch_retries = int(os.getenv('SENDGRID_BATCH_RETRIES', '3'))
+        self.retry_delay = 1.0
+        
+        # Rendered welcome bodies keyed by whether the recipient has a name
+        self.welcome_batch_content = {}
+    
+    async def load_unsubscribe_secret(self, db):
+        """Use UNSUBSCRIBE_SECRET, or a random secret generated once and shared through the database"""
+        if self.unsubscribe_secret:
+            return
+        stored = await db[SECRETS_COLLECTION].find_one_and_update(
+            {'_id': 'unsubscribe'},
+            {'$setOnInsert': {'value': secrets.token_urlsafe(32), 'created_at': datetime.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self.unsubscribe_secret = stored['value']
+        logger.info("UNSUBSCRIBE_SECRET not set; signing unsubscribe links with the generated secret")
+    
+    def unsubscribe_token(self, email: str) -> str:
+        """HMAC of the address, checked by the unsubscribe endpoint"""
+        if not self.unsubscribe_secret:
+            raise RuntimeError("No unsubscribe secret; set UNSUBSCRIBE_SECRET or call load_unsubscribe_secret()")
+        return hmac.new(
+            self.unsubscribe_secret.encode('utf-8'),
+            email.strip().lower().encode('utf-8'),
+            hashlib.sha256
+        ).hexdigest()
+    
+    def verify_unsubscribe_token(self, email: str, token: str) -> bool:
+        if not self.unsubscribe_secret:
+            return False
+        return hmac.compare_digest(self.unsubscribe_token(email), token)
+    
+    def unsubscribe_url(self, email: str) -> str:
+        query = urlencode({'email': email, 'token': self.unsubscribe_token(email)})
+        return f"https://filmwallaa.com/unsubscribe?{query}"
+        
     def send_email(self, to_emails: List[str], subject: str, html_content: str, plain_content: str = None):
         """Send email to multiple recipients"""
         if not self.sg:
@@ -42,146 +109,170 @@ class EmailService:
     def send_welcome_email(self, email: str, name: str = None):
         """Send welcome email to new subscribers"""
         subject = "Welcome to Filmwalla.com! 🎬"
+        html_content, plain_content = email_templates.render_welcome(name, self.unsubscribe_url(email))
+        return self.send_email([email], subject, html_content, plain_content)
+    
+    def render_welcome_batch(self, named: bool) -> Dict:
+        """Welcome email rendered once with substitution tags, for named or anonymous recipients"""
+        if named not in self.welcome_batch_content:
+            context = {'unsubscribe_url': UNSUBSCRIBE_TAG}
+            self.welcome_batch_content[named] = {
+                'subject': "Welcome to Filmwalla.com! 🎬",
+                'html': email_templates.render('welcome.html', name=NAME_TAG if named else None, **context),
+                'text': email_templates.render('welcome.txt', name=NAME_TEXT_TAG if named else None, **context)
+            }
+        return self.welcome_batch_content[named]
+    
+    def send_welcome_batch(self, recipients: List[dict]) -> List[Dict]:
+        """Send welcome emails to many new subscribers as personalized batch requests
         
-        html_template = Template("""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-                .header { background: linear-gradient(135deg, #f97316, #dc2626); color: white; padding: 20px; text-align: center; }
-                .content { padding: 20px; }
-                .footer { background: #f8f9fa; padding: 15px; text-align: center; font-size: 12px; color: #666; }
-                .btn { display: inline-block; background: #f97316; color: white; padding: 12px 24px; text-decoration: none; border-radius: 5px; margin: 10px 0; }
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>🎭 Filmwalla.com</h1>
-                <p>Your Gateway to Indian Entertainment</p>
-            </div>
-            <div class="content">
-                <h2>Welcome{% if name %} {{ name }}{% endif %}! 🙏</h2>
-                <p>Thank you for subscribing to <strong>Filmwalla.com</strong> - your premier destination for Indian cinema reviews and entertainment news.</p>
-                
-                <h3>What to Expect:</h3>
-                <ul>
-                    <li>📧 Weekly digest of top movie reviews</li>
-                    <li>🎬 Latest Bollywood, South Indian, and International cinema coverage</li>
-                    <li>🌟 Expert reviews in Hindi and English</li>
-                    <li>🔥 Breaking entertainment news and updates</li>
-                </ul>
-                
-                <p>Visit our website to explore the latest reviews and discover your next favorite film!</p>
-                <a href="https://filmwallaa.com" class="btn">Visit Website</a>
-                
-                <p><strong>Follow us:</strong> Stay connected for the latest updates!</p>
-            </div>
-            <div class="footer">
-                <p>© 2025 Filmwalla.com | FILMWALLAA.COM</p>
-                <p>You're receiving this because you subscribed to our updates.</p>
-                <p><a href="{{ unsubscribe_url }}">Unsubscribe</a> | <a href="https://filmwallaa.com">Visit Website</a></p>
-            </div>
-        </body>
-        </html>
-        """)
-        
-        html_content = html_template.render(
-            name=name,
-            unsubscribe_url=f"https://filmwallaa.com/unsubscribe?email={email}"
-        )
-        
-        plain_content = f"""
-Welcome to Filmwalla.com!{'  ' + name if name else ''}
-
-Thank you for subscribing to Filmwalla.com - your premier destination for Indian cinema reviews.
-
-What to Expect:
-- Weekly digest of top movie reviews
-- Latest Bollywood, South Indian, and International cinema coverage  
-- Expert reviews in Hindi and English
-- Breaking entertainment news
-
-Visit https://filmwallaa.com to explore the latest reviews!
-
-© 2025 Filmwalla.com | FILMWALLAA.COM
-Unsubscribe: https://filmwallaa.com/unsubscribe?email={email}
+        The template branches on whether there is a name, so named and
+        anonymous recipients go out as (at most) two requests per batch.
         """
-        
-        return self.send_email([email], subject, html_content, plain_content)
+        results = []
+        for named in (True, False):
+            group = [recipient for recipient in recipients if bool(recipient.get('name')) == named]
+            content = self.render_welcome_batch(named)
+            for start in range(0, len(group), MAX_PERSONALIZATIONS):
+                results.append(self.send_batch(
+                    len(results), group[start:start + MAX_PERSONALIZATIONS],
+                    content['subject'], content['html'], content['text']
+                ))
+        return results
     
-    def send_weekly_digest(self, subscribers: List[dict], reviews: List[dict]):
+    def render_weekly_digest(self, reviews: List[dict], industries: List[str] = None, language: str = 'en') -> Dict:
+        """Render the digest once as {'subject', 'html', 'text'} with per-recipient substitution tags"""
+        date = datetime.now().strftime('%B %d, %Y')
+        context = {
+            'reviews': reviews,
+            'date': date,
+            'industries': industries or [],
+            'language': language,
+            'unsubscribe_url': UNSUBSCRIBE_TAG
+        }
+        title = f"Your {' & '.join(industries)} Digest" if industries else "Weekly Cinema Digest"
+        return {
+            'subject': f"🎬 {title} - {date}",
+            'html': email_templates.render('weekly_digest.html', name=NAME_TAG, **context),
+            'text': email_templates.render('weekly_digest.txt', name=NAME_TEXT_TAG, **context)
+        }
+    
+    def send_weekly_digest(self, subscribers: List[dict], reviews: List[dict]) -> Dict:
         """Send weekly digest email to all subscribers"""
         if not reviews:
             logger.info("No reviews to send in weekly digest")
-            return True
-            
-        subject = f"🎬 Weekly Cinema Digest - {datetime.now().strftime('%B %d, %Y')}"
+            return {'recipients': 0, 'sent': 0, 'failed': 0, 'batches': []}
+        
+        # Rendered once; SendGrid fills in the tags for each recipient
+        digest = self.render_weekly_digest(reviews)
+        return self.send_personalized(subscribers, digest['subject'], digest['html'], digest['text'])
+    
+    def send_personalized(
+        self,
+        subscribers: List[dict],
+        subject: str,
+        html_content: str,
+        plain_content: str = None,
+        batch_size: int = MAX_PERSONALIZATIONS
+    ) -> Dict:
+        """Send one message to many subscribers in batches of personalizations
         
-        html_template = Template("""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
-                .header { background: linear-gradient(135deg, #f97316, #dc2626); color: white; padding: 20px; text-align: center; }
-                .content { padding: 20px; }
-                .review-card { border: 1px solid #e5e7eb; border-radius: 8px; padding: 15px; margin: 15px 0; }
-                .review-title { color: #f97316; font-size: 18px; font-weight: bold; }
-                .review-meta { color: #666; font-size: 14px; margin: 5px 0; }
-                .rating { color: #fbbf24; }
-                .footer { background: #f8f9fa; padding: 15px; text-align: center; font-size: 12px; color: #666; }
-                .btn { display: inline-block; background: #f97316; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px; }
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>🎭 Filmwalla.com</h1>
-                <p>Weekly Cinema Digest - {{ date }}</p>
-            </div>
-            <div class="content">
-                <h2>This Week's Top Reviews 🌟</h2>
-                <p>Here are the latest movie reviews from our expert critics:</p>
-                
-                {% for review in reviews %}
-                <div class="review-card">
-                    <div class="review-title">{{ review.title }}</div>
-                    {% if review.title_hindi %}
-                    <div class="review-meta">{{ review.title_hindi }}</div>
-                    {% endif %}
-                    <div class="review-meta">
-                        By {{ review.author }} | 
-                        <span class="rating">{'★' * (review.rating|int)}{'☆' * (5 - (review.rating|int))}</span> {{ review.rating }}/5
-                    </div>
-                    <p>{{ review.excerpt }}</p>
-                    <a href="https://filmwallaa.com/reviews/{{ review.id }}" class="btn">Read Full Review</a>
-                </div>
-                {% endfor %}
-                
-                <hr style="margin: 30px 0;">
-                <h3>📱 Don't Miss Out!</h3>
-                <p>Visit our website for more reviews, news, and cinema updates.</p>
-                <a href="https://filmwallaa.com" class="btn">Visit FILMWALLAA.COM</a>
-            </div>
-            <div class="footer">
-                <p>© 2025 Filmwalla.com | FILMWALLAA.COM</p>
-                <p>You're receiving this weekly digest because you subscribed to our updates.</p>
-                <p><a href="{{ unsubscribe_url }}">Unsubscribe</a> | <a href="https://filmwallaa.com">Manage Preferences</a></p>
-            </div>
-        </body>
-        </html>
-        """)
+        Every recipient gets their own personalization, so addresses are never
+        exposed to each other and NAME_TAG / UNSUBSCRIBE_TAG are substituted
+        per recipient. Batches are sent concurrently and retried on their own.
+        """
+        batch_size = min(batch_size, MAX_PERSONALIZATIONS)
+        recipients = [sub for sub in subscribers if sub.get('email')]
+        batches = [recipients[start:start + batch_size] for start in range(0, len(recipients), batch_size)]
         
-        # Send to all subscribers
-        recipient_emails = [sub['email'] for sub in subscribers]
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max(1, self.batch_concurrency)) as pool:
+            results = list(pool.map(
+                lambda numbered: self.send_batch(numbered[0], numbered[1], subject, html_content, plain_content),
+                enumerate(batches)
+            ))
+        elapsed = time.monotonic() - started
         
-        html_content = html_template.render(
-            reviews=reviews,
-            date=datetime.now().strftime('%B %d, %Y'),
-            unsubscribe_url="https://filmwallaa.com/unsubscribe"
+        sent = sum(result['recipients'] for result in results if result['status'] == 'sent')
+        report = {
+            'recipients': len(recipients),
+            'sent': sent,
+            'failed': len(recipients) - sent,
+            'seconds': round(elapsed, 2),
+            'recipients_per_second': round(sent / elapsed, 1) if elapsed else 0,
+            'batches': results
+        }
+        logger.info(
+            f"Sent '{subject}' to {sent}/{len(recipients)} recipients in {len(batches)} batches "
+            f"({report['recipients_per_second']} recipients/sec)"
         )
+        for result in results:
+            if result['status'] != 'sent':
+                logger.error(f"Batch {result['batch']} failed after {result['attempts']} attempts: {result['error']}")
+        return report
+    
+    def build_batch_message(self, batch: List[dict], subject: str, html_content: str, plain_content: str = None) -> Mail:
+        message = Mail(
+            from_email=From(self.sender_email, self.sender_name),
+            subject=subject,
+            html_content=html_content,
+            plain_text_content=plain_content
+        )
+        for subscriber in batch:
+            personalization = Personalization()
+            personalization.add_to(To(subscriber['email'], subscriber.get('name')))
+            name = subscriber.get('name') or 'there'
+            personalization.add_substitution(Substitution(NAME_TAG, str(escape(name))))
+            personalization.add_substitution(Substitution(NAME_TEXT_TAG, name))
+            personalization.add_substitution(Substitution(UNSUBSCRIBE_TAG, self.unsubscribe_url(subscriber['email'])))
+            message.add_personalization(personalization)
+        return message
+    
+    def send_batch(
+        self,
+        index: int,
+        batch: List[dict],
+        subject: str,
+        html_content: str,
+        plain_content: str = None
+    ) -> Dict:
+        """Send one batch, retrying rate limits, server errors and network failures"""
+        result = {
+            'batch': index, 'recipients': len(batch), 'status': 'failed', 'attempts': 0, 'seconds': 0.0,
+            'error': None, 'permanent': False
+        }
+        started = time.monotonic()
+        
+        if not self.sg:
+            logger.warning(f"SendGrid not configured. Batch {index} would be sent to {len(batch)} recipients")
+            result.update(status='sent', attempts=1)
+            return result
+        
+        message = self.build_batch_message(batch, subject, html_content, plain_content)
+        for attempt in range(1, self.batch_retries + 2):
+            result['attempts'] = attempt
+            try:
+                response = self.sg.send(message)
+                if response.status_code == 202:
+                    result['status'] = 'sent'
+                    result['error'] = None
+                    break
+                result['error'] = f"Unexpected status {response.status_code}"
+            except HTTPError as e:
+                result['error'] = f"{e.status_code}: {e.body}"
+                # Other 4xx responses will fail the same way again; a 400 (such as a
+                # malformed address) won't succeed on a later attempt either
+                if e.status_code != 429 and e.status_code < 500:
+                    result['permanent'] = e.status_code == 400
+                    break
+            except Exception as e:
+                result['error'] = str(e)
+            
+            if attempt <= self.batch_retries:
+                time.sleep(self.retry_delay * 2 ** (attempt - 1) + random.uniform(0, self.retry_delay))
         
-        return self.send_email(recipient_emails, subject, html_content)
+        result['seconds'] = round(time.monotonic() - started, 2)
+        return result
     
     def send_new_review_notification(self, subscribers: List[dict], review: dict):
         """Send notification about new review via WhatsApp"""
@@ -0,0 +1,122 @@
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Tuple
+import logging
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, select_autoescape
+from markupsafe import Markup, escape
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_DIR = Path(__file__).resolve().parent.parent / 'templates' / 'email'
+
+def stars(rating) -> str:
+    """Render a 0-5 rating as filled and empty stars"""
+    try:
+        filled = max(0, min(5, int(float(rating))))
+    except (TypeError, ValueError):
+        filled = 0
+    return '★' * filled + '☆' * (5 - filled)
+
+class PrerenderedTemplate:
+    """A template rendered once with markers, then filled by string joins
+
+    Only the listed fields may vary per recipient; everything else is
+    rendered up front, so a per-recipient render is a handful of escapes and
+    a join instead of a template evaluation.
+    """
+
+    def __init__(self, template, fields: Tuple[str, ...], autoescape: bool, **context):
+        markers = {field: f"@@{field}@@" for field in fields}
+        self.autoescape = autoescape
+        self.parts, self.fields = self.split(template.render({**context, **markers}), markers)
+
+    @staticmethod
+    def split(rendered: str, markers: Dict[str, str]):
+        parts, fields = [], []
+        position = 0
+        while True:
+            found = [
+                (rendered.find(marker, position), field, marker)
+                for field, marker in markers.items()
+            ]
+            found = [entry for entry in found if entry[0] != -1]
+            if not found:
+                parts.append(rendered[position:])
+                return parts, fields
+            index, field, marker = min(found)
+            parts.append(rendered[position:index])
+            fields.append(field)
+            position = index + len(marker)
+
+    def render(self, **values) -> str:
+        pieces = [self.parts[0]]
+        for field, part in zip(self.fields, self.parts[1:]):
+            value = values.get(field) or ''
+            pieces.append(str(escape(value)) if self.autoescape else str(value))
+            pieces.append(part)
+        return ''.join(pieces)
+
+class EmailTemplates:
+    """File based email templates compiled once into a shared Environment"""
+
+    def __init__(self, template_dir: Path = TEMPLATE_DIR, cache_dir: str = None):
+        cache_dir = cache_dir or os.getenv(
+            'EMAIL_TEMPLATE_CACHE_DIR',
+            os.path.join(tempfile.gettempdir(), 'filmwalla-email-templates')
+        )
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.env = Environment(
+            loader=FileSystemLoader(str(template_dir)),
+            bytecode_cache=FileSystemBytecodeCache(cache_dir),
+            autoescape=select_autoescape(['html']),
+            # Templates are deployed with the code, never edited in place
+            auto_reload=False,
+            trim_blocks=True,
+            lstrip_blocks=True
+        )
+        self.env.filters['stars'] = stars
+
+        # Static fragments are rendered once and shared by every template
+        self.env.globals.update(
+            site_name=os.getenv('SENDER_NAME', 'Filmwalla.com'),
+            site_url='https://filmwallaa.com',
+            year=datetime.now().year,
+            styles=Markup(self.env.get_template('styles.css').render())
+        )
+
+        self.prerendered = {}  # (template, variant) -> PrerenderedTemplate
+
+    def render(self, template_name: str, **context) -> str:
+        """Render any template with a full context"""
+        return self.env.get_template(template_name).render(**context)
+
+    def prerendered_template(self, template_name: str, fields: Tuple[str, ...], variant=None, **context) -> PrerenderedTemplate:
+        """Cached pre-render of a template whose only per-recipient values are `fields`
+
+        `variant` keeps separate pre-renders for templates that branch on a
+        value (e.g. with and without a name).
+        """
+        key = (template_name, variant)
+        if key not in self.prerendered:
+            template = self.env.get_template(template_name)
+            self.prerendered[key] = PrerenderedTemplate(
+                template, fields, template_name.endswith('.html'), **context
+            )
+        return self.prerendered[key]
+
+    def render_welcome(self, name: str, unsubscribe_url: str) -> Tuple[str, str]:
+        """Fast per-recipient (html, text) welcome email"""
+        # Welcome templates branch on whether there is a name
+        fields = ('name', 'unsubscribe_url') if name else ('unsubscribe_url',)
+        html = self.prerendered_template('welcome.html', fields, variant=bool(name), name=None)
+        text = self.prerendered_template('welcome.txt', fields, variant=bool(name), name=None)
+        return (
+            html.render(name=name, unsubscribe_url=unsubscribe_url),
+            text.render(name=name, unsubscribe_url=unsubscribe_url)
+        )
+
+# Global email templates instance
+email_templates = EmailTemplates()
@@ -0,0 +1,358 @@
+import asyncio
+import heapq
+import math
+import os
+import re
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Only what a suggestion row shows; the full movie comes from /movies/{id}
+SUGGEST_PROJECTION = {
+    'tmdb_id': 1, 'title': 1, 'original_title': 1, 'title_hindi': 1, 'year': 1, 'rating': 1,
+    'popularity': 1, 'vote_count': 1, 'poster': 1, 'industry': 1, 'language': 1, 'updated_at': 1
+}
+
+# Words of a title that start a suggestion key; "khushi" finds Kabhi Khushi Kabhie Gham
+MAX_KEY_WORDS = 8
+
+# Prefixes matching more keys than this keep a precomputed ranking instead of scanning their range
+MEMO_THRESHOLD = 300
+
+# Movies kept in each precomputed ranking
+MEMO_DEPTH = 50
+
+DEVANAGARI = re.compile(r'[ऀ-ॿ]')
+
+# Devanagari to the usual Hinglish romanization, before folding
+CONSONANTS = {
+    'क': 'k', 'ख': 'kh', 'ग': 'g', 'घ': 'gh', 'ङ': 'n', 'च': 'ch', 'छ': 'chh', 'ज': 'j', 'झ': 'jh', 'ञ': 'n',
+    'ट': 't', 'ठ': 'th', 'ड': 'd', 'ढ': 'dh', 'ण': 'n', 'त': 't', 'थ': 'th', 'द': 'd', 'ध': 'dh', 'न': 'n',
+    'प': 'p', 'फ': 'ph', 'ब': 'b', 'भ': 'bh', 'म': 'm', 'य': 'y', 'र': 'r', 'ल': 'l', 'व': 'v', 'श': 'sh',
+    'ष': 'sh', 'स': 's', 'ह': 'h', 'ळ': 'l'
+}
+VOWELS = {
+    'अ': 'a', 'आ': 'aa', 'इ': 'i', 'ई': 'ee', 'उ': 'u', 'ऊ': 'oo', 'ऋ': 'ri', 'ए': 'e', 'ऐ': 'ai', 'ओ': 'o', 'औ': 'au',
+    'ऑ': 'o'
+}
+VOWEL_SIGNS = {
+    'ा': 'aa', 'ि': 'i', 'ी': 'ee', 'ु': 'u', 'ू': 'oo', 'ृ': 'ri', 'े': 'e', 'ै': 'ai', 'ो': 'o', 'ौ': 'au', 'ॉ': 'o'
+}
+VIRAMA = '्'
+NASALS = {'ं': 'n', 'ँ': 'n'}
+
+# Spelling variants of romanized Hindi folded to one form, longest first:
+# Dhoom/Dhum, Kabhie/Kabhi, Zindagi/Jindagi, Shershaah/Shershah
+PHONETIC = re.compile(r'chh|kh|gh|ch|jh|th|dh|ph|bh|sh|aa|ee|ii|oo|uu|ck|w|z|q')
+PHONETIC_FOLDING = {
+    'chh': 'c', 'kh': 'k', 'gh': 'g', 'ch': 'c', 'jh': 'j', 'th': 't', 'dh': 'd', 'ph': 'f', 'bh': 'b', 'sh': 's',
+    'aa': 'a', 'ee': 'i', 'ii': 'i', 'oo': 'u', 'uu': 'u', 'ck': 'k', 'w': 'v', 'z': 'j', 'q': 'k'
+}
+REPEATED = re.compile(r'(.)\1+')
+WORD_FINAL_IE = re.compile(r'ie\b')
+
+def transliterate(text: str) -> str:
+    """Romanize Devanagari; other characters pass through"""
+    out = []
+    pending_a = False  # a consonant's inherent vowel, dropped before a sign or at a word end
+    for char in text:
+        if char in CONSONANTS:
+            if pending_a:
+                out.append('a')
+            out.append(CONSONANTS[char])
+            pending_a = True
+            continue
+        if char == '़':
+            continue  # nukta: ग़ is read as ग
+        if char in VOWEL_SIGNS:
+            out.append(VOWEL_SIGNS[char])
+        elif char == VIRAMA:
+            pass
+        elif char in NASALS:
+            if pending_a:
+                out.append('a')
+            out.append(NASALS[char])
+        elif char in VOWELS:
+            if pending_a:
+                out.append('a')
+            out.append(VOWELS[char])
+        else:
+            out.append(char)  # word breaks end the schwa: कभी ग़म -> kabhi gam
+        pending_a = False
+    return ''.join(out)
+
+def fold_latin(text: str) -> str:
+    """Lowercase, accent-free, phonetically folded words separated by single spaces"""
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(char if char.isascii() and (char.isalnum() or char == ' ') else ' ' for char in text
+                   if not unicodedata.combining(char))
+    text = WORD_FINAL_IE.sub('i', ' '.join(text.split()))
+    return REPEATED.sub(r'\1', PHONETIC.sub(lambda match: PHONETIC_FOLDING[match.group()], text))
+
+def fold_devanagari(text: str) -> str:
+    text = unicodedata.normalize('NFC', text).replace('़', '').replace('ँ', 'ं')
+    return ' '.join(''.join(char if DEVANAGARI.match(char) or char.isalnum() else ' ' for char in text).split())
+
+def search_forms(text: str) -> Set[str]:
+    """Folded forms of a title or query: romanized, and Devanagari when it has any"""
+    if not text:
+        return set()
+    forms = {fold_latin(transliterate(text))}
+    if DEVANAGARI.search(text):
+        forms.add(fold_devanagari(text))
+    forms.discard('')
+    return forms
+
+def popularity_score(movie: Dict) -> float:
+    """Higher for popular, well rated movies; movies cached before popularity was stored rank by rating"""
+    return (
+        math.log1p(movie.get('popularity') or 0)
+        + 0.5 * math.log1p(movie.get('vote_count') or 0)
+        + (movie.get('rating') or 0)
+    )
+
+class MovieSuggestIndex:
+    """Typeahead over cached movies from a sorted array of title keys
+
+    Every title variant (title, original_title, title_hindi) is folded into
+    romanized form, and kept in Devanagari too where it has any, then added
+    once per word start so mid-title words match. A lookup bisects to the
+    prefix and ranks the movies in that range by whole-title match first,
+    then popularity. Short, common prefixes would scan thousands of keys, so
+    their rankings are precomputed when the array is built and updated as
+    movies are added. Movies added while the first build runs in its thread
+    are queued and indexed on the event loop once it finishes.
+
+    Like the review search index, `sync` loads the movies collection once
+    and afterwards only movies whose updated_at moved past the last sync.
+    """
+
+    SYNC_OVERLAP = timedelta(seconds=5)
+
+    def __init__(self, sync_interval: float = 10.0):
+        self.sync_interval = sync_interval
+        self.entries: List[tuple] = []  # (key, 0 for a whole-title key else 1, slot)
+        self.rows: List[Optional[Dict]] = []  # suggestion row by slot, None once replaced
+        self.titles: List[tuple] = []  # (title, original_title, title_hindi) by slot
+        self.scores: List[float] = []
+        self.slots: Dict[int, int] = {}  # tmdb_id -> current slot
+        self.memo: Dict[str, List[tuple]] = {}
+        self.watermark: Optional[datetime] = None
+        self.synced_at = 0.0
+        self.built = False
+        self.building = False
+        self.queued: List[Dict] = []  # added during the first build
+        self.syncing: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    @staticmethod
+    def keys_for(titles: tuple) -> Set[tuple]:
+        keys = set()
+        for variant in titles:
+            for form in search_forms(variant or ''):
+                words = form.split(' ')
+                keys.add((form, 0))
+                for start in range(1, min(len(words), MAX_KEY_WORDS)):
+                    keys.add((' '.join(words[start:]), 1))
+        return keys
+
+    def place(self, movie: Dict) -> Optional[int]:
+        """Store a movie's row and score; the slot when its keys still need indexing"""
+        if movie.get('tmdb_id') is None or not movie.get('title'):
+            return None
+        row = {
+            'id': str(movie['_id']) if movie.get('_id') is not None else movie.get('id'),
+            'tmdb_id': movie['tmdb_id'],
+            'title': movie['title'],
+            'title_hindi': movie.get('title_hindi'),
+            'year': movie.get('year'),
+            'rating': movie.get('rating'),
+            'poster': movie.get('poster'),
+            'industry': movie.get('industry')
+        }
+        titles = (movie['title'], movie.get('original_title'), movie.get('title_hindi'))
+        score = popularity_score(movie)
+        previous = self.slots.get(movie['tmdb_id'])
+        if previous is not None:
+            if self.titles[previous] == titles and self.scores[previous] == score:
+                # Same keys, same ranking: only the row changed
+                self.rows[previous] = row
+                return None
+            self.rows[previous] = None  # its old keys and rankings are skipped from now on
+
+        self.slots[movie['tmdb_id']] = len(self.rows)
+        self.rows.append(row)
+        self.titles.append(titles)
+        self.scores.append(score)
+        return len(self.rows) - 1
+
+    def add(self, movie: Dict):
+        """Index a newly cached movie, replacing an earlier version of it"""
+        if self.building:
+            self.queued.append(movie)  # the first build is still running in a thread
+            return
+        self.insert(movie)
+
+    def insert(self, movie: Dict):
+        slot = self.place(movie)
+        if slot is None:
+            return
+        best: Dict[str, int] = {}  # precomputed prefix -> 0 when the whole title matches, else 1
+        for key, partial in self.keys_for(self.titles[slot]):
+            insort(self.entries, (key, partial, slot))
+            for length in range(1, len(key) + 1):
+                if key[:length] in self.memo:
+                    best[key[:length]] = min(partial, best.get(key[:length], 1))
+        for prefix, partial in best.items():
+            ranked = self.memo[prefix]
+            insort(ranked, (partial, -self.scores[slot], slot))
+            del ranked[MEMO_DEPTH:]
+        if len(self.rows) > 2 * max(len(self.slots), 1000):
+            self.compact()
+
+    def add_many(self, movies: List[Dict]):
+        """Index a batch of newly cached movies"""
+        if self.building:
+            self.queued.extend(movies)
+            return
+        self.index_batch(movies)
+
+    def index_batch(self, movies: List[Dict]):
+        """A large batch rebuilds the array instead of inserting key by key"""
+        if len(movies) < 200:
+            for movie in movies:
+                self.insert(movie)
+            return
+        for movie in movies:
+            self.place(movie)
+        self.compact()
+
+    def compact(self):
+        """Rebuild the sorted keys from the live movies, dropping replaced slots"""
+        rows, titles, scores, entries = [], [], [], []
+        for tmdb_id, slot in self.slots.items():
+            self.slots[tmdb_id] = len(rows)
+            for key, partial in self.keys_for(self.titles[slot]):
+                entries.append((key, partial, len(rows)))
+            rows.append(self.rows[slot])
+            titles.append(self.titles[slot])
+            scores.append(self.scores[slot])
+        entries.sort()
+        self.rows, self.titles, self.scores, self.entries = rows, titles, scores, entries
+        self.memo = {}
+        self.precompute('')
+
+    def precompute(self, prefix: str):
+        """Rank every prefix below `prefix` whose range is too long to scan per keystroke"""
+        entries = self.entries
+        position = bisect_left(entries, (prefix,))
+        end = bisect_left(entries, (prefix + '\U0010ffff',))
+        while position < end:
+            key = entries[position][0]
+            if len(key) == len(prefix):
+                position += 1
+                continue
+            child = key[:len(prefix) + 1]
+            child_end = bisect_left(entries, (child + '\U0010ffff',), position, end)
+            if child_end - position > MEMO_THRESHOLD:
+                self.memo[child] = self.scan(child)
+                self.precompute(child)
+            position = child_end
+
+    def ranked(self, prefix: str) -> List[tuple]:
+        """(partial, -score, slot) of the best movies with a key starting with `prefix`"""
+        ranked = self.memo.get(prefix)
+        return ranked if ranked is not None else self.scan(prefix)
+
+    def scan(self, prefix: str) -> List[tuple]:
+        entries = self.entries
+        first = position = bisect_left(entries, (prefix,))
+        best: Dict[int, int] = {}  # slot -> 0 when a whole title matches, else 1
+        while position < len(entries):
+            key, partial, slot = entries[position]
+            if not key.startswith(prefix):
+                break
+            if best.get(slot, 2) > partial and self.rows[slot] is not None:
+                best[slot] = partial
+            position += 1
+        scores = self.scores
+        ranked = heapq.nsmallest(MEMO_DEPTH, ((partial, -scores[slot], slot) for slot, partial in best.items()))
+        if position - first > MEMO_THRESHOLD:
+            # Grown past the threshold since the last build; kept up to date from now on
+            self.memo[prefix] = ranked
+        return ranked
+
+    def suggest(self, query: str, limit: int = 8) -> List[Dict]:
+        """Best movies for a partly typed title, romanized or Devanagari"""
+        suggestions = []
+        seen = set()
+        for _, _, slot in heapq.merge(*(self.ranked(form) for form in search_forms(query))):
+            if slot not in seen and self.rows[slot] is not None:
+                seen.add(slot)
+                suggestions.append(self.rows[slot])
+                if len(suggestions) == limit:
+                    break
+        return suggestions
+
+    async def sync(self, db) -> int:
+        """Index movies cached or updated since the last sync"""
+        query = {'updated_at': {'$gte': self.watermark - self.SYNC_OVERLAP}} if self.watermark else {}
+        started = time.monotonic()
+        movies = await db.movies.find(query, SUGGEST_PROJECTION).to_list(None)
+        watermark = self.watermark
+        for movie in movies:
+            if movie.get('updated_at') and (watermark is None or movie['updated_at'] > watermark):
+                watermark = movie['updated_at']
+        if self.built:
+            self.add_many(movies)
+        else:
+            # Building the whole catalogue takes seconds; keep it off the event loop
+            self.building = True
+            try:
+                await asyncio.to_thread(self.index_batch, movies)
+            finally:
+                self.building = False
+                queued, self.queued = self.queued, []
+                self.add_many(queued)
+        self.watermark = watermark
+        self.synced_at = time.monotonic()
+        if not self.built:
+            self.built = True
+            logger.info(f"Built movie suggest index: {len(self)} movies, {len(self.entries)} keys "
+                        f"in {time.monotonic() - started:.2f}s")
+        return len(movies)
+
+    async def catch_up(self, db):
+        try:
+            await self.sync(db)
+        except Exception as e:
+            logger.error(f"Movie suggest sync failed: {e}")
+
+    async def refresh(self, db):
+        """Sync now, or wait for the sync already running"""
+        if self.syncing is None or self.syncing.done():
+            self.syncing = asyncio.create_task(self.catch_up(db))
+        await asyncio.shield(self.syncing)
+
+    async def lookup(self, db, query: str, limit: int = 8) -> List[Dict]:
+        """Suggestions for a partly typed title, catching up on newly cached movies in the background"""
+        if time.monotonic() - self.synced_at > self.sync_interval:
+            if not self.built:
+                await self.refresh(db)
+            elif self.syncing is None or self.syncing.done():
+                self.syncing = asyncio.create_task(self.catch_up(db))
+        return self.suggest(query, limit)
+
+    async def ensure_indexes(self, db):
+        await db.movies.create_index('tmdb_id')
+        await db.movies.create_index('updated_at')
+
+# Global movie suggest instance
+movie_suggest = MovieSuggestIndex(sync_interval=float(os.getenv('MOVIE_SUGGEST_SYNC_SECONDS', '10')))
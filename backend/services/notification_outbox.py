@@ -0,0 +1,615 @@
+import asyncio
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Dict, Optional
+import logging
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+from services.email_service import email_service
+from services.whatsapp_service import whatsapp_service
+from services.digest_builder import DigestBuilder, segment_key
+
+logger = logging.getLogger(__name__)
+
+JOB_COLLECTION = 'notification_jobs'
+MESSAGE_COLLECTION = 'notification_messages'
+CAMPAIGN_COLLECTION = 'notification_campaigns'
+LEDGER_COLLECTION = 'delivery_ledger'
+
+# Job lifecycle: pending -> expanding -> sending -> completed
+# Message lifecycle: pending -> sending -> sent | failed | skipped (pending again while retries remain)
+#
+# Jobs belong to a campaign (one weekly digest, one review alert). The delivery
+# ledger holds one entry per (campaign, recipient, channel) that was delivered,
+# so re-running a campaign only sends to whoever has not had it yet.
+
+# Who each job type goes to. Both filters match an index prefix in
+# AUDIENCE_INDEXES, so counting an audience is an index-only count scan.
+AUDIENCES = {
+    'weekly_digest': {'is_active': True, 'email_notifications': True},
+    'new_review': {
+        'is_active': True,
+        'whatsapp_notifications': True,
+        'phone_number': {'$exists': True, '$ne': None}
+    }
+}
+
+AUDIENCE_INDEXES = [
+    [('is_active', ASCENDING), ('email_notifications', ASCENDING)],
+    [('is_active', ASCENDING), ('whatsapp_notifications', ASCENDING), ('phone_number', ASCENDING)]
+]
+
+# The only subscriber fields a message needs
+SUBSCRIBER_PROJECTION = {'_id': 0, 'email': 1, 'name': 1, 'phone_number': 1, 'whatsapp_notifications': 1, 'preferences': 1}
+
+async def ensure_audience_indexes(db):
+    for keys in AUDIENCE_INDEXES:
+        await db.subscriptions.create_index(keys)
+
+async def count_audience(db, job_type: str) -> int:
+    """Exact audience size for a job type, counted from the index"""
+    return await db.subscriptions.count_documents(AUDIENCES[job_type])
+
+async def iter_subscriber_batches(db, query: Dict, batch_size: int = 1000) -> AsyncIterator[List[Dict]]:
+    """Stream projected subscribers in lists of `batch_size`, one cursor batch at a time"""
+    batch = []
+    async for subscriber in db.subscriptions.find(query, SUBSCRIBER_PROJECTION).batch_size(batch_size):
+        batch.append(subscriber)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# Reviews considered for the weekly digest before per-segment picking
+DIGEST_CANDIDATES = 30
+
+def default_campaign(job_type: str, payload: Dict, send_at: datetime = None) -> str:
+    """One digest campaign per ISO week, one alert campaign per review"""
+    if job_type == 'new_review':
+        return f"new_review:{payload['review_id']}"
+    year, week, _ = (send_at or datetime.utcnow()).isocalendar()
+    return f"{job_type}:{year}-W{week:02d}"
+
+async def enqueue_job(
+    db,
+    job_type: str,
+    payload: Dict,
+    audience_count: int = None,
+    campaign: str = None,
+    send_at: datetime = None
+) -> Dict:
+    """Queue a notification job for the worker; API handlers only call this
+
+    A campaign runs at most one job at a time: triggering it again while a job
+    is still in flight returns that job (with `reused` set) instead of queueing
+    a second one. Once it has finished, a new job resumes the campaign and only
+    reaches recipients missing from the delivery ledger.
+
+    With `send_at`, the worker renders and expands the job straight away but
+    its messages only become due at that time.
+    """
+    campaign = campaign or default_campaign(job_type, payload, send_at)
+    job = {
+        'id': str(uuid.uuid4()),
+        'type': job_type,
+        'campaign': campaign,
+        'payload': payload,
+        'audience_count': audience_count,
+        'send_at': send_at,
+        'status': 'pending',
+        'created_at': datetime.utcnow(),
+        'lease_owner': None,
+        'lease_expires_at': None
+    }
+
+    campaigns = db[CAMPAIGN_COLLECTION]
+    await campaigns.update_one(
+        {'id': campaign},
+        {'$setOnInsert': {
+            'id': campaign,
+            'type': job_type,
+            'created_at': job['created_at'],
+            'active_job_id': None,
+            'delivered': {}
+        }},
+        upsert=True
+    )
+    # Taking the campaign's single active slot is what makes triggers idempotent
+    claimed = await campaigns.find_one_and_update(
+        {'id': campaign, 'active_job_id': None},
+        {'$set': {'active_job_id': job['id'], 'last_job_id': job['id'], 'updated_at': job['created_at']},
+         '$inc': {'runs': 1}}
+    )
+    if not claimed:
+        active = await campaigns.find_one({'id': campaign}, {'active_job_id': 1})
+        existing = await db[JOB_COLLECTION].find_one({'id': active['active_job_id']}, {'_id': 0, 'content': 0})
+        if existing:
+            logger.info(f"Campaign {campaign} already has job {existing['id']} in flight")
+            existing['reused'] = True
+            return existing
+        # The active job is gone; take the slot over
+        await campaigns.update_one(
+            {'id': campaign, 'active_job_id': active['active_job_id']},
+            {'$set': {'active_job_id': job['id'], 'last_job_id': job['id'], 'updated_at': job['created_at']},
+             '$inc': {'runs': 1}}
+        )
+
+    await db[JOB_COLLECTION].insert_one(dict(job))
+    logger.info(f"Queued {job_type} notification job {job['id']} for campaign {campaign}")
+    job['reused'] = False
+    return job
+
+async def queue_weekly_digest(db, campaign: str = None, send_at: datetime = None) -> Optional[Dict]:
+    """Pick this week's candidate reviews and queue the digest; None if nobody is subscribed"""
+    subscriber_count = await count_audience(db, 'weekly_digest')
+    if not subscriber_count:
+        return None
+
+    # Candidate reviews (last 7 days); each digest segment picks its own from these
+    week_ago = (send_at or datetime.utcnow()) - timedelta(days=7)
+    reviews = await db.editorial_reviews.find({
+        'status': 'published',
+        'published_at': {'$gte': week_ago}
+    }, {'_id': 0, 'id': 1}).sort('published_at', DESCENDING).limit(DIGEST_CANDIDATES).to_list(DIGEST_CANDIDATES)
+
+    if not reviews:
+        # If no reviews in last 7 days, get latest 5 reviews
+        reviews = await db.editorial_reviews.find(
+            {'status': 'published'}, {'_id': 0, 'id': 1}
+        ).sort('published_at', DESCENDING).limit(5).to_list(5)
+
+    job = await enqueue_job(
+        db, 'weekly_digest', {'review_ids': [review['id'] for review in reviews]},
+        audience_count=subscriber_count, campaign=campaign, send_at=send_at
+    )
+    job['review_count'] = len(job['payload'].get('review_ids', []))
+    return job
+
+async def get_campaign_summary(db, campaign: str) -> Optional[Dict]:
+    """Campaign counters and the counters of its latest job, without scanning messages"""
+    summary = await db[CAMPAIGN_COLLECTION].find_one({'id': campaign}, {'_id': 0})
+    if not summary:
+        return None
+    if summary.get('last_job_id'):
+        summary['last_job'] = await db[JOB_COLLECTION].find_one(
+            {'id': summary['last_job_id']},
+            {'_id': 0, 'id': 1, 'status': 1, 'audience_count': 1, 'counters': 1,
+             'created_at': 1, 'expanded_at': 1, 'completed_at': 1}
+        )
+    summary['jobs'] = [
+        job['id'] async for job in
+        db[JOB_COLLECTION].find({'campaign': campaign}, {'id': 1}).sort('created_at', DESCENDING).limit(20)
+    ]
+    return summary
+
+async def get_job_status(db, job_id: str) -> Optional[Dict]:
+    """Job document with per-channel message status counts"""
+    job = await db[JOB_COLLECTION].find_one({'id': job_id}, {'_id': 0, 'content': 0})
+    if not job:
+        return None
+    counts = {}
+    async for row in db[MESSAGE_COLLECTION].aggregate([
+        {'$match': {'job_id': job_id}},
+        {'$group': {'_id': {'channel': '$channel', 'status': '$status'}, 'count': {'$sum': 1}}}
+    ]):
+        counts.setdefault(row['_id']['channel'], {})[row['_id']['status']] = row['count']
+    job['messages'] = counts
+    return job
+
+class NotificationOutbox:
+    """Durable, lease-based notification outbox shared by any number of workers
+
+    A job is expanded once into one message per recipient and channel; the
+    unique (job_id, channel, to) index makes re-expansion after a crash
+    harmless. Workers claim messages by stamping a lease on them, so several
+    worker processes can drain the same outbox and a crashed worker's claims
+    are picked up again once its leases expire. Deliveries are upserted into
+    the campaign ledger as they complete, and recipients already in it are
+    left out of later jobs of the same campaign.
+    """
+
+    def __init__(
+        self,
+        db,
+        worker_id: str = None,
+        lease_seconds: int = 120,
+        max_attempts: int = 5,
+        retry_delay: float = 30,
+        expand_batch_size: int = 1000
+    ):
+        self.db = db
+        self.jobs = db[JOB_COLLECTION]
+        self.messages = db[MESSAGE_COLLECTION]
+        self.campaigns = db[CAMPAIGN_COLLECTION]
+        self.ledger = db[LEDGER_COLLECTION]
+        self.worker_id = worker_id or f"worker-{uuid.uuid4().hex[:8]}"
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.expand_batch_size = expand_batch_size
+        self.content_cache = {}  # job id -> rendered content
+
+    async def ensure_indexes(self):
+        await ensure_audience_indexes(self.db)
+        await self.jobs.create_index('id', unique=True)
+        await self.jobs.create_index([('status', ASCENDING), ('created_at', ASCENDING)])
+        await self.messages.create_index(
+            [('job_id', ASCENDING), ('channel', ASCENDING), ('to', ASCENDING)], unique=True
+        )
+        await self.messages.create_index([('status', ASCENDING), ('channel', ASCENDING), ('next_attempt_at', ASCENDING)])
+        await self.messages.create_index([('status', ASCENDING), ('lease_expires_at', ASCENDING)])
+        await self.messages.create_index('claim_token')
+        await self.messages.create_index(
+            [('job_id', ASCENDING), ('channel', ASCENDING), ('segment', ASCENDING), ('status', ASCENDING)]
+        )
+        await self.jobs.create_index([('campaign', ASCENDING), ('created_at', DESCENDING)])
+        await self.campaigns.create_index('id', unique=True)
+        await self.ledger.create_index(
+            [('campaign', ASCENDING), ('to', ASCENDING), ('channel', ASCENDING)], unique=True
+        )
+
+    # Jobs
+
+    async def claim_job(self) -> Optional[Dict]:
+        """Take a pending job, or one whose expanding worker died"""
+        now = datetime.utcnow()
+        return await self.jobs.find_one_and_update(
+            {'$or': [
+                {'status': 'pending'},
+                {'status': 'expanding', 'lease_expires_at': {'$lte': now}}
+            ]},
+            {'$set': {
+                'status': 'expanding',
+                'lease_owner': self.worker_id,
+                'lease_expires_at': now + self.lease
+            }},
+            sort=[('created_at', ASCENDING)],
+            return_document=True
+        )
+
+    async def expand_job(self, job: Dict) -> int:
+        """Render the job's content once and write one message per recipient"""
+        # A job taken over from a crashed worker keeps the content its messages were queued with
+        content = job.get('content') or await self.render_content(job)
+        # Messages are claimable as soon as they are inserted, so their content must be there first
+        await self.jobs.update_one(
+            {'id': job['id'], 'lease_owner': self.worker_id},
+            {'$set': {
+                'content': content,
+                'segments': {key: segment['counts'] for key, segment in content.get('segments', {}).items()}
+            }}
+        )
+        queued = 0
+        recipients = 0
+        skipped = 0
+        # Only one batch of subscribers is held at a time, whatever the audience size
+        async for subscribers in iter_subscriber_batches(self.db, self.audience_query(job), self.expand_batch_size):
+            messages = [
+                self.message_document(job, channel, subscriber)
+                for subscriber in subscribers
+                for channel in self.channels(job, subscriber)
+            ]
+            recipients += len(subscribers)
+            undelivered = await self.without_delivered(job.get('campaign'), messages)
+            skipped += len(messages) - len(undelivered)
+            if undelivered:
+                queued += await self.insert_messages(undelivered)
+            await self.extend_job_lease(job)
+
+        await self.jobs.update_one(
+            {'id': job['id'], 'lease_owner': self.worker_id},
+            {'$set': {
+                'status': 'sending',
+                'audience_count': recipients,
+                'counters.queued': queued,
+                'counters.already_delivered': skipped,
+                'expanded_at': datetime.utcnow(),
+                'lease_owner': None,
+                'lease_expires_at': None
+            }}
+        )
+        logger.info(
+            f"Expanded job {job['id']} for {recipients} subscribers into {queued} messages "
+            f"({skipped} already delivered in campaign {job.get('campaign')})"
+        )
+        return queued
+
+    async def extend_job_lease(self, job: Dict):
+        await self.jobs.update_one(
+            {'id': job['id'], 'lease_owner': self.worker_id},
+            {'$set': {'lease_expires_at': datetime.utcnow() + self.lease}}
+        )
+
+    async def insert_messages(self, documents: List[Dict]) -> int:
+        try:
+            result = await self.messages.insert_many(documents, ordered=False)
+            return len(result.inserted_ids)
+        except BulkWriteError as e:
+            # Duplicates are messages a previous expansion already wrote
+            return e.details.get('nInserted', 0)
+
+    async def delivered_keys(self, campaign: str, messages: List[Dict]) -> set:
+        """(channel, to) pairs among `messages` the campaign ledger already has"""
+        if not campaign or not messages:
+            return set()
+        cursor = self.ledger.find(
+            {'campaign': campaign, 'to': {'$in': list({message['to'] for message in messages})}},
+            {'_id': 0, 'channel': 1, 'to': 1}
+        )
+        return {(entry['channel'], entry['to']) async for entry in cursor}
+
+    async def without_delivered(self, campaign: str, messages: List[Dict]) -> List[Dict]:
+        delivered = await self.delivered_keys(campaign, messages)
+        return [message for message in messages if (message['channel'], message['to']) not in delivered]
+
+    def audience_query(self, job: Dict) -> Dict:
+        return AUDIENCES[job['type']]
+
+    def channels(self, job: Dict, subscriber: Dict) -> List[str]:
+        channels = []
+        if job['type'] == 'weekly_digest' and subscriber.get('email'):
+            channels.append('email')
+        if subscriber.get('whatsapp_notifications') and subscriber.get('phone_number'):
+            channels.append('whatsapp')
+        return channels
+
+    def message_document(self, job: Dict, channel: str, subscriber: Dict) -> Dict:
+        return {
+            'job_id': job['id'],
+            'campaign': job.get('campaign'),
+            'channel': channel,
+            'segment': segment_key(subscriber.get('preferences')) if job['type'] == 'weekly_digest' else None,
+            'to': subscriber['email'] if channel == 'email' else subscriber['phone_number'],
+            'name': subscriber.get('name'),
+            'status': 'pending',
+            'attempts': 0,
+            'next_attempt_at': job.get('send_at') or datetime.utcnow(),
+            'created_at': datetime.utcnow()
+        }
+
+    async def render_content(self, job: Dict) -> Dict:
+        """Everything the senders need, rendered once per job"""
+        if job['type'] == 'new_review':
+            review = await self.db.editorial_reviews.find_one({'id': job['payload']['review_id']}, {'_id': 0, 'content': 0})
+            return {'whatsapp': whatsapp_service.new_review_message(review)}
+
+        # One render per subscriber segment rather than one digest for everyone
+        builder = DigestBuilder(self.db)
+        return await builder.build(job['payload'].get('review_ids', []), self.audience_query(job))
+
+    async def job_content(self, job_id: str) -> Dict:
+        if job_id not in self.content_cache:
+            job = await self.jobs.find_one({'id': job_id}, {'content': 1})
+            self.content_cache[job_id] = job['content']
+        return self.content_cache[job_id]
+
+    async def message_content(self, message: Dict, channel: str):
+        """The rendered content a message's segment gets on `channel`"""
+        content = await self.job_content(message['job_id'])
+        if 'segments' not in content:
+            return content[channel]
+        segments = content['segments']
+        return segments.get(message.get('segment'), segments[segment_key({})])[channel]
+
+    async def complete_jobs(self) -> int:
+        """Mark sending jobs whose messages are all settled as completed"""
+        completed = 0
+        async for job in self.jobs.find({'status': 'sending'}, {'id': 1, 'campaign': 1}):
+            open_messages = await self.messages.count_documents(
+                {'job_id': job['id'], 'status': {'$in': ['pending', 'sending']}}, limit=1
+            )
+            if open_messages:
+                continue
+            sent = await self.messages.count_documents({'job_id': job['id'], 'status': 'sent'})
+            failed = await self.messages.count_documents({'job_id': job['id'], 'status': 'failed'})
+            result = await self.jobs.update_one(
+                {'id': job['id'], 'status': 'sending'},
+                {'$set': {'status': 'completed', 'completed_at': datetime.utcnow(), 'sent': sent, 'failed': failed}}
+            )
+            if result.modified_count and job.get('campaign'):
+                # Free the campaign so the next trigger can resume it
+                await self.campaigns.update_one(
+                    {'id': job['campaign'], 'active_job_id': job['id']},
+                    {'$set': {'active_job_id': None, 'updated_at': datetime.utcnow()}}
+                )
+            self.content_cache.pop(job['id'], None)
+            logger.info(f"Notification job {job['id']} completed: {sent} sent, {failed} failed")
+            completed += 1
+        return completed
+
+    # Messages
+
+    async def claim_messages(self, channel: str, limit: int) -> List[Dict]:
+        """Lease up to `limit` due messages of one channel to this worker"""
+        now = datetime.utcnow()
+        claimable = {
+            'channel': channel,
+            '$or': [
+                {'status': 'pending', 'next_attempt_at': {'$lte': now}},
+                {'status': 'sending', 'lease_expires_at': {'$lte': now}}
+            ]
+        }
+        # Claim from the job and segment of the oldest due message, so a batch
+        # shares one rendered content and goes out as one request
+        head = await self.messages.find_one(claimable, {'job_id': 1, 'segment': 1}, sort=[('next_attempt_at', ASCENDING)])
+        if not head:
+            return []
+        claimable.update(job_id=head['job_id'], segment=head.get('segment'))
+        ids = [
+            message['_id'] async for message in
+            self.messages.find(claimable, {'_id': 1}).sort('next_attempt_at', ASCENDING).limit(limit)
+        ]
+        if not ids:
+            return []
+
+        # Repeating the filter in the update means two workers racing for the
+        # same ids each only get the ones they actually flipped
+        token = uuid.uuid4().hex
+        await self.messages.update_many(
+            {'_id': {'$in': ids}, **claimable},
+            {'$set': {
+                'status': 'sending',
+                'lease_owner': self.worker_id,
+                'lease_expires_at': now + self.lease,
+                'claim_token': token
+            }}
+        )
+        return await self.messages.find({'claim_token': token}).to_list(None)
+
+    async def record_results(self, messages: List[Dict], results: List[Dict]):
+        """Write per-recipient outcomes; failed sends are retried with exponential backoff"""
+        now = datetime.utcnow()
+        operations = []
+        ledger_entries = []
+        counters = {}
+        for message, result in zip(messages, results):
+            attempts = message['attempts'] + 1
+            if result['status'] == 'skipped':
+                update = {
+                    '$set': {'status': 'skipped', 'last_error': None},
+                    '$unset': {'lease_owner': '', 'lease_expires_at': '', 'claim_token': ''}
+                }
+                counters['skipped'] = counters.get('skipped', 0) + 1
+            elif result['status'] == 'sent':
+                update = {
+                    '$set': {'status': 'sent', 'sent_at': now, 'attempts': attempts, 'provider_id': result.get('provider_id'), 'last_error': None},
+                    '$unset': {'lease_owner': '', 'lease_expires_at': '', 'claim_token': ''}
+                }
+                counters['sent'] = counters.get('sent', 0) + 1
+                ledger_entries.append((message, result))
+            elif attempts >= self.max_attempts or result.get('permanent'):
+                update = {
+                    '$set': {'status': 'failed', 'failed_at': now, 'attempts': attempts, 'last_error': result.get('error')},
+                    '$unset': {'lease_owner': '', 'lease_expires_at': '', 'claim_token': ''}
+                }
+                counters['failed'] = counters.get('failed', 0) + 1
+            else:
+                delay = self.retry_delay * 2 ** (attempts - 1) * random.uniform(0.5, 1.5)
+                update = {
+                    '$set': {
+                        'status': 'pending',
+                        'attempts': attempts,
+                        'next_attempt_at': now + timedelta(seconds=delay),
+                        'last_error': result.get('error')
+                    },
+                    '$unset': {'lease_owner': '', 'lease_expires_at': '', 'claim_token': ''}
+                }
+            # Only the current lease holder may settle a message
+            operations.append(UpdateOne({'_id': message['_id'], 'claim_token': message['claim_token']}, update))
+        if operations:
+            await self.messages.bulk_write(operations, ordered=False)
+        await self.record_deliveries(ledger_entries, now)
+        await self.count_results(messages, counters)
+
+    async def record_deliveries(self, entries: List, now: datetime):
+        """Upsert delivered messages into the campaign ledger and bump its counters"""
+        entries = [(message, result) for message, result in entries if message.get('campaign')]
+        if not entries:
+            return
+        operations = [
+            UpdateOne(
+                {'campaign': message['campaign'], 'to': message['to'], 'channel': message['channel']},
+                {'$setOnInsert': {
+                    'job_id': message['job_id'],
+                    'delivered_at': now,
+                    'provider_id': result.get('provider_id')
+                }},
+                upsert=True
+            )
+            for message, result in entries
+        ]
+        result = await self.ledger.bulk_write(operations, ordered=False)
+        # Only first deliveries count; a re-sent lease that lost the race is already in the ledger
+        if result.upserted_count:
+            message = entries[0][0]
+            await self.campaigns.update_one(
+                {'id': message['campaign']},
+                {'$inc': {f"delivered.{message['channel']}": result.upserted_count}, '$set': {'updated_at': now}}
+            )
+
+    async def count_results(self, messages: List[Dict], counters: Dict):
+        """Keep the job's per-channel outcome counters current for the summary endpoint"""
+        if not messages or not counters:
+            return
+        channel = messages[0]['channel']
+        await self.jobs.update_one(
+            {'id': messages[0]['job_id']},
+            {'$inc': {f"counters.{status}.{channel}": count for status, count in counters.items()}}
+        )
+
+    async def send_email_batch(self, messages: List[Dict]) -> List[Dict]:
+        """Send claimed email messages of one job segment as a single personalized request"""
+        content = await self.message_content(messages[0], 'email')
+        return await self.send_email_recipients(messages, content)
+
+    async def send_email_recipients(self, messages: List[Dict], content: Dict) -> List[Dict]:
+        recipients = [{'email': message['to'], 'name': message.get('name')} for message in messages]
+        result = await asyncio.to_thread(
+            email_service.send_batch, 0, recipients, content['subject'], content['html'], content['text']
+        )
+        if result.get('permanent') and len(messages) > 1:
+            # SendGrid rejects the whole request for one bad address; halve the
+            # batch until it is isolated so only that recipient is given up on
+            middle = len(messages) // 2
+            return (
+                await self.send_email_recipients(messages[:middle], content)
+                + await self.send_email_recipients(messages[middle:], content)
+            )
+        outcome = {'status': result['status'], 'error': result['error'], 'permanent': result.get('permanent', False)}
+        return [dict(outcome) for _ in messages]
+
+    async def send_whatsapp_batch(self, messages: List[Dict]) -> List[Dict]:
+        """Send claimed WhatsApp messages of one job segment through the fan-out"""
+        template = await self.message_content(messages[0], 'whatsapp')
+        # One pair per message, in order: results are matched to messages by position
+        sendable = [message for message in messages if message.get('to')]
+        delivered = iter(await whatsapp_service.deliver([
+            (message['to'], whatsapp_service.personalize_message(template, message.get('name')))
+            for message in sendable
+        ]))
+        results = []
+        for message in messages:
+            if not message.get('to'):
+                results.append({'status': 'failed', 'error': 'No phone number', 'permanent': True})
+                continue
+            result = next(delivered)
+            results.append({
+                'status': result['status'],
+                'error': result.get('error'),
+                'provider_id': result.get('sid'),
+                # 4xx other than 429 will not succeed on a later attempt either
+                'permanent': result.get('http_status', 500) < 500 and result.get('http_status') != 429
+            })
+        return results
+
+    async def process_channel(self, channel: str, limit: int) -> int:
+        """Claim, send and settle one batch of a channel; returns messages handled"""
+        messages = await self.claim_messages(channel, limit)
+        if not messages:
+            return 0
+
+        by_job = {}
+        for message in messages:
+            by_job.setdefault((message['job_id'], message.get('segment')), []).append(message)
+
+        for job_messages in by_job.values():
+            # Another job of the same campaign may have got there first
+            delivered = await self.delivered_keys(job_messages[0].get('campaign'), job_messages)
+            if delivered:
+                skipped = [message for message in job_messages if (channel, message['to']) in delivered]
+                await self.record_results(skipped, [{'status': 'skipped'} for _ in skipped])
+                job_messages = [message for message in job_messages if (channel, message['to']) not in delivered]
+                if not job_messages:
+                    continue
+            try:
+                if channel == 'email':
+                    results = await self.send_email_batch(job_messages)
+                else:
+                    results = await self.send_whatsapp_batch(job_messages)
+            except Exception as e:
+                logger.error(f"Sending {len(job_messages)} {channel} messages failed: {e}")
+                results = [{'status': 'failed', 'error': str(e)} for _ in job_messages]
+            await self.record_results(job_messages, results)
+        return len(messages)
@@ -0,0 +1,298 @@
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+import logging
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_COLLECTION = 'rate_limits'
+
+# Signup bodies are a few hundred bytes; anything much larger is not a signup
+MAX_SIGNUP_BODY = 16 * 1024
+
+SIGNUP_PATHS = {'/api/subscriptions/subscribe', '/api/subscriptions/quick-subscribe'}
+
+# Admin writes that hold the database (or a send) for a long time share the small
+# admin pool; admin reads such as stats and job polling are ordinary requests
+HEAVY_ADMIN_PATHS = {
+    '/api/subscriptions/import',
+    '/api/subscriptions/send-weekly-digest',
+    '/api/migration/start-wordpress-migration',
+    '/api/migration/bulk-approve',
+    '/api/migration/clear-migration-data'
+}
+HEAVY_ADMIN_PREFIXES = ('/api/subscriptions/notify-new-review/',)
+
+def parse_rate(spec: str) -> Tuple[float, float]:
+    """'10/60' -> (capacity 10, refill 10 tokens per 60 seconds)"""
+    count, _, seconds = spec.partition('/')
+    capacity = float(count)
+    return capacity, capacity / float(seconds or 1)
+
+def route_class(path: str) -> str:
+    """Which concurrency pool a request draws from"""
+    if path in SIGNUP_PATHS:
+        return 'signup'
+    if path in HEAVY_ADMIN_PATHS or path.startswith(HEAVY_ADMIN_PREFIXES):
+        return 'admin'
+    return 'public'
+
+class TokenBuckets:
+    """Per-key token buckets kept in process memory
+
+    Each key holds up to `capacity` tokens and regains `rate` per second.
+    Only the most recently used `max_keys` are tracked; an evicted key
+    comes back with a full bucket, which only ever errs towards allowing.
+    """
+
+    def __init__(self, capacity: float, rate: float, max_keys: int = 100000):
+        self.capacity = capacity
+        self.rate = rate
+        self.max_keys = max_keys
+        self.buckets: OrderedDict = OrderedDict()
+
+    def take(self, key: str, now: float = None) -> float:
+        """Spend a token for `key`; 0 if allowed, otherwise seconds until one is available"""
+        now = time.monotonic() if now is None else now
+        tokens, updated = self.buckets.pop(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+        else:
+            wait = (1 - tokens) / self.rate
+        self.buckets[key] = (tokens, now)
+        if len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        return wait
+
+class SharedTokenBuckets:
+    """The same token buckets kept in MongoDB, so every API worker draws from one
+
+    Each take is a single atomic pipeline upsert that refills, checks and
+    spends in place. Documents expire through a TTL index once a bucket
+    would be full again anyway.
+    """
+
+    def __init__(self, db, capacity: float, rate: float):
+        self.collection = db[RATE_LIMIT_COLLECTION]
+        self.capacity = capacity
+        self.rate = rate
+        self.ttl = timedelta(seconds=math.ceil(capacity / rate))
+
+    async def ensure_indexes(self):
+        await self.collection.create_index('expires_at', expireAfterSeconds=0)
+
+    async def take(self, key: str) -> float:
+        now = datetime.utcnow()
+        refilled = {'$min': [self.capacity, {'$add': [
+            {'$ifNull': ['$tokens', self.capacity]},
+            {'$multiply': [
+                {'$divide': [{'$subtract': [now, {'$ifNull': ['$updated_at', now]}]}, 1000]},
+                self.rate
+            ]}
+        ]}]}
+        bucket = await self.collection.find_one_and_update(
+            {'_id': key},
+            [
+                {'$set': {'tokens': refilled}},
+                {'$set': {
+                    'allowed': {'$gte': ['$tokens', 1]},
+                    'tokens': {'$cond': [{'$gte': ['$tokens', 1]}, {'$subtract': ['$tokens', 1]}, '$tokens']},
+                    'updated_at': now,
+                    'expires_at': now + self.ttl
+                }}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if bucket['allowed']:
+            return 0.0
+        return (1 - bucket['tokens']) / self.rate
+
+class RateLimiter:
+    """Signup throttling and per-route-class admission control
+
+    Signups are limited per client IP and per email address. Local buckets
+    always run first, so a flood from one source is turned away without a
+    database round trip; with `db`, requests that pass locally are also
+    counted in the shared MongoDB buckets so the limits hold across workers.
+    Independently, each route class (public, signup, admin) has a cap on
+    requests in flight, and requests beyond it are rejected rather than queued.
+    """
+
+    def __init__(self, ip_rate: str = '10/60', email_rate: str = '3/3600',
+                 concurrency: Dict[str, int] = None, db=None, proxy_hops: int = 0):
+        self.limits = {'ip': parse_rate(ip_rate), 'email': parse_rate(email_rate)}
+        self.local = {kind: TokenBuckets(*limit) for kind, limit in self.limits.items()}
+        self.shared = {kind: SharedTokenBuckets(db, *limit) for kind, limit in self.limits.items()} if db is not None else {}
+        self.concurrency = concurrency or {'public': 200, 'signup': 50, 'admin': 4}
+        self.in_flight = {route: 0 for route in self.concurrency}
+        self.proxy_hops = proxy_hops
+        self.allowed = 0
+        self.rejected: Dict[str, int] = {}
+
+    async def ensure_indexes(self):
+        if self.shared:
+            await self.shared['ip'].ensure_indexes()
+
+    def client_ip(self, scope) -> str:
+        """Address of the client, taking `proxy_hops` trusted proxies' X-Forwarded-For into account"""
+        if self.proxy_hops:
+            for name, value in scope.get('headers', []):
+                if name == b'x-forwarded-for':
+                    hops = [hop.strip() for hop in value.decode('latin-1').split(',') if hop.strip()]
+                    if hops:
+                        return hops[-min(self.proxy_hops, len(hops))]
+        client = scope.get('client')
+        return client[0] if client else 'unknown'
+
+    async def take(self, kind: str, key: str) -> float:
+        wait = self.local[kind].take(key)
+        if wait or kind not in self.shared:
+            return wait
+        try:
+            return await self.shared[kind].take(f"{kind}:{key}")
+        except Exception as e:
+            # Losing the shared counter must not take signups down with it
+            logger.error(f"Shared rate limit check failed, allowing: {e}")
+            return 0.0
+
+    async def check_signup(self, ip: str, email: Optional[str]) -> Tuple[Optional[str], float]:
+        """(limit hit, seconds to wait), or (None, 0) when the signup may go ahead"""
+        wait = await self.take('ip', ip)
+        if wait:
+            return 'ip', wait
+        if email:
+            wait = await self.take('email', email)
+            if wait:
+                return 'email', wait
+        return None, 0.0
+
+    def admit(self, route: str) -> bool:
+        if self.in_flight[route] >= self.concurrency[route]:
+            return False
+        self.in_flight[route] += 1
+        return True
+
+    def release(self, route: str):
+        self.in_flight[route] -= 1
+
+    def reject(self, reason: str):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+
+    def report(self) -> Dict:
+        return {
+            'allowed': self.allowed,
+            'rejected': dict(self.rejected),
+            'in_flight': dict(self.in_flight),
+            'concurrency': dict(self.concurrency),
+            'shared': bool(self.shared),
+            'limits': {kind: {'capacity': capacity, 'per_second': round(rate, 5)} for kind, (capacity, rate) in self.limits.items()}
+        }
+
+def signup_email(body: bytes) -> Optional[str]:
+    try:
+        email = json.loads(body).get('email')
+    except (ValueError, AttributeError):
+        return None
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+async def send_rejection(send, status: int, detail: str, retry_after: float):
+    body = json.dumps({'detail': detail}).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            (b'retry-after', str(max(1, math.ceil(retry_after))).encode())
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+def replay_body(body: bytes, receive):
+    """An ASGI receive that hands out an already read body, then defers to `receive`"""
+    replayed = False
+
+    async def replaying_receive():
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        return await receive()
+
+    return replaying_receive
+
+class RateLimitMiddleware:
+    """ASGI middleware applying a RateLimiter to /api requests
+
+    Signup bodies are read up front to find the email address and then
+    replayed to the route unchanged.
+    """
+
+    def __init__(self, app, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] == 'OPTIONS' or not scope['path'].startswith('/api'):
+            await self.app(scope, receive, send)
+            return
+
+        route = route_class(scope['path'])
+        if route == 'signup' and scope['method'] == 'POST':
+            body = b''
+            more_body = True
+            while more_body:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body += message.get('body', b'')
+                more_body = message.get('more_body', False)
+                if len(body) > MAX_SIGNUP_BODY:
+                    self.limiter.reject('too_large')
+                    await send_rejection(send, 413, "Request body too large", 60)
+                    return
+
+            limit, wait = await self.limiter.check_signup(self.limiter.client_ip(scope), signup_email(body))
+            if limit:
+                self.limiter.reject(limit)
+                await send_rejection(send, 429, "Too many signup attempts, please try again later", wait)
+                return
+
+            receive = replay_body(body, receive)
+
+        if not self.limiter.admit(route):
+            self.limiter.reject(f"{route}_busy")
+            await send_rejection(send, 429, "Server busy, please retry shortly", 1)
+            return
+        self.limiter.allowed += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release(route)
+
+def create_rate_limiter(db=None) -> RateLimiter:
+    """RateLimiter configured from the environment
+
+    RATE_LIMIT_SHARED=1 keeps the signup buckets in MongoDB for multi-worker
+    deployments; RATE_LIMIT_PROXY_HOPS is the number of reverse proxies in
+    front of the API whose X-Forwarded-For entries can be trusted.
+    """
+    return RateLimiter(
+        ip_rate=os.getenv('SIGNUP_RATE_PER_IP', '10/60'),
+        email_rate=os.getenv('SIGNUP_RATE_PER_EMAIL', '3/3600'),
+        concurrency={
+            'public': int(os.getenv('MAX_CONCURRENT_PUBLIC', '200')),
+            'signup': int(os.getenv('MAX_CONCURRENT_SIGNUP', '50')),
+            'admin': int(os.getenv('MAX_CONCURRENT_ADMIN', '4'))
+        },
+        db=db if os.getenv('RATE_LIMIT_SHARED') == '1' else None,
+        proxy_hops=int(os.getenv('RATE_LIMIT_PROXY_HOPS', '0'))
+    )
@@ -0,0 +1,205 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+import logging
+from bson import Binary
+
+logger = logging.getLogger(__name__)
+
+CACHE_COLLECTION = 'review_cache'
+
+# Longer ids are never review ids; answer 404 without caching or a lookup
+MAX_REVIEW_ID_LENGTH = 64
+
+# (JSON body, ETag) of a cached review
+CachedReview = Tuple[bytes, str]
+
+def etag_for(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+class ReviewCache:
+    """Read-through cache of serialized review detail responses
+
+    An in-process LRU holds the JSON bytes of up to `max_entries` reviews for
+    `ttl` seconds. Behind it, an optional shared tier in MongoDB holds the same
+    bytes for `shared_ttl` seconds, so one worker's render serves all of them.
+    Unknown ids are remembered for `negative_ttl` seconds in a separate, bounded
+    LRU, so crawler 404 storms neither reach the database nor evict real
+    reviews. Concurrent misses for one id share a single load.
+
+    Invalidation clears both tiers for the ids given. Other workers' local
+    copies are not told and expire within `ttl`.
+    """
+
+    def __init__(self, max_entries: int = 5000, ttl: float = 30, shared_ttl: float = 600,
+                 negative_entries: int = 20000, negative_ttl: float = 60, shared: bool = True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared_ttl = timedelta(seconds=shared_ttl)
+        self.negative_entries = negative_entries
+        self.negative_ttl = negative_ttl
+        self.shared = shared
+        self.entries: OrderedDict = OrderedDict()  # id -> (body, etag, expires)
+        self.missing: OrderedDict = OrderedDict()  # id -> expires
+        self.loading: Dict[str, asyncio.Future] = {}
+        # Bumped by every invalidation; a load that started before one is not cached
+        self.generation = 0
+
+        self.hits = {'local': 0, 'shared': 0, 'negative': 0, 'coalesced': 0}
+        self.loads = 0
+        self.not_found = 0
+
+    async def ensure_indexes(self, db):
+        await db[CACHE_COLLECTION].create_index('expires_at', expireAfterSeconds=0)
+        # The read-through source looks reviews up by id
+        await db.editorial_reviews.create_index('id')
+
+    def get_local(self, review_id: str, now: float) -> Optional[CachedReview]:
+        entry = self.entries.get(review_id)
+        if entry is None:
+            return None
+        if entry[2] <= now:
+            del self.entries[review_id]
+            return None
+        self.entries.move_to_end(review_id)
+        return entry[0], entry[1]
+
+    def is_missing(self, review_id: str, now: float) -> bool:
+        expires = self.missing.get(review_id)
+        if expires is None:
+            return False
+        if expires <= now:
+            del self.missing[review_id]
+            return False
+        return True
+
+    def put_local(self, review_id: str, cached: Optional[CachedReview]):
+        now = time.monotonic()
+        if cached is None:
+            self.missing[review_id] = now + self.negative_ttl
+            self.missing.move_to_end(review_id)
+            if len(self.missing) > self.negative_entries:
+                self.missing.popitem(last=False)
+            return
+        self.missing.pop(review_id, None)
+        self.entries[review_id] = (cached[0], cached[1], now + self.ttl)
+        self.entries.move_to_end(review_id)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def get(self, db, review_id: str, load: Callable[[], Awaitable[Optional[bytes]]]) -> Optional[CachedReview]:
+        """(body, etag) for `review_id`, or None when it does not exist
+
+        `load` renders the review from the database, returning None for an
+        unknown id; it only runs when neither tier has the review.
+        """
+        if len(review_id) > MAX_REVIEW_ID_LENGTH:
+            self.not_found += 1
+            return None
+        now = time.monotonic()
+        cached = self.get_local(review_id, now)
+        if cached is not None:
+            self.hits['local'] += 1
+            return cached
+        if self.is_missing(review_id, now):
+            self.hits['negative'] += 1
+            return None
+
+        if review_id in self.loading:
+            self.hits['coalesced'] += 1
+            return await asyncio.shield(self.loading[review_id])
+
+        future = asyncio.get_running_loop().create_future()
+        self.loading[review_id] = future
+        try:
+            cached = await self.fill(db, review_id, load)
+            future.set_result(cached)
+            return cached
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters see the exception; keep it from being reported as unretrieved
+            future.exception()
+            raise
+        finally:
+            del self.loading[review_id]
+
+    async def fill(self, db, review_id: str, load) -> Optional[CachedReview]:
+        generation = self.generation
+        if self.shared:
+            try:
+                entry = await db[CACHE_COLLECTION].find_one({'_id': review_id, 'expires_at': {'$gt': datetime.utcnow()}})
+            except Exception as e:
+                logger.error(f"Shared review cache read failed: {e}")
+                entry = None
+            if entry is not None:
+                self.hits['shared'] += 1
+                cached = (bytes(entry['body']), entry['etag'])
+                if generation == self.generation:
+                    self.put_local(review_id, cached)
+                return cached
+
+        self.loads += 1
+        body = await load()
+        cached = (body, etag_for(body)) if body is not None else None
+        if cached is None:
+            self.not_found += 1
+        if generation != self.generation:
+            return cached  # invalidated while loading; serve it but don't keep it
+        self.put_local(review_id, cached)
+        if self.shared and cached is not None:
+            try:
+                await db[CACHE_COLLECTION].replace_one(
+                    {'_id': review_id},
+                    {'body': Binary(body), 'etag': cached[1], 'expires_at': datetime.utcnow() + self.shared_ttl},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.error(f"Shared review cache write failed: {e}")
+        return cached
+
+    async def invalidate(self, db, review_ids: Iterable[str]):
+        """Drop reviews from both tiers after they are published or changed"""
+        review_ids = list(review_ids)
+        if not review_ids:
+            return
+        self.generation += 1
+        for review_id in review_ids:
+            self.entries.pop(review_id, None)
+            self.missing.pop(review_id, None)
+        if self.shared:
+            try:
+                await db[CACHE_COLLECTION].delete_many({'_id': {'$in': review_ids}})
+            except Exception as e:
+                logger.error(f"Could not invalidate shared review cache for {len(review_ids)} reviews: {e}")
+
+    def clear(self):
+        self.generation += 1
+        self.entries.clear()
+        self.missing.clear()
+
+    def report(self) -> Dict:
+        hits = sum(self.hits.values())
+        lookups = hits + self.loads
+        return {
+            'hits': dict(self.hits),
+            'loads': self.loads,
+            'not_found': self.not_found,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0,
+            'entries': len(self.entries),
+            'negative_entries': len(self.missing),
+            'bytes': sum(len(entry[0]) for entry in self.entries.values()),
+            'shared': self.shared
+        }
+
+# Global review cache instance
+review_cache = ReviewCache(
+    max_entries=int(os.getenv('REVIEW_CACHE_SIZE', '5000')),
+    ttl=float(os.getenv('REVIEW_CACHE_TTL_SECONDS', '30')),
+    shared_ttl=float(os.getenv('REVIEW_CACHE_SHARED_TTL_SECONDS', '600')),
+    negative_ttl=float(os.getenv('REVIEW_CACHE_NEGATIVE_TTL_SECONDS', '60')),
+    shared=os.getenv('REVIEW_CACHE_SHARED', '1') == '1'
+)
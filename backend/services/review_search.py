@@ -0,0 +1,328 @@
+import asyncio
+import math
+import os
+import re
+import time
+import unicodedata
+from array import array
+from collections import Counter
+from functools import lru_cache
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import logging
+import numpy as np
+from pymongo import ASCENDING
+from review_storage import review_body_store
+
+logger = logging.getLogger(__name__)
+
+# Weight of a term occurrence in each field; a title match counts three body matches
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'title_hindi': 3.0,
+    'tags': 2.0,
+    'author': 2.0,
+    'excerpt': 1.5,
+    'content': 1.0
+}
+
+# Stored with each indexed review so results need no database round trip
+DISPLAY_FIELDS = ['id', 'movie_id', 'title', 'title_hindi', 'author', 'excerpt', 'tags', 'rating', 'read_time', 'image', 'featured', 'published_at']
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'for', 'from', 'has', 'have', 'he', 'her', 'his',
+    'in', 'is', 'it', 'its', 'of', 'on', 'or', 'she', 'that', 'the', 'their', 'they', 'this', 'to', 'was',
+    'were', 'which', 'with',
+    'और', 'का', 'की', 'के', 'को', 'है', 'हैं', 'था', 'थी', 'थे', 'में', 'से', 'पर', 'यह', 'वह', 'ने', 'भी',
+    'तो', 'एक', 'कि', 'जो', 'इस', 'उस', 'हो', 'ही'
+}
+
+# Latin words, or runs of Devanagari letters and signs; the dandas (।॥) separate
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+|[\u0900-\u0963\u0966-\u097f]+')
+POSSESSIVE = re.compile(r"['\u2019]s\b")
+
+DEVANAGARI_DIGITS = re.compile(r'[\u0966-\u096f]')
+DIGIT_FOLDING = str.maketrans({chr(0x0966 + digit): str(digit) for digit in range(10)})
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize('NFKC', text).casefold()
+    if not text.isascii():
+        # ज़ matches ज, chandrabindu matches anusvara, joiners are invisible
+        text = text.replace('\u093c', '').replace('\u0901', '\u0902').replace('\u200c', '').replace('\u200d', '')
+        if DEVANAGARI_DIGITS.search(text):
+            text = text.translate(DIGIT_FOLDING)
+    return POSSESSIVE.sub('', text)
+
+@lru_cache(maxsize=200000)
+def index_term(token: str) -> Optional[str]:
+    """Index term for a raw token, or None for a stopword"""
+    if token in STOPWORDS:
+        return None
+    if len(token) > 4 and token.endswith('s') and not token.endswith('ss') and token.isascii():
+        return token[:-1]  # plurals: reviews -> review
+    return token
+
+def tokenize(text: str) -> List[str]:
+    """Search terms of Hindi/English text, identically for documents and queries"""
+    if not text:
+        return []
+    return [token for token in map(index_term, TOKEN_PATTERN.findall(normalize_text(text))) if token]
+
+def field_text(review: Dict, field: str) -> str:
+    value = review.get(field)
+    if isinstance(value, list):
+        return ' '.join(str(item) for item in value)
+    return value or ''
+
+class ReviewSearchIndex:
+    """In-process inverted index over published reviews with BM25 ranking
+
+    Each term keeps compact parallel arrays of (document number, field
+    weighted term frequency); queries score the postings of their terms with
+    numpy, so a query costs time proportional to its postings rather than
+    to the collection. An updated review gets a new document number and the
+    old one is tombstoned until the next compaction.
+
+    `sync` builds the index on first use and afterwards only reads reviews
+    whose updated_at moved past the last sync, so every API worker picks up
+    publishes and edits within `sync_interval` seconds of its next search.
+    """
+
+    # updated_at is set by the writer's clock; re-read a little behind the watermark
+    SYNC_OVERLAP = timedelta(seconds=5)
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, sync_interval: float = 5.0):
+        self.k1 = k1
+        self.b = b
+        self.sync_interval = sync_interval
+        self.clear()
+        self.syncing: Optional[asyncio.Task] = None
+
+    def clear(self):
+        self.postings: Dict[str, tuple] = {}  # term -> (array('I') doc numbers, array('f') weighted tf)
+        self.lengths = array('f')  # weighted length of each document number
+        self.live = bytearray()  # 0 once a document number is replaced or removed
+        self.documents: List[Optional[Dict]] = []  # display fields by document number
+        self.doc_numbers: Dict[str, int] = {}  # review id -> current document number
+        self.total_length = 0.0
+        self.watermark: Optional[datetime] = None
+        self.synced_at = 0.0
+        self.built = False
+
+    def __len__(self) -> int:
+        return len(self.doc_numbers)
+
+    def add(self, review: Dict):
+        """Index a published review, replacing an earlier version"""
+        self.remove(review['id'])
+        frequencies = {}
+        length = 0.0
+        for field, weight in FIELD_WEIGHTS.items():
+            text = field_text(review, field)
+            if not text:
+                continue
+            # Normalize each distinct token once rather than every occurrence
+            for token, occurrences in Counter(TOKEN_PATTERN.findall(normalize_text(text))).items():
+                token = index_term(token)
+                if token:
+                    frequencies[token] = frequencies.get(token, 0.0) + weight * occurrences
+                    length += weight * occurrences
+        number = len(self.documents)
+        index = self.postings
+        for token, frequency in frequencies.items():
+            postings = index.get(token)
+            if postings is None:
+                postings = index[token] = (array('I'), array('f'))
+            postings[0].append(number)
+            postings[1].append(frequency)
+        self.lengths.append(length)
+        self.live.append(1)
+        self.documents.append({field: review.get(field) for field in DISPLAY_FIELDS})
+        self.doc_numbers[review['id']] = number
+        self.total_length += length
+
+    def remove(self, review_id: str):
+        number = self.doc_numbers.pop(review_id, None)
+        if number is not None:
+            self.live[number] = 0
+            self.documents[number] = None
+            self.total_length -= self.lengths[number]
+
+    def search(self, query: str, limit: int = 20, skip: int = 0) -> Dict:
+        terms = list(dict.fromkeys(tokenize(query)))
+        count = len(self.doc_numbers)
+        if not terms or not count:
+            return {'total': 0, 'results': []}
+
+        lengths = np.frombuffer(self.lengths, dtype=np.float32)
+        scores = np.zeros(len(lengths), dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * lengths / (self.total_length / count))
+        for term in terms:
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            numbers = np.frombuffer(postings[0], dtype=np.uint32)
+            frequencies = np.frombuffer(postings[1], dtype=np.float32)
+            # Tombstoned postings inflate document frequency slightly until compaction
+            frequency = min(len(numbers), count)
+            idf = math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            scores[numbers] += idf * frequencies * (self.k1 + 1) / (frequencies + norm[numbers])
+        scores *= np.frombuffer(self.live, dtype=np.uint8)
+
+        matches = np.flatnonzero(scores)
+        wanted = min(skip + limit, len(matches))
+        if wanted:
+            top = matches[np.argpartition(-scores[matches], wanted - 1)[:wanted]]
+            top = top[np.argsort(-scores[top], kind='stable')][skip:]
+        else:
+            top = []
+        return {
+            'total': len(matches),
+            'results': [
+                {**self.documents[number], 'score': round(float(scores[number]), 4)}
+                for number in top
+            ]
+        }
+
+    def compact(self):
+        """Renumber documents and drop tombstoned postings"""
+        live = np.frombuffer(self.live, dtype=np.uint8).astype(bool)
+        renumber = (np.cumsum(live) - 1).astype(np.uint32)
+        postings = {}
+        for term, (numbers, frequencies) in self.postings.items():
+            numbers = np.frombuffer(numbers, dtype=np.uint32)
+            keep = live[numbers]
+            if keep.any():
+                postings[term] = (
+                    array('I', renumber[numbers[keep]].tobytes()),
+                    array('f', np.frombuffer(frequencies, dtype=np.float32)[keep].tobytes())
+                )
+        order = sorted(self.doc_numbers.items(), key=lambda item: item[1])
+        self.postings = postings
+        self.lengths = array('f', [self.lengths[number] for _, number in order])
+        self.documents = [self.documents[number] for _, number in order]
+        self.live = bytearray(b'\x01' * len(order))
+        self.doc_numbers = {review_id: index for index, (review_id, _) in enumerate(order)}
+
+    async def sync(self, db, batch_size: int = 500) -> int:
+        """Index reviews published or changed since the last sync; returns how many were read"""
+        query = {'updated_at': {'$gte': self.watermark - self.SYNC_OVERLAP}} if self.watermark else {}
+        started = time.monotonic()
+        read = 0
+        batch = []
+        watermark = self.watermark
+        cursor = db.editorial_reviews.find(query, {'_id': 0}).sort('updated_at', ASCENDING).batch_size(batch_size)
+        async for review in cursor:
+            batch.append(review)
+            if review.get('updated_at') and (watermark is None or review['updated_at'] > watermark):
+                watermark = review['updated_at']
+            if len(batch) >= batch_size:
+                read += await self.index_batch(db, batch)
+                batch = []
+        if batch:
+            read += await self.index_batch(db, batch)
+        self.watermark = watermark
+        self.synced_at = time.monotonic()
+        if not self.built:
+            self.built = True
+            logger.info(f"Built review search index: {len(self)} reviews, {len(self.postings)} terms "
+                        f"in {time.monotonic() - started:.1f}s")
+        if len(self.documents) > 2 * max(len(self), 1000):
+            self.compact()
+        return read
+
+    async def catch_up(self, db):
+        try:
+            await self.sync(db)
+        except Exception as e:
+            logger.error(f"Review search sync failed: {e}")
+
+    async def index_batch(self, db, reviews: List[Dict]) -> int:
+        await review_body_store.hydrate(db, reviews)
+        for position, review in enumerate(reviews, 1):
+            if review.get('status') == 'published':
+                self.add(review)
+            else:
+                self.remove(review['id'])
+            if position % 50 == 0:
+                await asyncio.sleep(0)  # indexing is CPU-bound; keep requests moving during a full build
+        return len(reviews)
+
+    async def refresh(self, db):
+        """Sync now, or wait for the sync already running"""
+        if self.syncing is None or self.syncing.done():
+            self.syncing = asyncio.create_task(self.catch_up(db))
+        await asyncio.shield(self.syncing)
+
+    def refresh_in_background(self, db):
+        """Pick up a write without making its request wait for the sync
+
+        Nothing is started while the first build or another sync is running;
+        the write's updated_at is past the watermark, so the next query's
+        catch-up reads it.
+        """
+        if self.built and (self.syncing is None or self.syncing.done()):
+            self.syncing = asyncio.create_task(self.catch_up(db))
+
+    async def query(self, db, text: str, limit: int = 20, skip: int = 0) -> Dict:
+        """Search, first catching up on publishes if the last sync is older than `sync_interval`"""
+        if time.monotonic() - self.synced_at > self.sync_interval:
+            if not self.built:
+                await self.refresh(db)
+            elif self.syncing is None or self.syncing.done():
+                # Catch up in the background; this query uses the index as it is
+                self.syncing = asyncio.create_task(self.catch_up(db))
+        return {**self.search(text, limit, skip), 'backend': 'memory'}
+
+    async def ensure_indexes(self, db):
+        await db.editorial_reviews.create_index('updated_at')
+
+class MongoTextSearch:
+    """The same search on a MongoDB text index, for deployments that prefer no in-process index
+
+    MongoDB ranks by its own text score with the same field weights.
+    Language-specific stemming is off (default_language none), so Hindi
+    text is not run through an English stemmer. Bodies stored compressed in
+    review_bodies are not indexed.
+    """
+
+    INDEX_NAME = 'review_text_search'
+
+    async def ensure_indexes(self, db):
+        await db.editorial_reviews.create_index(
+            [(field, 'text') for field in FIELD_WEIGHTS],
+            name=self.INDEX_NAME,
+            weights={field: int(weight * 2) for field, weight in FIELD_WEIGHTS.items()},
+            default_language='none',
+            language_override='text_language'
+        )
+
+    async def query(self, db, text: str, limit: int = 20, skip: int = 0) -> Dict:
+        terms = tokenize(text)
+        if not terms:
+            return {'total': 0, 'results': [], 'backend': 'mongo'}
+        match = {'$text': {'$search': ' '.join(terms)}, 'status': 'published'}
+        projection = {'_id': 0, 'score': {'$meta': 'textScore'}, **{field: 1 for field in DISPLAY_FIELDS}}
+        results = await db.editorial_reviews.find(match, projection).sort(
+            [('score', {'$meta': 'textScore'})]
+        ).skip(skip).limit(limit).to_list(limit)
+        return {
+            'total': await db.editorial_reviews.count_documents(match),
+            'results': results,
+            'backend': 'mongo'
+        }
+
+    async def refresh(self, db):
+        pass  # MongoDB maintains the text index on every write
+
+    def refresh_in_background(self, db):
+        pass
+
+def create_review_search():
+    """Search backend from REVIEW_SEARCH_BACKEND: 'memory' (default) or 'mongo'"""
+    if os.getenv('REVIEW_SEARCH_BACKEND', 'memory') == 'mongo':
+        return MongoTextSearch()
+    return ReviewSearchIndex(sync_interval=float(os.getenv('REVIEW_SEARCH_SYNC_SECONDS', '5')))
+
+# Global review search instance
+review_search = create_review_search()
@@ -0,0 +1,274 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Set
+import logging
+from zoneinfo import ZoneInfo
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from services.notification_outbox import queue_weekly_digest
+from services.stats import reconcile_counters
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_COLLECTION = 'schedules'
+LOCK_COLLECTION = 'scheduler_locks'
+LEADER_LOCK_ID = 'scheduler'
+DEFAULT_TIMEZONE = 'Asia/Kolkata'
+
+class CronSchedule:
+    """Five-field cron expression: minute hour day-of-month month day-of-week
+
+    Supports `*`, lists, ranges and steps (`*/15`, `1-5`, `0,30`). Day of
+    week runs 0-6 from Sunday (7 is Sunday too). As in cron, when both day
+    fields are restricted a day matching either one fires. Times are
+    evaluated in `timezone` and returned as naive UTC, like the rest of
+    the stored datetimes.
+    """
+
+    FIELDS = [('minute', 0, 59), ('hour', 0, 23), ('day', 1, 31), ('month', 1, 12), ('weekday', 0, 7)]
+
+    def __init__(self, expression: str, timezone: str = DEFAULT_TIMEZONE):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        self.timezone = ZoneInfo(timezone)
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self.parse_field(part, low, high) for part, (_, low, high) in zip(parts, self.FIELDS)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = parts[2] == '*'
+        self.any_weekday = parts[4] == '*'
+
+    @staticmethod
+    def parse_field(field: str, low: int, high: int) -> Set[int]:
+        values = set()
+        for part in field.split(','):
+            value_range, _, step = part.partition('/')
+            if value_range == '*':
+                start, end = low, high
+            elif '-' in value_range:
+                start, end = (int(value) for value in value_range.split('-'))
+            else:
+                start = end = int(value_range)
+                if step:
+                    end = high
+            if not low <= start <= end <= high:
+                raise ValueError(f"Cron field {field!r} is outside {low}-{high}")
+            values.update(range(start, end + 1, int(step) if step else 1))
+        return values
+
+    def day_matches(self, local: datetime) -> bool:
+        day = local.day in self.days
+        weekday = (local.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, after: datetime) -> datetime:
+        """First fire time strictly after `after` (naive UTC)"""
+        local = after.replace(tzinfo=ZoneInfo('UTC')).astimezone(self.timezone).replace(tzinfo=None)
+        local = local.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = local + timedelta(days=366 * 5)
+        while local < limit:
+            if local.month not in self.months:
+                month = local.month % 12 + 1
+                local = local.replace(year=local.year + (month == 1), month=month, day=1, hour=0, minute=0)
+            elif not self.day_matches(local):
+                local = (local + timedelta(days=1)).replace(hour=0, minute=0)
+            elif local.hour not in self.hours:
+                local = (local + timedelta(hours=1)).replace(minute=0)
+            elif local.minute not in self.minutes:
+                local += timedelta(minutes=1)
+            else:
+                return local.replace(tzinfo=self.timezone).astimezone(ZoneInfo('UTC')).replace(tzinfo=None)
+        raise ValueError(f"Cron expression {self.expression!r} never fires")
+
+    def upcoming(self, after: datetime, count: int = 3) -> List[datetime]:
+        runs = []
+        for _ in range(count):
+            after = self.next_after(after)
+            runs.append(after)
+        return runs
+
+async def weekly_digest_task(db, run_at: datetime) -> Dict:
+    """Queue the digest ahead of time; its messages become due at `run_at`"""
+    job = await queue_weekly_digest(db, send_at=run_at)
+    if not job:
+        return {'skipped': 'No active subscribers'}
+    return {
+        'job_id': job['id'],
+        'campaign': job['campaign'],
+        'reused': job['reused'],
+        'audience_count': job['audience_count'],
+        'review_count': job['review_count']
+    }
+
+async def reconcile_counters_task(db, run_at: datetime) -> Dict:
+    """Recount the dashboard counters to undo any drift"""
+    return {'drift': await reconcile_counters(db)}
+
+TASKS = {
+    'weekly_digest': weekly_digest_task,
+    'reconcile_counters': reconcile_counters_task
+}
+
+def default_schedules() -> List[Dict]:
+    """Schedules configured from the environment; the digest goes out 09:00 IST every Sunday by default"""
+    return [{
+        'id': 'weekly_digest',
+        'task': 'weekly_digest',
+        'cron': os.getenv('WEEKLY_DIGEST_CRON', '0 9 * * 0'),
+        'timezone': os.getenv('SCHEDULER_TIMEZONE', DEFAULT_TIMEZONE),
+        'prepare_minutes': int(os.getenv('WEEKLY_DIGEST_PREPARE_MINUTES', '30')),
+        'enabled': os.getenv('WEEKLY_DIGEST_ENABLED', '1') == '1'
+    }, {
+        'id': 'reconcile_counters',
+        'task': 'reconcile_counters',
+        'cron': os.getenv('COUNTER_RECONCILE_CRON', '30 3 * * *'),
+        'timezone': os.getenv('SCHEDULER_TIMEZONE', DEFAULT_TIMEZONE),
+        'prepare_minutes': 0,
+        'enabled': True
+    }]
+
+async def get_scheduler_state(db) -> Dict:
+    """Schedules with their next runs, and which worker currently leads"""
+    now = datetime.utcnow()
+    schedules = []
+    async for schedule in db[SCHEDULE_COLLECTION].find({}, {'_id': 0}):
+        try:
+            cron = CronSchedule(schedule['cron'], schedule.get('timezone', DEFAULT_TIMEZONE))
+            schedule['upcoming'] = cron.upcoming(now) if schedule.get('enabled') else []
+        except ValueError as e:
+            schedule['error'] = str(e)
+        schedules.append(schedule)
+    leader = await db[LOCK_COLLECTION].find_one({'_id': LEADER_LOCK_ID})
+    if leader:
+        leader = {
+            'owner': leader['owner'],
+            'expires_at': leader['expires_at'],
+            'active': leader['expires_at'] > now
+        }
+    return {'now': now, 'leader': leader, 'schedules': schedules}
+
+class Scheduler:
+    """Cron-style scheduler that runs inside every notification worker
+
+    Workers compete for a leader lock in MongoDB; only the holder fires
+    schedules, and a crashed leader's lock expires after `lock_seconds`.
+    Each run is prepared `prepare_minutes` ahead: the digest is rendered
+    and expanded into outbox messages that only become due at the run
+    time, so the send window itself is pure delivery. Every state change
+    is conditional on the schedule's current next_run_at, so even a
+    deposed leader finishing a tick cannot fire a run twice.
+    """
+
+    def __init__(self, db, owner_id: str, lock_seconds: int = 60, tick_seconds: float = 30, schedules: List[Dict] = None):
+        self.db = db
+        self.schedules = db[SCHEDULE_COLLECTION]
+        self.locks = db[LOCK_COLLECTION]
+        self.owner_id = owner_id
+        self.lock = timedelta(seconds=lock_seconds)
+        self.tick_seconds = tick_seconds
+        self.configured = schedules if schedules is not None else default_schedules()
+
+    async def ensure_schedules(self):
+        """Sync configured schedules into Mongo, keeping run state unless the timing changed"""
+        now = datetime.utcnow()
+        for config in self.configured:
+            cron = CronSchedule(config['cron'], config['timezone'])
+            existing = await self.schedules.find_one({'id': config['id']})
+            update = {'$set': dict(config, updated_at=now)}
+            if (not existing or existing.get('cron') != config['cron']
+                    or existing.get('timezone') != config['timezone'] or not existing.get('next_run_at')):
+                update['$set']['next_run_at'] = cron.next_after(now)
+            await self.schedules.update_one({'id': config['id']}, update, upsert=True)
+
+    async def acquire_leadership(self) -> bool:
+        now = datetime.utcnow()
+        try:
+            lock = await self.locks.find_one_and_update(
+                {'_id': LEADER_LOCK_ID, '$or': [{'owner': self.owner_id}, {'expires_at': {'$lte': now}}]},
+                {'$set': {'owner': self.owner_id, 'expires_at': now + self.lock, 'renewed_at': now}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Someone else holds an unexpired lock
+            return False
+        return lock['owner'] == self.owner_id
+
+    async def release_leadership(self):
+        await self.locks.delete_one({'_id': LEADER_LOCK_ID, 'owner': self.owner_id})
+
+    async def tick(self, now: datetime = None) -> int:
+        """Prepare and fire due schedules if this worker leads; returns actions taken"""
+        if not await self.acquire_leadership():
+            return 0
+        now = now or datetime.utcnow()
+        actions = 0
+        async for schedule in self.schedules.find({'enabled': True}):
+            run_at = schedule.get('next_run_at')
+            if not run_at:
+                continue
+            prepare_at = run_at - timedelta(minutes=schedule.get('prepare_minutes', 0))
+            if schedule.get('prepared_run_at') != run_at and now >= prepare_at:
+                actions += await self.prepare(schedule, run_at)
+            elif schedule.get('prepared_run_at') == run_at and now >= run_at:
+                actions += await self.advance(schedule, run_at, now)
+        return actions
+
+    async def prepare(self, schedule: Dict, run_at: datetime) -> int:
+        # Claim the run first so it is prepared at most once
+        claimed = await self.schedules.find_one_and_update(
+            {'id': schedule['id'], 'next_run_at': run_at, 'prepared_run_at': {'$ne': run_at}},
+            {'$set': {'prepared_run_at': run_at, 'prepared_at': datetime.utcnow(), 'prepared_by': self.owner_id}}
+        )
+        if not claimed:
+            return 0
+        try:
+            result = await TASKS[schedule['task']](self.db, run_at)
+        except Exception as e:
+            logger.error(f"Preparing schedule {schedule['id']} for {run_at} failed: {e}")
+            # Release the claim so the next tick tries again
+            await self.schedules.update_one(
+                {'id': schedule['id'], 'prepared_run_at': run_at},
+                {'$set': {'prepared_run_at': None, 'last_error': str(e), 'last_error_at': datetime.utcnow()}}
+            )
+            return 0
+        await self.schedules.update_one(
+            {'id': schedule['id'], 'prepared_run_at': run_at},
+            {'$set': {'prepared_result': result, 'last_error': None}}
+        )
+        logger.info(f"Prepared schedule {schedule['id']} for {run_at}: {result}")
+        return 1
+
+    async def advance(self, schedule: Dict, run_at: datetime, now: datetime) -> int:
+        """Record the run and move to the next fire time; delivery itself is the outbox's job"""
+        cron = CronSchedule(schedule['cron'], schedule.get('timezone', DEFAULT_TIMEZONE))
+        next_run_at = cron.next_after(max(now, run_at))
+        result = await self.schedules.update_one(
+            {'id': schedule['id'], 'next_run_at': run_at},
+            {'$set': {
+                'last_run_at': run_at,
+                'last_result': schedule.get('prepared_result'),
+                'next_run_at': next_run_at
+            }}
+        )
+        if result.modified_count:
+            logger.info(f"Schedule {schedule['id']} ran for {run_at}; next run {next_run_at}")
+        return result.modified_count
+
+    async def run(self, stopping: asyncio.Event):
+        await self.ensure_schedules()
+        while not stopping.is_set():
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"Scheduler tick failed: {e}")
+            try:
+                await asyncio.wait_for(stopping.wait(), timeout=self.tick_seconds)
+            except asyncio.TimeoutError:
+                pass
+        await self.release_leadership()
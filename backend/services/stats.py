@@ -0,0 +1,99 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, Iterable, List
+import logging
+from services.notification_outbox import AUDIENCES
+
+logger = logging.getLogger(__name__)
+
+STATS_COLLECTION = 'stats'
+
+# Counters by scope, each with the collection and query it mirrors. Write
+# paths keep them current with $inc; reconcile_counters recounts them from
+# these queries.
+COUNTERS = {
+    'subscriptions': {
+        'active': ('subscriptions', {'is_active': True}),
+        'email': ('subscriptions', AUDIENCES['weekly_digest']),
+        'whatsapp': ('subscriptions', AUDIENCES['new_review'])
+    },
+    'migration': {
+        'migrated_reviews': ('migrated_reviews', {}),
+        'rejected_reviews': ('migrated_reviews', {'status': 'rejected'}),
+        'movie_mappings': ('movie_mappings', {}),
+        'failed_mappings': ('failed_mappings', {})
+    },
+    'reviews': {
+        'published': ('editorial_reviews', {'status': 'published'})
+    }
+}
+
+def subscription_deltas(subscription: Dict, sign: int = 1) -> Dict[str, int]:
+    """Counter changes for an active subscription appearing (1) or going away (-1)"""
+    return {
+        'active': sign,
+        'email': sign if subscription.get('email_notifications') else 0,
+        'whatsapp': sign if subscription.get('whatsapp_notifications') and subscription.get('phone_number') else 0
+    }
+
+async def increment(db, scope: str, deltas: Dict[str, int]):
+    """Apply counter changes; a failure only leaves drift for reconciliation"""
+    deltas = {counter: delta for counter, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    try:
+        await db[STATS_COLLECTION].update_one(
+            {'_id': scope},
+            {'$inc': deltas, '$set': {'updated_at': datetime.utcnow()}},
+            upsert=True
+        )
+    except Exception as e:
+        logger.error(f"Could not update {scope} counters {deltas}: {e}")
+
+async def reconcile_counters(db, scopes: Iterable[str] = None) -> Dict[str, int]:
+    """Recount counters from their collections; returns how far off each one was
+
+    A write landing between the recount and the $set is lost until the next
+    reconciliation, so this runs off-peak.
+    """
+    drift = {}
+    for scope in scopes or COUNTERS:
+        counters = COUNTERS[scope]
+        counts = await asyncio.gather(*(
+            db[collection].count_documents(query) for collection, query in counters.values()
+        ))
+        actual = dict(zip(counters, counts))
+        stored = await db[STATS_COLLECTION].find_one_and_replace(
+            {'_id': scope},
+            {**actual, 'updated_at': datetime.utcnow(), 'reconciled_at': datetime.utcnow()},
+            upsert=True
+        )
+        if stored is None:
+            continue  # first count, nothing to drift from
+        for counter, count in actual.items():
+            if stored.get(counter, 0) != count:
+                drift[f"{scope}.{counter}"] = stored.get(counter, 0) - count
+    if drift:
+        logger.warning(f"Reconciled counters that had drifted: {drift}")
+    return drift
+
+async def get_counters(db, scopes: List[str] = None) -> Dict[str, Dict]:
+    """Current counters by scope, read from one small collection"""
+    scopes = scopes or list(COUNTERS)
+    stats = {
+        doc['_id']: doc async for doc in db[STATS_COLLECTION].find({'_id': {'$in': scopes}})
+    }
+    missing = [scope for scope in scopes if scope not in stats]
+    if missing:
+        # First read on a fresh database
+        await reconcile_counters(db, missing)
+        async for doc in db[STATS_COLLECTION].find({'_id': {'$in': missing}}):
+            stats[doc['_id']] = doc
+    return {
+        scope: {
+            **{counter: stats[scope].get(counter, 0) for counter in COUNTERS[scope]},
+            'updated_at': stats[scope].get('updated_at'),
+            'reconciled_at': stats[scope].get('reconciled_at')
+        }
+        for scope in scopes
+    }
@@ -0,0 +1,312 @@
+import codecs
+import csv
+import json
+import re
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import logging
+from bson import ObjectId
+from email_validator import validate_email, EmailNotValidError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from services.digest_builder import normalize_preferences
+from services.stats import increment, reconcile_counters, subscription_deltas
+from services.welcome_batcher import welcome_batcher
+
+logger = logging.getLogger(__name__)
+
+# Column aliases seen in mailing list exports
+FIELD_ALIASES = {
+    'email': 'email', 'email_address': 'email', 'e-mail': 'email',
+    'name': 'name', 'full_name': 'name',
+    'phone_number': 'phone_number', 'phone': 'phone_number', 'mobile': 'phone_number', 'whatsapp': 'phone_number',
+    'email_notifications': 'email_notifications',
+    'whatsapp_notifications': 'whatsapp_notifications',
+    'industries': 'industries',
+    'language': 'language'
+}
+
+PHONE_PATTERN = re.compile(r'^\+[1-9]\d{7,14}$')
+
+# Plain ASCII dot-atom local parts, which is nearly every address on a mailing list
+SIMPLE_LOCAL_PART = re.compile(r"^[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+(\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+)*$")
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'off', ''}
+
+# Errors kept in the report; counting continues past this
+MAX_REPORTED_ERRORS = 1000
+
+@lru_cache(maxsize=10000)
+def normalize_domain(domain: str) -> str:
+    """Validated domain; lists share few domains, so each is checked once"""
+    return validate_email(f"postmaster@{domain}", check_deliverability=False).domain
+
+def normalize_email(email: str) -> str:
+    """Same result as email_validator, without re-validating common domains for every row"""
+    local, _, domain = email.rpartition('@')
+    try:
+        if local and len(local) <= 64 and len(email) <= 254 and SIMPLE_LOCAL_PART.match(local):
+            return f"{local}@{normalize_domain(domain)}"
+        return validate_email(email, check_deliverability=False).normalized
+    except EmailNotValidError as e:
+        raise ValueError(f"Invalid email {email}: {e}")
+
+def normalize_phone(phone: str) -> str:
+    """E.164 number; bare 10-digit Indian mobiles get +91"""
+    digits = re.sub(r'[\s\-().]', '', phone)
+    if digits.startswith('00'):
+        digits = '+' + digits[2:]
+    if re.fullmatch(r'[6-9]\d{9}', digits):
+        digits = '+91' + digits
+    elif re.fullmatch(r'91[6-9]\d{9}', digits):
+        digits = '+' + digits
+    if not PHONE_PATTERN.match(digits):
+        raise ValueError(f"Invalid phone number: {phone}")
+    return digits
+
+def parse_bool(value, default: bool) -> bool:
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    lowered = str(value).strip().lower()
+    if lowered in TRUE_VALUES:
+        return True
+    if lowered in FALSE_VALUES:
+        return default if lowered == '' else False
+    raise ValueError(f"Not a yes/no value: {value}")
+
+# Fields --update-existing may overwrite on an active subscription, when the row has them
+REFRESHABLE_FIELDS = {
+    'name': ('name',),
+    'phone_number': ('phone_number',),
+    'whatsapp_notifications': ('whatsapp_notifications',),
+    'preferences': ('industries', 'language')
+}
+
+def canonical_row(row: Dict) -> Dict:
+    """Row with column aliases mapped to subscription field names"""
+    return {FIELD_ALIASES.get(str(key).strip().lower(), key): value for key, value in row.items() if key is not None}
+
+def validate_row(row: Dict) -> Dict:
+    """Subscription fields for one canonical import row; raises ValueError with the reason"""
+    email = str(row.get('email') or '').strip()
+    if not email:
+        raise ValueError("Missing email")
+    email = normalize_email(email)
+
+    phone = str(row.get('phone_number') or '').strip()
+    phone = normalize_phone(phone) if phone else None
+
+    industries = row.get('industries') or []
+    if isinstance(industries, str):
+        industries = [industry for industry in re.split(r'[;|,]', industries) if industry.strip()]
+
+    return {
+        'email': email,
+        'name': str(row.get('name') or '').strip() or None,
+        'phone_number': phone,
+        'subscription_type': 'weekly_digest',
+        'email_notifications': parse_bool(row.get('email_notifications'), True),
+        # WhatsApp needs an explicit opt-in and a number
+        'whatsapp_notifications': bool(phone) and parse_bool(row.get('whatsapp_notifications'), False),
+        'preferences': normalize_preferences({'industries': industries, 'language': row.get('language')})
+    }
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream into lines without holding more than one chunk"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+    buffer = ''
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split('\n')
+        for line in lines:
+            yield line + '\n'
+    buffer += decoder.decode(b'', final=True)
+    if buffer:
+        yield buffer
+
+def parse_record(text: str) -> List[str]:
+    """Values of one CSV record
+
+    Strict parsing tells a quoted field cut off at the end of the line
+    apart from a complete record; anything else strict rejects (a stray
+    quote inside a value) is read leniently, like the csv module does by default.
+    """
+    try:
+        return next(csv.reader([text], strict=True))
+    except csv.Error as e:
+        if str(e) == 'unexpected end of data':
+            raise
+        return next(csv.reader([text]))
+
+async def iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """(line number, row, error) for each CSV record; quoted fields may span lines"""
+    header = None
+    record, record_line, line_number = '', 0, 0
+    async for line in iter_lines(chunks):
+        line_number += 1
+        if not record:
+            record_line = line_number
+        record += line
+        if not record.strip():
+            record = ''
+            continue
+        try:
+            values = parse_record(record)
+        except csv.Error as e:
+            if str(e) == 'unexpected end of data':
+                continue  # a quoted field runs on to the next line
+            record = ''
+            yield record_line, None, f"Unparseable CSV: {e}"
+            continue
+        record = ''
+        if header is None:
+            header = [value.strip() for value in values]
+            continue
+        if len(values) > len(header):
+            yield record_line, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield record_line, dict(zip(header, values)), None
+    if record.strip():
+        yield record_line, None, "Unterminated quoted field"
+
+async def iter_ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    line_number = 0
+    async for line in iter_lines(chunks):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, "Expected a JSON object"
+            continue
+        yield line_number, row, None
+
+ROW_READERS = {'csv': iter_csv_rows, 'ndjson': iter_ndjson_rows}
+
+class SubscriberImporter:
+    """Streams subscriber rows into MongoDB with unordered bulk upserts
+
+    Rows are validated and written `batch_size` at a time; an address that
+    already has an active subscription is left alone (or has its name,
+    phone and preferences refreshed with `update_existing`). Welcome emails
+    are off by default and, when on, go through the welcome batcher for
+    newly created subscriptions only.
+    """
+
+    def __init__(self, db, batch_size: int = 1000, send_welcome: bool = False, update_existing: bool = False):
+        self.db = db
+        self.batch_size = batch_size
+        self.send_welcome = send_welcome
+        self.update_existing = update_existing
+        self.rows = 0
+        self.created = 0
+        self.existing = 0
+        self.updated = 0
+        self.invalid = 0
+        self.errors: List[Dict] = []
+
+    def error(self, line: int, message: str, email: str = None):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'email': email, 'error': message})
+
+    async def run(self, chunks: AsyncIterator[bytes], file_format: str) -> Dict:
+        started = time.monotonic()
+        batch: List[Tuple[int, Dict, set]] = []
+        async for line, row, problem in ROW_READERS[file_format](chunks):
+            self.rows += 1
+            if problem:
+                self.error(line, problem)
+                continue
+            row = canonical_row(row)
+            try:
+                document = validate_row(row)
+            except ValueError as e:
+                self.error(line, str(e), str(row.get('email') or '') or None)
+                continue
+            supplied = {
+                field for field, columns in REFRESHABLE_FIELDS.items()
+                if any(row.get(column) not in (None, '', []) for column in columns)
+            }
+            batch.append((line, document, supplied))
+            if len(batch) >= self.batch_size:
+                await self.write_batch(batch)
+                batch = []
+        if batch:
+            await self.write_batch(batch)
+        if self.updated:
+            # Refreshed rows may have changed channels; their old values were never read
+            await reconcile_counters(self.db, ['subscriptions'])
+        return self.report(time.monotonic() - started)
+
+    async def write_batch(self, batch: List[Tuple[int, Dict, set]]):
+        # Later rows for the same address win within a batch
+        unique = {}
+        for line, document, supplied in batch:
+            if document['email'] in unique:
+                self.error(unique[document['email']][0], "Duplicate of a later row", document['email'])
+            unique[document['email']] = (line, document, supplied)
+        rows = list(unique.values())
+
+        now = datetime.utcnow()
+        operations = []
+        for line, document, supplied in rows:
+            insert = {**document, '_id': ObjectId(), 'is_active': True, 'subscribed_at': now, 'source': 'import'}
+            update = {'$setOnInsert': insert}
+            if self.update_existing and supplied:
+                # $set and $setOnInsert may not touch the same field
+                update = {
+                    '$setOnInsert': {key: value for key, value in insert.items() if key not in supplied},
+                    '$set': {**{field: document[field] for field in supplied}, 'updated_at': now}
+                }
+            operations.append(UpdateOne({'email': document['email'], 'is_active': True}, update, upsert=True))
+
+        failed = set()
+        try:
+            result = await self.db.subscriptions.bulk_write(operations, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            for write_error in details.get('writeErrors', []):
+                line, document, _ = rows[write_error['index']]
+                failed.add(write_error['index'])
+                reason = "Subscribed concurrently, retry the row" if write_error.get('code') == 11000 else write_error.get('errmsg')
+                self.error(line, reason, document['email'])
+
+        upserted = {entry['index'] for entry in details.get('upserted', [])}
+        self.created += len(upserted)
+        deltas = {}
+        for index in upserted:
+            for counter, delta in subscription_deltas(rows[index][1]).items():
+                deltas[counter] = deltas.get(counter, 0) + delta
+        await increment(self.db, 'subscriptions', deltas)
+        self.existing += len(rows) - len(upserted) - len(failed)
+        if self.update_existing:
+            self.updated += details.get('nModified', 0)
+
+        if self.send_welcome:
+            for index in upserted:
+                _, document, _ = rows[index]
+                welcome_batcher.add(document['email'], document['name'])
+
+    def report(self, elapsed: float) -> Dict:
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'existing': self.existing,
+            'updated': self.updated,
+            'invalid': self.invalid,
+            'errors': self.errors,
+            'errors_truncated': self.invalid > len(self.errors),
+            'welcome_emails': self.created if self.send_welcome else 0,
+            'seconds': round(elapsed, 2),
+            'rows_per_second': round(self.rows / elapsed) if elapsed else 0
+        }
@@ -0,0 +1,85 @@
+from datetime import datetime
+from typing import Dict, Tuple
+import logging
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from services.stats import increment, reconcile_counters, subscription_deltas
+
+logger = logging.getLogger(__name__)
+
+# At most one active subscription per address; unsubscribed rows are kept as history
+ACTIVE_EMAIL_INDEX = 'email_active_unique'
+
+async def dedupe_active_subscriptions(db) -> int:
+    """Deactivate all but the oldest active subscription of each address"""
+    deactivated = 0
+    pipeline = [
+        {'$match': {'is_active': True}},
+        {'$sort': {'subscribed_at': ASCENDING}},
+        {'$group': {'_id': '$email', 'ids': {'$push': '$_id'}, 'count': {'$sum': 1}}},
+        {'$match': {'count': {'$gt': 1}}}
+    ]
+    async for duplicate in db.subscriptions.aggregate(pipeline, allowDiskUse=True):
+        result = await db.subscriptions.update_many(
+            {'_id': {'$in': duplicate['ids'][1:]}},
+            {'$set': {'is_active': False, 'unsubscribed_at': datetime.utcnow(), 'deactivated_reason': 'duplicate'}}
+        )
+        deactivated += result.modified_count
+    if deactivated:
+        logger.warning(f"Deactivated {deactivated} duplicate active subscriptions")
+        await reconcile_counters(db, ['subscriptions'])
+    return deactivated
+
+async def ensure_subscription_indexes(db):
+    """Unique index on email among active subscriptions, cleaning up old duplicates first"""
+    try:
+        await db.subscriptions.create_index(
+            [('email', ASCENDING)],
+            name=ACTIVE_EMAIL_INDEX,
+            unique=True,
+            partialFilterExpression={'is_active': True}
+        )
+    except (DuplicateKeyError, OperationFailure) as e:
+        # Duplicates created before the index existed; keep the oldest of each
+        logger.warning(f"Active email index could not be built ({e}); removing duplicates")
+        await dedupe_active_subscriptions(db)
+        await db.subscriptions.create_index(
+            [('email', ASCENDING)],
+            name=ACTIVE_EMAIL_INDEX,
+            unique=True,
+            partialFilterExpression={'is_active': True}
+        )
+
+async def subscribe(db, email: str, fields: Dict) -> Tuple[Dict, bool]:
+    """Create or return the active subscription of `email` in one round trip
+
+    Returns (subscription, created). The upsert only inserts when there is
+    no active row, and the unique partial index turns a race between two
+    simultaneous upserts into a DuplicateKeyError for the loser, which then
+    reads the winner's row. `created` is True for exactly one caller.
+    """
+    new_id = ObjectId()
+    insert = {
+        **fields,
+        '_id': new_id,
+        'email': email,
+        'is_active': True,
+        'subscribed_at': datetime.utcnow()
+    }
+    try:
+        subscription = await db.subscriptions.find_one_and_update(
+            {'email': email, 'is_active': True},
+            {'$setOnInsert': insert},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        subscription = await db.subscriptions.find_one({'email': email, 'is_active': True})
+        if subscription is None:
+            # The winner unsubscribed in between; try again from scratch
+            return await subscribe(db, email, fields)
+    created = subscription['_id'] == new_id
+    if created:
+        await increment(db, 'subscriptions', subscription_deltas(subscription))
+    return subscription, created
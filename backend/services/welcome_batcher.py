@@ -0,0 +1,141 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional
+import logging
+from services.email_service import email_service
+
+logger = logging.getLogger(__name__)
+
+class WelcomeMailBatcher:
+    """Coalesces welcome emails from signup bursts into batched SendGrid requests
+
+    New subscribers are collected until `max_batch` are waiting or the oldest
+    has waited `max_wait` seconds, then go out as one personalized request
+    (two when named and anonymous signups are mixed). Up to `max_in_flight`
+    batches are sent concurrently off the event loop; whatever is still
+    queued is flushed on shutdown.
+    """
+
+    def __init__(self, max_batch: int = 500, max_wait: float = 2.0, max_in_flight: int = 4):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_in_flight = max_in_flight
+        self.pending: List[Dict] = []
+        self.wakeup: Optional[asyncio.Event] = None
+        self.task: Optional[asyncio.Task] = None
+        self.in_flight = set()
+        self.stopping = False
+
+        self.batches = 0
+        self.recipients = 0
+        self.sent = 0
+        self.failed = 0
+        self.largest_batch = 0
+        self.waits = deque(maxlen=1000)  # seconds each recipient waited before its batch went out
+        self.send_seconds = deque(maxlen=200)
+
+    def start(self):
+        if self.task and not self.task.done():
+            return
+        self.stopping = False
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.create_task(self.run())
+
+    def add(self, email: str, name: str = None):
+        """Queue a welcome email; returns immediately"""
+        if not self.task or self.task.done():
+            self.start()
+        self.pending.append({'email': email, 'name': name, 'queued_at': time.monotonic()})
+        if len(self.pending) >= self.max_batch or len(self.pending) == 1:
+            self.wakeup.set()
+
+    async def run(self):
+        slots = asyncio.Semaphore(self.max_in_flight)
+        while not (self.stopping and not self.pending):
+            if not self.pending:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+
+            # Hold the window open until it fills up or the oldest signup has waited long enough
+            deadline = self.pending[0]['queued_at'] + self.max_wait
+            while len(self.pending) < self.max_batch and not self.stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            batch, self.pending = self.pending[:self.max_batch], self.pending[self.max_batch:]
+            await slots.acquire()
+            task = asyncio.create_task(self.flush(batch))
+            self.in_flight.add(task)
+            task.add_done_callback(lambda done: (self.in_flight.discard(done), slots.release()))
+
+    async def flush(self, batch: List[Dict]):
+        started = time.monotonic()
+        self.waits.extend(started - recipient['queued_at'] for recipient in batch)
+        try:
+            results = await asyncio.to_thread(
+                email_service.send_welcome_batch,
+                [{'email': recipient['email'], 'name': recipient['name']} for recipient in batch]
+            )
+            sent = sum(result['recipients'] for result in results if result['status'] == 'sent')
+        except Exception as e:
+            logger.error(f"Welcome batch of {len(batch)} failed: {e}")
+            sent = 0
+
+        self.batches += 1
+        self.recipients += len(batch)
+        self.sent += sent
+        self.failed += len(batch) - sent
+        self.largest_batch = max(self.largest_batch, len(batch))
+        self.send_seconds.append(time.monotonic() - started)
+        if sent < len(batch):
+            logger.error(f"Welcome batch: {len(batch) - sent} of {len(batch)} emails not sent")
+        else:
+            logger.info(f"Sent welcome batch of {len(batch)}")
+
+    async def stop(self):
+        """Flush everything still queued and wait for batches in flight"""
+        if not self.task:
+            return
+        self.stopping = True
+        self.wakeup.set()
+        await self.task
+        if self.in_flight:
+            await asyncio.gather(*self.in_flight, return_exceptions=True)
+        logger.info(f"Welcome batcher stopped: {self.report()}")
+
+    def report(self) -> Dict:
+        """Batch sizes and the latency batching adds, over recent batches"""
+        waits = sorted(self.waits)
+        return {
+            'queued': len(self.pending),
+            'in_flight': len(self.in_flight),
+            'batches': self.batches,
+            'recipients': self.recipients,
+            'sent': self.sent,
+            'failed': self.failed,
+            'average_batch_size': round(self.recipients / self.batches, 1) if self.batches else 0,
+            'largest_batch': self.largest_batch,
+            'added_latency_seconds': {
+                'average': round(sum(waits) / len(waits), 3) if waits else 0,
+                'p95': round(waits[int(len(waits) * 0.95) - 1], 3) if waits else 0,
+                'max': round(waits[-1], 3) if waits else 0
+            },
+            'average_send_seconds': round(sum(self.send_seconds) / len(self.send_seconds), 3) if self.send_seconds else 0,
+            'max_batch': self.max_batch,
+            'max_wait_seconds': self.max_wait
+        }
+
+# Global welcome batcher instance
+welcome_batcher = WelcomeMailBatcher(
+    max_batch=int(os.getenv('WELCOME_BATCH_SIZE', '500')),
+    max_wait=float(os.getenv('WELCOME_BATCH_WAIT_SECONDS', '2.0'))
+)
@@ -0,0 +1,148 @@
+import asyncio
+import random
+import time
+from typing import List, Dict, Optional, Tuple
+import logging
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+TWILIO_API_BASE = "https://api.twilio.com"
+
+# Worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        # The lock makes waiters take tokens in arrival order
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Drain the bucket so nobody sends for `seconds` (after a 429)"""
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+class WhatsAppFanOut:
+    """Sends many WhatsApp messages through the Twilio REST API concurrently
+
+    Requests go straight to the Messages endpoint over one aiohttp session,
+    limited both by a token bucket (our Twilio messages-per-second) and by
+    the number of requests in flight. 429 and 5xx responses are retried with
+    exponential backoff and full jitter.
+    """
+
+    def __init__(
+        self,
+        account_sid: str,
+        auth_token: str,
+        from_number: str,
+        base_url: str = TWILIO_API_BASE,
+        messages_per_second: float = 20,
+        max_concurrency: int = 20,
+        max_retries: int = 4,
+        retry_delay: float = 0.5,
+        timeout: float = 15
+    ):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number
+        self.url = f"{base_url.rstrip('/')}/2010-04-01/Accounts/{account_sid}/Messages.json"
+        self.messages_per_second = messages_per_second
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+
+    def backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return random.uniform(0, self.retry_delay * 2 ** attempt)
+
+    async def send_one(self, session: aiohttp.ClientSession, bucket: TokenBucket, to_number: str, body: str) -> Dict:
+        result = {'to': to_number, 'status': 'failed', 'attempts': 0, 'sid': None, 'error': None}
+        if not to_number.startswith('whatsapp:'):
+            to_number = f'whatsapp:{to_number}'
+
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            result['attempts'] = attempt + 1
+            retry_after = None
+            try:
+                async with session.post(self.url, data={'To': to_number, 'From': self.from_number, 'Body': body}) as response:
+                    payload = await response.json(content_type=None)
+                    if response.status < 300:
+                        result.update(status='sent', sid=payload.get('sid'), error=None)
+                        return result
+                    result['error'] = f"{response.status}: {payload.get('message', '')}"
+                    result['http_status'] = response.status
+                    if response.status not in RETRY_STATUSES:
+                        return result
+                    retry_after = response.headers.get('Retry-After')
+                    if response.status == 429:
+                        bucket.pause(self.backoff(attempt, retry_after))
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                result['error'] = str(e) or e.__class__.__name__
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(self.backoff(attempt, retry_after))
+        return result
+
+    async def send_all(self, messages: List[Tuple[str, str]]) -> Dict:
+        """Send (to_number, body) pairs and return a delivery report"""
+        started = time.monotonic()
+        results = await self.deliver(messages)
+        return self.report(results, time.monotonic() - started)
+
+    async def deliver(self, messages: List[Tuple[str, str]]) -> List[Dict]:
+        """Send (to_number, body) pairs, returning one result per message in order"""
+        bucket = TokenBucket(self.messages_per_second)
+        slots = asyncio.Semaphore(self.max_concurrency)
+
+        async def send(session, to_number, body):
+            async with slots:
+                return await self.send_one(session, bucket, to_number, body)
+
+        auth = aiohttp.BasicAuth(self.account_sid, self.auth_token)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+        async with aiohttp.ClientSession(auth=auth, timeout=timeout, connector=connector) as session:
+            return await asyncio.gather(*(send(session, to_number, body) for to_number, body in messages))
+
+    def report(self, results: List[Dict], elapsed: float) -> Dict:
+        sent = [result for result in results if result['status'] == 'sent']
+        failed = [result for result in results if result['status'] != 'sent']
+        errors = {}
+        for result in failed:
+            key = str(result.get('http_status', 'network'))
+            errors[key] = errors.get(key, 0) + 1
+        return {
+            'total': len(results),
+            'sent': len(sent),
+            'failed': len(failed),
+            'retried': sum(1 for result in results if result['attempts'] > 1),
+            'attempts': sum(result['attempts'] for result in results),
+            'errors_by_status': errors,
+            'seconds': round(elapsed, 2),
+            'messages_per_second': round(len(sent) / elapsed, 1) if elapsed else 0,
+            'failures': failed[:20],
+            'sids': {result['to']: result['sid'] for result in sent}
+        }
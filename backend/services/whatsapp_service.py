@@ -1,7 +1,9 @@
 import os
-from typing import List
+import time
+from typing import List, Dict, Tuple
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioException
+from services.whatsapp_fanout import WhatsAppFanOut, TWILIO_API_BASE
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,6 +20,18 @@ class WhatsAppService:
         else:
             self.client = None
             logger.warning("Twilio not configured. WhatsApp messages will be logged only.")
+        
+        # Bulk sends go through the async fan-out; TWILIO_API_BASE can point
+        # at a local fake Twilio for testing
+        self.fanout = WhatsAppFanOut(
+            self.account_sid,
+            self.auth_token,
+            self.whatsapp_number,
+            base_url=os.getenv('TWILIO_API_BASE', TWILIO_API_BASE),
+            messages_per_second=float(os.getenv('WHATSAPP_MESSAGES_PER_SECOND', '20')),
+            max_concurrency=int(os.getenv('WHATSAPP_MAX_CONCURRENCY', '20')),
+            max_retries=int(os.getenv('WHATSAPP_MAX_RETRIES', '4'))
+        )
     
     def send_message(self, to_number: str, message: str) -> bool:
         """Send WhatsApp message to a single recipient"""
@@ -43,39 +57,43 @@ class WhatsAppService:
             logger.error(f"Failed to send WhatsApp message: {str(e)}")
             return False
     
-    def send_bulk_messages(self, recipients: List[dict], message_template: str) -> int:
-        """Send WhatsApp messages to multiple recipients"""
-        sent_count = 0
-        
-        for recipient in recipients:
-            phone_number = recipient.get('phone_number')
-            if not phone_number:
-                continue
-                
-            # Personalize message if name is available
-            personalized_message = message_template.replace(
-                '{name}', recipient.get('name', 'there')
-            )
-            
-            if self.send_message(phone_number, personalized_message):
-                sent_count += 1
-                
-        logger.info(f"Sent WhatsApp messages to {sent_count}/{len(recipients)} recipients")
-        return sent_count
+    def personalize_message(self, message_template: str, name: str = None) -> str:
+        return message_template.replace('{name}', name or 'there')
     
-    def send_new_review_notification(self, subscribers: List[dict], review: dict):
-        """Send new review notification via WhatsApp"""
-        # Filter subscribers who opted for WhatsApp notifications
-        whatsapp_subscribers = [
-            sub for sub in subscribers 
-            if sub.get('whatsapp_notifications', False) and sub.get('phone_number')
+    def personalize(self, recipients: List[dict], message_template: str) -> List[Tuple[str, str]]:
+        """(phone number, message) pairs, with {name} filled in where available; recipients without a number are left out"""
+        return [
+            (recipient['phone_number'], self.personalize_message(message_template, recipient.get('name')))
+            for recipient in recipients
+            if recipient.get('phone_number')
         ]
+    
+    async def deliver(self, messages: List[Tuple[str, str]]) -> List[Dict]:
+        """Send (phone number, message) pairs, returning one result per message"""
+        if not self.client and self.fanout.url.startswith(TWILIO_API_BASE):
+            for to_number, message in messages:
+                logger.info(f"WhatsApp message to {to_number}: {message}")
+            return [{'to': to_number, 'status': 'sent', 'attempts': 1, 'sid': None, 'error': None} for to_number, _ in messages]
+        return await self.fanout.deliver(messages)
+    
+    async def send_bulk_messages(self, recipients: List[dict], message_template: str) -> Dict:
+        """Send WhatsApp messages to multiple recipients, returning a delivery report"""
+        messages = self.personalize(recipients, message_template)
         
-        if not whatsapp_subscribers:
-            logger.info("No WhatsApp subscribers found for review notification")
-            return 0
-            
-        message_template = f"""🎬 *New Review Alert!*
+        started = time.monotonic()
+        report = self.fanout.report(await self.deliver(messages), time.monotonic() - started)
+        logger.info(
+            f"Sent WhatsApp messages to {report['sent']}/{len(recipients)} recipients "
+            f"in {report['seconds']}s ({report['messages_per_second']} msg/sec, "
+            f"{report['retried']} retried, {report['failed']} failed)"
+        )
+        for failure in report['failures']:
+            logger.warning(f"WhatsApp message to {failure['to']} failed after {failure['attempts']} attempts: {failure['error']}")
+        return report
+    
+    def new_review_message(self, review: dict) -> str:
+        """New review alert text; {name} is filled in per recipient"""
+        return f"""🎬 *New Review Alert!*
 
 *{review['title']}*
 {review.get('title_hindi', '')}
@@ -90,26 +108,17 @@ class WhatsAppService:
 *The Voice of Cinema* | FILMWALLAA.COM
 
 _Reply STOP to unsubscribe_"""
-        
-        return self.send_bulk_messages(whatsapp_subscribers, message_template)
     
-    def send_weekly_digest_notification(self, subscribers: List[dict], review_count: int):
-        """Send weekly digest notification via WhatsApp"""
-        whatsapp_subscribers = [
-            sub for sub in subscribers 
-            if sub.get('whatsapp_notifications', False) and sub.get('phone_number')
-        ]
-        
-        if not whatsapp_subscribers:
-            return 0
-            
-        message_template = f"""📧 *Weekly Cinema Digest*
+    def weekly_digest_message(self, review_count: int, industries: List[str] = None) -> str:
+        """Weekly digest teaser text; {name} is filled in per recipient"""
+        coverage = ' & '.join(industries) if industries else 'Bollywood & South Cinema'
+        return f"""📧 *Weekly Cinema Digest*
 
 Hi {'{name}'}! 👋
 
 Your weekly digest with {review_count} new movie reviews is ready!
 
-🎭 Latest Bollywood & South Cinema reviews
+🎭 Latest {coverage} reviews
 🌟 Expert ratings and recommendations
 📱 Multi-language content
 
@@ -117,8 +126,32 @@ Your weekly digest with {review_count} new movie reviews is ready!
 🔗 Visit: https://filmwallaa.com
 
 *The Voice of Cinema* | FILMWALLAA.COM"""
+    
+    async def send_new_review_notification(self, subscribers: List[dict], review: dict):
+        """Send new review notification via WhatsApp"""
+        # Filter subscribers who opted for WhatsApp notifications
+        whatsapp_subscribers = [
+            sub for sub in subscribers 
+            if sub.get('whatsapp_notifications', False) and sub.get('phone_number')
+        ]
+        
+        if not whatsapp_subscribers:
+            logger.info("No WhatsApp subscribers found for review notification")
+            return 0
+        
+        return await self.send_bulk_messages(whatsapp_subscribers, self.new_review_message(review))
+    
+    async def send_weekly_digest_notification(self, subscribers: List[dict], review_count: int):
+        """Send weekly digest notification via WhatsApp"""
+        whatsapp_subscribers = [
+            sub for sub in subscribers 
+            if sub.get('whatsapp_notifications', False) and sub.get('phone_number')
+        ]
+        
+        if not whatsapp_subscribers:
+            return 0
         
-        return self.send_bulk_messages(whatsapp_subscribers, message_template)
+        return await self.send_bulk_messages(whatsapp_subscribers, self.weekly_digest_message(review_count))
 
 # Global WhatsApp service instance
 whatsapp_service = WhatsAppService()
\ No newline at end of file
@@ -124,8 +124,11 @@ class TMDBService:
         return {
             'tmdb_id': movie_data.get('id'),
             'title': movie_data.get('title', ''),
+            'original_title': movie_data.get('original_title', ''),
             'year': int(movie_data.get('release_date', '2023')[:4]) if movie_data.get('release_date') else 2023,
             'rating': round(movie_data.get('vote_average', 0) / 2, 1),  # Convert to 5-star scale
+            'popularity': movie_data.get('popularity', 0),  # Ranks typeahead suggestions
+            'vote_count': movie_data.get('vote_count', 0),
             'genre': [genre.get('name') for genre in movie_data.get('genres', [])] if 'genres' in movie_data else [],
             'language': movie_data.get('original_language', 'en'),
             'poster': self.get_poster_url(movie_data.get('poster_path', '')),
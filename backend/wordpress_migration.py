@@ -1,11 +1,20 @@
 import xml.etree.ElementTree as ET
 import re
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Callable, Iterable, Iterator, AsyncIterator, Tuple, Union
 import asyncio
+import resource
+import time
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 import os
 from tmdb_service import tmdb_service
+from review_classifier import review_classifier
+from movie_matcher import MovieTitleIndex, confidence_label
+from duplicate_detector import DuplicateDetector
+from review_storage import review_body_store
+from services.stats import increment, reconcile_counters
 import uuid
 from bs4 import BeautifulSoup
 import logging
@@ -13,103 +22,108 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class WordPressMigrator:
+# WordPress export namespaces
+NAMESPACES = {
+    'wp': 'http://wordpress.org/export/1.2/',
+    'content': 'http://purl.org/rss/1.0/modules/content/',
+    'dc': 'http://purl.org/dc/elements/1.1/'
+}
+
+# Fields editors own once a post is imported: re-runs only fill them in for new posts
+REVIEW_STATUS_FIELDS = ('status',)
+# Movie fields of a migrated review; kept as they are once an editor mapped the post by hand
+MAPPING_FIELDS = ('movie_id', 'tmdb_id', 'tmdb_data', 'mapping_confidence', 'image')
+
+# Shown until a post has a featured image or TMDB poster
+PLACEHOLDER_IMAGE = "https://images.unsplash.com/photo-1489599735429-c1fdf66d61e1?w=800&h=400&fit=crop&q=80"
+
+class AttachmentIndex:
+    """Attachment ID -> URL index built while streaming the export
+
+    Posts can appear before or after their featured image attachment, so a
+    thumbnail that is not known yet is remembered as pending and resolved
+    when the attachment arrives, without a second pass over the file.
+    """
+
     def __init__(self):
+        self.urls = {}  # attachment id -> url
+        self.pending = {}  # attachment id -> [post ids waiting for it]
+        self.resolved_late = []  # (post id, url) found after the post was emitted
+
+    def __len__(self):
+        return len(self.urls)
+
+    def add(self, attachment_id: int, url: str):
+        """Record an attachment, resolving posts already waiting for it"""
+        self.urls[attachment_id] = url
+        for post_id in self.pending.pop(attachment_id, ()):
+            self.resolved_late.append((post_id, url))
+
+    def resolve(self, post_id: str, thumbnail_id: Optional[int]) -> Optional[str]:
+        """URL of a post's featured image, or None if it is not known yet"""
+        if thumbnail_id is None:
+            return None
+        url = self.urls.get(thumbnail_id)
+        if url is None:
+            self.pending.setdefault(thumbnail_id, []).append(post_id)
+        return url
+
+# A migration record is (post, mapping_doc, failed_doc); exactly one of the
+# last two is set once the post has been through the mapping stage
+MigrationRecord = Tuple[Dict, Optional[Dict], Optional[Dict]]
+
+class WordPressMigrator:
+    def __init__(
+        self,
+        chunk_size: int = 500,
+        max_in_flight: int = 4,
+        local_match_threshold: float = 0.85,
+        min_match_score: float = 0.6,
+        tmdb=None
+    ):
         self.posts = []
         self.movies_mapping = {}
         self.failed_mappings = []
+        self.attachments = AttachmentIndex()
+
+        # Anything with search_movies(query) works, e.g. a fake for benchmarks
+        self.tmdb = tmdb or tmdb_service
+
+        # Movies we already know about are matched locally; TMDB is only
+        # queried when the best local candidate scores below the threshold
+        self.movie_index = MovieTitleIndex()
+        self.local_match_threshold = local_match_threshold
+        self.min_match_score = min_match_score
+
+        # Reposts and revisions share their representative's movie match
+        self.duplicate_detector = DuplicateDetector()
+        self.cluster_matches = {}  # representative post id -> match or None
+
+        # Save stage tuning: documents per bulk write and concurrent writes
+        self.chunk_size = chunk_size
+        self.max_in_flight = max_in_flight
+
+        # Running counters so the streaming pipeline never has to keep every post
+        self.stats = {
+            'total_posts': 0,
+            'mapped': 0,
+            'failed': 0,
+            'posts_with_ratings': 0,
+            'posts_by_year': {},
+            'saved_documents': 0,
+            'save_errors': 0,
+            'save_seconds': 0.0,
+            'local_matches': 0,
+            'tmdb_lookups': 0,
+            'duplicates': 0
+        }
+        self.failed_preview = []
+        self.save_error_preview = []
         
     def parse_wordpress_xml(self, xml_file_path: str):
         """Parse WordPress XML export file"""
         try:
-            tree = ET.parse(xml_file_path)
-            root = tree.getroot()
-            
-            # Define WordPress namespace
-            namespaces = {
-                'wp': 'http://wordpress.org/export/1.2/',
-                'content': 'http://purl.org/rss/1.0/modules/content/',
-                'dc': 'http://purl.org/dc/elements/1.1/'
-            }
-            
-            posts = []
-            
-            for item in root.findall('.//item'):
-                post_type = item.find('wp:post_type', namespaces)
-                if post_type is not None and post_type.text == 'post':
-                    
-                    # Extract post data
-                    title = item.find('title').text if item.find('title') is not None else ""
-                    content = item.find('content:encoded', namespaces)
-                    content_text = content.text if content is not None else ""
-                    
-                    # Clean HTML content
-                    if content_text:
-                        soup = BeautifulSoup(content_text, 'html.parser')
-                        content_text = soup.get_text()
-                    
-                    # Extract dates
-                    pub_date = item.find('pubDate').text if item.find('pubDate') is not None else ""
-                    wp_date = item.find('wp:post_date', namespaces)
-                    wp_date_text = wp_date.text if wp_date is not None else ""
-                    
-                    # Parse publication date
-                    published_at = None
-                    try:
-                        if wp_date_text:
-                            published_at = datetime.strptime(wp_date_text, '%Y-%m-%d %H:%M:%S')
-                        elif pub_date:
-                            # Parse RFC 2822 date format
-                            published_at = datetime.strptime(pub_date, '%a, %d %b %Y %H:%M:%S %z')
-                            published_at = published_at.replace(tzinfo=None)  # Remove timezone for simplicity
-                    except Exception as e:
-                        logger.warning(f"Could not parse date for post '{title}': {e}")
-                        published_at = datetime.utcnow()
-                    
-                    # Extract author
-                    author = item.find('dc:creator', namespaces)
-                    author_name = author.text if author is not None else "Gaurang Bookseller"
-                    
-                    # Extract categories
-                    categories = []
-                    for category in item.findall('category'):
-                        if category.text:
-                            categories.append(category.text)
-                    
-                    # Extract slug
-                    post_name = item.find('wp:post_name', namespaces)
-                    slug = post_name.text if post_name is not None else self.create_slug(title)
-                    
-                    # Extract post status
-                    status = item.find('wp:status', namespaces)
-                    post_status = status.text if status is not None else "publish"
-                    
-                    post_data = {
-                        'id': str(uuid.uuid4()),
-                        'original_title': title,
-                        'title': title,
-                        'content': content_text,
-                        'author': author_name,
-                        'published_at': published_at,
-                        'categories': categories,
-                        'slug': slug,
-                        'status': 'draft' if post_status != 'publish' else 'draft',  # Start as draft for review
-                        'original_url': item.find('link').text if item.find('link') is not None else "",
-                        'migrated_at': datetime.utcnow(),
-                        'movie_id': None,  # Will be populated during mapping
-                        'tmdb_id': None,
-                        'rating': self.extract_rating_from_content(content_text),
-                        'excerpt': self.create_excerpt(content_text),
-                        'read_time': self.calculate_read_time(content_text),
-                        'tags': categories,  # Use categories as tags initially
-                        'image': self.extract_featured_image(title)  # Default placeholder
-                    }
-                    
-                    # Only include posts that seem to be movie reviews
-                    if self.is_movie_review(title, content_text):
-                        posts.append(post_data)
-                        logger.info(f"Found movie review: {title}")
-            
+            posts = list(self.iter_wordpress_posts(xml_file_path))
             self.posts = posts
             logger.info(f"Parsed {len(posts)} movie review posts from WordPress export")
             return posts
@@ -117,42 +131,161 @@ class WordPressMigrator:
         except Exception as e:
             logger.error(f"Error parsing WordPress XML: {e}")
             return []
+
+    def iter_wordpress_posts(self, xml_file_path: str) -> Iterator[Dict]:
+        """Stream movie review posts from a WordPress XML export"""
+        for item in self.iter_export_items(xml_file_path):
+            post_data = self.build_post(item)
+            
+            # Only include posts that seem to be movie reviews
+            if post_data:
+                logger.info(f"Found movie review: {post_data['title']}")
+                yield post_data
     
-    def is_movie_review(self, title: str, content: str) -> bool:
-        """Check if post is a movie review"""
-        movie_keywords = [
-            'movie', 'film', 'review', 'cinema', 'bollywood', 
-            'hollywood', 'director', 'actor', 'actress', 'cast',
-            'screenplay', 'plot', 'story', 'thriller', 'drama',
-            'comedy', 'action', 'rating', 'oscar', 'box office'
-        ]
+    def iter_export_items(self, xml_file_path: str) -> Iterator[Dict]:
+        """Stream raw fields of every post <item> in a WordPress XML export"""
+        channel = None
+        for event, elem in ET.iterparse(xml_file_path, events=('start', 'end')):
+            if event == 'start':
+                if elem.tag == 'channel':
+                    channel = elem
+                continue
+            
+            if elem.tag != 'item':
+                continue
+            
+            post_type = elem.find('wp:post_type', NAMESPACES)
+            if post_type is not None and post_type.text == 'post':
+                yield self.extract_item(elem)
+            elif post_type is not None and post_type.text == 'attachment':
+                self.index_attachment(elem)
+            
+            # Drop parsed items so memory stays bounded on large exports
+            if channel is not None:
+                channel.clear()
+            else:
+                elem.clear()
+    
+    def extract_item(self, item: ET.Element) -> Dict:
+        """Extract the raw text fields of a WordPress <item> element"""
+        def text_of(path: str, default: str = "") -> str:
+            element = item.find(path, NAMESPACES)
+            return element.text if element is not None and element.text is not None else default
+        
+        return {
+            'title': text_of('title'),
+            'content_html': text_of('content:encoded'),
+            'pub_date': text_of('pubDate'),
+            'wp_date': text_of('wp:post_date'),
+            'author': text_of('dc:creator', "Gaurang Bookseller"),
+            'categories': [category.text for category in item.findall('category') if category.text],
+            'post_name': text_of('wp:post_name'),
+            'status': text_of('wp:status', "publish"),
+            'link': text_of('link'),
+            'thumbnail_id': self.extract_thumbnail_id(item)
+        }
+    
+    def extract_thumbnail_id(self, item: ET.Element) -> Optional[int]:
+        """Read the _thumbnail_id postmeta linking a post to its featured image"""
+        for meta in item.findall('wp:postmeta', NAMESPACES):
+            key = meta.find('wp:meta_key', NAMESPACES)
+            if key is not None and key.text == '_thumbnail_id':
+                value = meta.find('wp:meta_value', NAMESPACES)
+                try:
+                    return int(value.text)
+                except (AttributeError, TypeError, ValueError):
+                    return None
+        return None
+    
+    def index_attachment(self, item: ET.Element):
+        """Add an attachment <item> to the attachment index"""
+        attachment_id = item.find('wp:post_id', NAMESPACES)
+        url = item.find('wp:attachment_url', NAMESPACES)
+        if attachment_id is None or url is None or not url.text:
+            return
+        try:
+            self.attachments.add(int(attachment_id.text), url.text)
+        except (TypeError, ValueError):
+            return
+    
+    def clean_content(self, content_html: str) -> str:
+        """Strip HTML markup from post content"""
+        if not content_html:
+            return ""
+        soup = BeautifulSoup(content_html, 'html.parser')
+        return soup.get_text()
+    
+    def build_post(self, item: Dict) -> Optional[Dict]:
+        """Build a migrated post document, or None if it is not a movie review"""
+        title = item['title']
+        content_text = self.clean_content(item['content_html'])
         
-        text = (title + ' ' + content).lower()
-        keyword_count = sum(1 for keyword in movie_keywords if keyword in text)
+        # Classify first so non-reviews skip the rest of the work
+        classification = review_classifier.classify(title, content_text)
+        if not classification['is_movie_review']:
+            return None
         
-        # Consider it a movie review if it has multiple movie-related keywords
-        return keyword_count >= 3
+        return self.assemble_post(item, content_text, classification)
     
-    def extract_rating_from_content(self, content: str) -> Optional[float]:
-        """Extract rating from review content"""
-        # Look for patterns like "4/5", "3.5/5", "Rating: 4", etc.
-        rating_patterns = [
-            r'(\d(?:\.\d)?)/5',
-            r'rating:?\s*(\d(?:\.\d)?)',
-            r'(\d(?:\.\d)?)\s*out\s*of\s*5',
-            r'(\d(?:\.\d)?)\s*stars?'
-        ]
+    def assemble_post(self, item: Dict, content_text: str, classification: Dict) -> Dict:
+        """Assemble the migrated post document for a classified movie review"""
+        title = item['title']
         
-        for pattern in rating_patterns:
-            match = re.search(pattern, content.lower())
-            if match:
-                try:
-                    rating = float(match.group(1))
-                    return min(rating, 5.0)  # Cap at 5
-                except ValueError:
-                    continue
+        # Parse publication date
+        published_at = None
+        try:
+            if item['wp_date']:
+                published_at = datetime.strptime(item['wp_date'], '%Y-%m-%d %H:%M:%S')
+            elif item['pub_date']:
+                # Parse RFC 2822 date format
+                published_at = datetime.strptime(item['pub_date'], '%a, %d %b %Y %H:%M:%S %z')
+                published_at = published_at.replace(tzinfo=None)  # Remove timezone for simplicity
+        except Exception as e:
+            logger.warning(f"Could not parse date for post '{title}': {e}")
+            published_at = datetime.utcnow()
         
-        return None
+        categories = item['categories']
+        slug = item['post_name'] or self.create_slug(title)
+        
+        post_id = self.create_post_id(item['link'])
+        featured_image = self.extract_featured_image(post_id, item.get('thumbnail_id'))
+        
+        return {
+            'id': post_id,
+            'original_title': title,
+            'title': title,
+            'content': content_text,
+            'author': item['author'],
+            'published_at': published_at,
+            'categories': categories,
+            'slug': slug,
+            'status': 'draft' if item['status'] != 'publish' else 'draft',  # Start as draft for review
+            'original_url': item['link'],
+            'migrated_at': datetime.utcnow(),
+            'movie_id': None,  # Will be populated during mapping
+            'tmdb_id': None,
+            'rating': classification['rating'],
+            'excerpt': self.create_excerpt(content_text),
+            'read_time': self.calculate_read_time(content_text),
+            'tags': categories,  # Use categories as tags initially
+            'thumbnail_id': item.get('thumbnail_id'),
+            'featured_image': featured_image,
+            'image': featured_image or PLACEHOLDER_IMAGE
+        }
+    
+    def create_post_id(self, original_url: str) -> str:
+        """Create post ID, stable across re-runs when the original URL is known"""
+        if original_url:
+            return str(uuid.uuid5(uuid.NAMESPACE_URL, original_url))
+        return str(uuid.uuid4())
+    
+    def is_movie_review(self, title: str, content: str) -> bool:
+        """Check if post is a movie review"""
+        return review_classifier.is_movie_review(title, content)
+    
+    def extract_rating_from_content(self, content: str) -> Optional[float]:
+        """Extract rating from review content"""
+        return review_classifier.extract_rating(content)
     
     def create_excerpt(self, content: str, max_length: int = 200) -> str:
         """Create excerpt from content"""
@@ -184,168 +317,411 @@ class WordPressMigrator:
         slug = re.sub(r'\s+', '-', slug.strip())
         return slug[:50]  # Limit length
     
-    def extract_featured_image(self, title: str) -> str:
-        """Generate placeholder image URL"""
-        # For now, use placeholder images
-        # Later we can integrate with TMDB to get movie posters
-        return f"https://images.unsplash.com/photo-1489599735429-c1fdf66d61e1?w=800&h=400&fit=crop&q=80"
+    def extract_featured_image(self, post_id: str, thumbnail_id: Optional[int]) -> Optional[str]:
+        """Resolve a post's featured image from the attachment index"""
+        return self.attachments.resolve(post_id, thumbnail_id)
     
-    async def search_movie_in_tmdb(self, title: str) -> Optional[Dict]:
-        """Search for movie in TMDB based on post title"""
+    async def load_movie_index(self) -> int:
+        """Load the movies collection into the local title index"""
+        client = None
         try:
-            # Extract movie name from title
-            movie_name = self.extract_movie_name_from_title(title)
-            if not movie_name:
-                return None
+            # MongoDB connection
+            mongo_url = os.environ['MONGO_URL']
+            client = AsyncIOMotorClient(mongo_url)
+            db = client[os.environ['DB_NAME']]
             
+            return await self.movie_index.load(db)
+            
+        except Exception as e:
+            logger.error(f"Error loading local movie index: {e}")
+            return 0
+        finally:
+            if client is not None:
+                client.close()
+    
+    async def find_movie_match(self, title: str, year: Optional[int] = None) -> Optional[Dict]:
+        """Find the best movie for a post title as {'movie', 'score', 'source'}"""
+        # Extract movie name from title
+        movie_name = self.extract_movie_name_from_title(title)
+        if not movie_name:
+            return None
+        
+        candidates = self.movie_index.search(movie_name, year, limit=1)
+        if candidates and candidates[0]['score'] >= self.local_match_threshold:
+            self.stats['local_matches'] += 1
+            logger.info(f"Found local match: {candidates[0]['movie']['title']} ({candidates[0]['score']})")
+            return {**candidates[0], 'source': 'local'}
+        
+        tmdb_candidates = await self.search_movie_in_tmdb(movie_name, year)
+        best = max(candidates + tmdb_candidates, key=lambda c: c['score'], default=None)
+        if not best or best['score'] < self.min_match_score:
+            return None
+        
+        source = 'tmdb' if best in tmdb_candidates else 'local'
+        if source == 'tmdb':
+            # Later posts about the same movie can now match locally
+            self.movie_index.add(best['movie'])
+        return {**best, 'source': source}
+    
+    async def search_movie_in_tmdb(self, movie_name: str, year: Optional[int] = None) -> List[Dict]:
+        """Search TMDB for a movie name and rank the results by similarity"""
+        try:
             logger.info(f"Searching TMDB for: {movie_name}")
-            movies = tmdb_service.search_movies(movie_name)
+            self.stats['tmdb_lookups'] += 1
+            movies = self.tmdb.search_movies(movie_name)
             
             if movies:
-                # Return the first match
-                movie = movies[0]
-                logger.info(f"Found TMDB match: {movie['title']} ({movie['year']})")
-                return movie
+                candidates = self.movie_index.rank(movie_name, movies, year)
+                if candidates:
+                    best = candidates[0]['movie']
+                    logger.info(f"Found TMDB match: {best['title']} ({best['year']}), score {candidates[0]['score']}")
+                return candidates
             else:
                 logger.warning(f"No TMDB match found for: {movie_name}")
-                return None
+                return []
                 
         except Exception as e:
-            logger.error(f"Error searching TMDB for '{title}': {e}")
-            return None
+            logger.error(f"Error searching TMDB for '{movie_name}': {e}")
+            return []
     
     def extract_movie_name_from_title(self, title: str) -> Optional[str]:
         """Extract movie name from post title"""
-        # Remove common review-related words
-        title = title.lower()
-        
-        # Patterns to remove
-        patterns_to_remove = [
-            r'\s+review.*$',
-            r'\s+movie.*$',
-            r'\s+film.*$',
-            r'^.*review:?\s*',
-            r'\s+the\s+movie.*$',
-            r'\s*-\s*my\s+review.*$',
-            r'\s*\.\.\.*$'
-        ]
-        
-        movie_name = title
-        for pattern in patterns_to_remove:
-            movie_name = re.sub(pattern, '', movie_name, flags=re.IGNORECASE)
-        
-        movie_name = movie_name.strip()
+        return review_classifier.extract_movie_name(title)
+    
+    async def map_post(self, post: Dict) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """Map a single post to a TMDB movie, returning (mapping, failure)"""
+        if post.get('duplicate_of') in self.cluster_matches:
+            # Near duplicates reuse the representative's result
+            self.stats['duplicates'] += 1
+            match = self.cluster_matches[post['duplicate_of']]
+            if match:
+                match = {**match, 'source': 'duplicate'}
+        else:
+            year = post['published_at'].year if post.get('published_at') else None
+            match = await self.find_movie_match(post['original_title'], year)
+            if post.get('cluster_id') == post['id'] and post.get('fingerprint'):
+                self.cluster_matches[post['id']] = match
         
-        # Clean up common words
-        movie_name = re.sub(r'^(a|an|the)\s+', '', movie_name)
+        if match:
+            movie_data = match['movie']
+            post['movie_id'] = movie_data.get('tmdb_id')
+            post['tmdb_id'] = movie_data.get('tmdb_id')
+            post['tmdb_data'] = movie_data
+            post['mapping_confidence'] = match['score']
+            
+            # Fall back to the TMDB poster when the post has no featured image
+            if not post.get('featured_image') and movie_data.get('poster'):
+                post['image'] = movie_data['poster']
+            
+            mapping = {
+                'post_id': post['id'],
+                'post_title': post['original_title'],
+                'movie_title': movie_data.get('title'),
+                'tmdb_id': movie_data.get('tmdb_id'),
+                'year': movie_data.get('year'),
+                'confidence': confidence_label(match['score']),
+                'confidence_score': match['score'],
+                'source': match['source']
+            }
+            return mapping, None
         
-        return movie_name if movie_name else None
+        failure = {
+            'post_id': post['id'],
+            'post_title': post['original_title'],
+            'reason': 'No confident movie match found'
+        }
+        return None, failure
     
     async def create_movie_mappings(self):
         """Create mappings between WordPress posts and TMDB movies"""
         logger.info("Creating movie mappings with TMDB...")
         
         for post in self.posts:
-            movie_data = await self.search_movie_in_tmdb(post['original_title'])
+            mapping, failure = await self.map_post(post)
             
-            if movie_data:
-                post['movie_id'] = movie_data.get('tmdb_id')
-                post['tmdb_id'] = movie_data.get('tmdb_id')
-                post['tmdb_data'] = movie_data
-                
-                # Update post with movie data
-                post['image'] = movie_data.get('poster', post['image'])
-                
+            if mapping:
                 # Store mapping
                 self.movies_mapping[post['id']] = {
-                    'post_title': post['original_title'],
-                    'movie_title': movie_data.get('title'),
-                    'tmdb_id': movie_data.get('tmdb_id'),
-                    'year': movie_data.get('year'),
-                    'confidence': 'high'  # Simple confidence for now
+                    key: value for key, value in mapping.items() if key != 'post_id'
                 }
             else:
-                self.failed_mappings.append({
-                    'post_id': post['id'],
-                    'post_title': post['original_title'],
-                    'reason': 'No TMDB match found'
-                })
+                self.failed_mappings.append(failure)
         
         logger.info(f"Created {len(self.movies_mapping)} movie mappings")
         logger.info(f"Failed to map {len(self.failed_mappings)} posts")
     
-    async def save_to_database(self):
-        """Save migrated posts to database"""
+    async def iter_migration_records(self, xml_file_path: str) -> AsyncIterator[MigrationRecord]:
+        """Stream parsed and mapped posts from a WordPress export"""
+        for post in self.iter_wordpress_posts(xml_file_path):
+            self.duplicate_detector.assign(post)
+            mapping, failure = await self.map_post(post)
+            yield post, mapping, failure
+    
+    def iter_records_from_memory(self) -> Iterator[MigrationRecord]:
+        """Yield records for posts already parsed and mapped into memory"""
+        failures = {failure['post_id']: failure for failure in self.failed_mappings}
+        for post in self.posts:
+            mapping = self.movies_mapping.get(post['id'])
+            if mapping is not None:
+                yield post, {'post_id': post['id'], **mapping}, None
+            else:
+                yield post, None, failures.get(post['id'])
+    
+    def track_record(self, post: Dict, mapping: Optional[Dict], failure: Optional[Dict]):
+        """Update report counters for a record entering the save stage"""
+        self.stats['total_posts'] += 1
+        if mapping:
+            self.stats['mapped'] += 1
+        if failure:
+            self.stats['failed'] += 1
+            if len(self.failed_preview) < 10:
+                self.failed_preview.append(failure)
+        if post.get('rating'):
+            self.stats['posts_with_ratings'] += 1
+        if post.get('published_at'):
+            year = post['published_at'].year
+            self.stats['posts_by_year'][year] = self.stats['posts_by_year'].get(year, 0) + 1
+    
+    async def save_to_database(
+        self,
+        records: Optional[Union[Iterable[MigrationRecord], AsyncIterator[MigrationRecord]]] = None
+    ):
+        """Save migrated posts to database in chunks of unordered bulk upserts"""
+        client = None
         try:
             # MongoDB connection
             mongo_url = os.environ['MONGO_URL']
             client = AsyncIOMotorClient(mongo_url)
             db = client[os.environ['DB_NAME']]
             
-            # Save posts as draft reviews
-            if self.posts:
-                result = await db.migrated_reviews.insert_many(self.posts)
-                logger.info(f"Saved {len(result.inserted_ids)} posts to database")
+            if records is None:
+                records = self.iter_records_from_memory()
+            
+            # Each chunk holds a slot until its writes finish, so the producer
+            # (parser + TMDB mapping) waits whenever the database falls behind
+            slots = asyncio.Semaphore(self.max_in_flight)
+            pending = set()
+            failures = []
+            chunks = 0
+            started = time.monotonic()
+            
+            async def write(chunk: List[MigrationRecord]):
+                try:
+                    await self.write_chunk(db, chunk)
+                finally:
+                    slots.release()
+            
+            def finished(task: asyncio.Task):
+                pending.discard(task)
+                if not task.cancelled() and task.exception() is not None:
+                    failures.append(task.exception())
             
-            # Save mappings
-            if self.movies_mapping:
-                mapping_docs = [
-                    {'post_id': post_id, **mapping_data}
-                    for post_id, mapping_data in self.movies_mapping.items()
-                ]
-                await db.movie_mappings.insert_many(mapping_docs)
-                logger.info(f"Saved {len(mapping_docs)} movie mappings")
+            async def flush(chunk: List[MigrationRecord]):
+                nonlocal chunks
+                await slots.acquire()
+                task = asyncio.create_task(write(chunk))
+                pending.add(task)
+                task.add_done_callback(finished)
+                chunks += 1
             
-            # Save failed mappings for manual review
-            if self.failed_mappings:
-                await db.failed_mappings.insert_many(self.failed_mappings)
-                logger.info(f"Saved {len(self.failed_mappings)} failed mappings for manual review")
+            try:
+                chunk = []
+                async for post, mapping, failure in self.aiter_records(records):
+                    self.track_record(post, mapping, failure)
+                    chunk.append((post, mapping, failure))
+                    if len(chunk) >= self.chunk_size:
+                        await flush(chunk)
+                        chunk = []
+                
+                if chunk:
+                    await flush(chunk)
+            except BaseException:
+                # The parser or mapping failed; don't leave chunk writes running behind us
+                for task in pending:
+                    task.cancel()
+                raise
+            finally:
+                if pending:
+                    await asyncio.gather(*pending, return_exceptions=True)
+            
+            if failures:
+                for error in failures[:10]:
+                    logger.error(f"Chunk write failed: {error}")
+                raise RuntimeError(f"{len(failures)} of {chunks} chunk writes failed: {failures[0]}")
+            
+            # Featured images whose attachment appeared after the post
+            await self.save_late_images(db)
+            # Re-imported posts were counted by an earlier run, so recount rather than trust the increments
+            await reconcile_counters(db, ['migration'])
+            
+            self.stats['save_seconds'] += time.monotonic() - started
+            logger.info(
+                f"Saved {self.stats['saved_documents']} documents "
+                f"({self.stats['save_errors']} write errors)"
+            )
             
             return True
             
         except Exception as e:
             logger.error(f"Error saving to database: {e}")
             return False
+        finally:
+            if client is not None:
+                client.close()
+    
+    async def save_late_images(self, db):
+        """Set featured images that were resolved after their posts were saved"""
+        late = self.attachments.resolved_late
+        for start in range(0, len(late), self.chunk_size):
+            operations = [
+                UpdateOne({'id': post_id}, {'$set': {'featured_image': url, 'image': url}})
+                for post_id, url in late[start:start + self.chunk_size]
+            ]
+            await db.migrated_reviews.bulk_write(operations, ordered=False)
+        if late:
+            logger.info(f"Resolved {len(late)} featured images after their posts")
+        self.attachments.resolved_late = []
+    
+    async def aiter_records(
+        self,
+        records: Union[Iterable[MigrationRecord], AsyncIterator[MigrationRecord]]
+    ) -> AsyncIterator[MigrationRecord]:
+        """Iterate sync or async record sources uniformly"""
+        if hasattr(records, '__aiter__'):
+            async for record in records:
+                yield record
+        else:
+            for record in records:
+                yield record
+    
+    async def write_chunk(self, db, chunk: List[MigrationRecord]):
+        """Upsert one chunk of posts, mappings and failures"""
+        post_ids = [post['id'] for post, _, _ in chunk]
+        # Posts editors already published are not imported again as drafts
+        published = set(await db.editorial_reviews.distinct('id', {'id': {'$in': post_ids}}))
+        manual = set(await db.migrated_reviews.distinct('id', {'id': {'$in': post_ids}, 'manual_mapping': True}))
+        
+        posts = [post for post, _, _ in chunk if post['id'] not in published]
+        mappings = [
+            mapping for _, mapping, _ in chunk
+            if mapping and mapping['post_id'] not in published and mapping['post_id'] not in manual
+        ]
+        failures = [
+            failure for _, _, failure in chunk
+            if failure and failure['post_id'] not in published and failure['post_id'] not in manual
+        ]
+        
+        if review_body_store.enabled:
+            # Long bodies go to the compressed side collection before their posts
+            split = [review_body_store.split(post) for post in posts]
+            posts = [post for post, _ in split]
+            await review_body_store.save_bodies(db, [body for _, body in split if body])
+        
+        await self.bulk_upsert(
+            db.migrated_reviews, 'id', posts,
+            insert_only=lambda post: REVIEW_STATUS_FIELDS + (MAPPING_FIELDS if post['id'] in manual else ()),
+            # A body stored in the other place by an earlier run in another mode
+            unset=lambda post: ('content',) if post.get('content_storage') == 'compressed' else ('content_storage',)
+        )
+        await self.bulk_upsert(db.movie_mappings, 'post_id', mappings)
+        await self.bulk_upsert(db.failed_mappings, 'post_id', failures)
+    
+    async def bulk_upsert(
+        self,
+        collection,
+        key: str,
+        documents: List[Dict],
+        insert_only: Optional[Callable[[Dict], Tuple[str, ...]]] = None,
+        unset: Optional[Callable[[Dict], Tuple[str, ...]]] = None
+    ):
+        """Run an unordered bulk upsert, recording failures per document
+
+        Fields named by `insert_only` are written only when the document is new,
+        so a re-run doesn't undo what editors changed since the last one.
+        Fields named by `unset` are removed from an existing document.
+        """
+        if not documents:
+            return
+        
+        operations = []
+        for doc in documents:
+            fields = set(insert_only(doc)) if insert_only else set()
+            update = {'$set': {field: value for field, value in doc.items() if field not in fields}}
+            on_insert = {field: doc[field] for field in fields if field in doc}
+            if on_insert:
+                update['$setOnInsert'] = on_insert
+            removed = {field: '' for field in (unset(doc) if unset else ()) if field not in doc}
+            if removed:
+                update['$unset'] = removed
+            operations.append(UpdateOne({key: doc[key]}, update, upsert=True))
+        
+        try:
+            result = await collection.bulk_write(operations, ordered=False)
+            self.stats['saved_documents'] += result.upserted_count + result.matched_count
+            upserted = result.upserted_count
+        except BulkWriteError as e:
+            details = e.details
+            self.stats['saved_documents'] += details.get('nUpserted', 0) + details.get('nMatched', 0)
+            upserted = details.get('nUpserted', 0)
+            for error in details.get('writeErrors', []):
+                self.stats['save_errors'] += 1
+                if len(self.save_error_preview) < 10:
+                    self.save_error_preview.append({
+                        'collection': collection.name,
+                        key: documents[error['index']][key],
+                        'code': error.get('code'),
+                        'error': error.get('errmsg')
+                    })
+            logger.warning(
+                f"{len(details.get('writeErrors', []))} write errors in {collection.name} chunk"
+            )
+        # Live counts for the migration status page while the import runs
+        await increment(collection.database, 'migration', {collection.name: upserted})
     
     def generate_migration_report(self) -> Dict:
         """Generate migration report"""
+        total = self.stats['total_posts']
+        save_seconds = self.stats['save_seconds']
         return {
-            'total_posts_found': len(self.posts),
-            'successfully_mapped': len(self.movies_mapping),
-            'failed_mappings': len(self.failed_mappings),
-            'success_rate': len(self.movies_mapping) / len(self.posts) * 100 if self.posts else 0,
-            'posts_with_ratings': len([p for p in self.posts if p['rating']]),
-            'posts_by_year': self.group_posts_by_year(),
-            'failed_mappings_list': self.failed_mappings[:10]  # First 10 for preview
+            'total_posts_found': total,
+            'successfully_mapped': self.stats['mapped'],
+            'failed_mappings': self.stats['failed'],
+            'success_rate': self.stats['mapped'] / total * 100 if total else 0,
+            'posts_with_ratings': self.stats['posts_with_ratings'],
+            'posts_by_year': self.stats['posts_by_year'],
+            'failed_mappings_list': self.failed_preview,  # First 10 for preview
+            'saved_documents': self.stats['saved_documents'],
+            'save_errors': self.stats['save_errors'],
+            'save_errors_list': self.save_error_preview,
+            'local_matches': self.stats['local_matches'],
+            'tmdb_lookups': self.stats['tmdb_lookups'],
+            'duplicates': self.stats['duplicates'],
+            'attachments_indexed': len(self.attachments),
+            'documents_per_second': self.stats['saved_documents'] / save_seconds if save_seconds else 0,
+            'peak_memory_mb': self.peak_memory_mb()
         }
     
-    def group_posts_by_year(self) -> Dict:
-        """Group posts by publication year"""
-        year_counts = {}
-        for post in self.posts:
-            if post['published_at']:
-                year = post['published_at'].year
-                year_counts[year] = year_counts.get(year, 0) + 1
-        return year_counts
+    def peak_memory_mb(self) -> float:
+        """Peak resident memory of this process in MB"""
+        # ru_maxrss is reported in kilobytes on Linux
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
 
 # Usage function
-async def migrate_wordpress_posts(xml_file_path: str):
+async def migrate_wordpress_posts(xml_file_path: str, chunk_size: int = 500, max_in_flight: int = 4):
     """Main migration function"""
-    migrator = WordPressMigrator()
+    migrator = WordPressMigrator(chunk_size=chunk_size, max_in_flight=max_in_flight)
     
-    # Parse XML
-    posts = migrator.parse_wordpress_xml(xml_file_path)
+    # Known movies are matched locally before falling back to TMDB
+    await migrator.load_movie_index()
     
-    if not posts:
+    # Parse, map and save in one streaming pass
+    records = migrator.iter_migration_records(xml_file_path)
+    success = await migrator.save_to_database(records)
+    
+    if not migrator.stats['total_posts']:
         logger.error("No posts found to migrate")
         return None
     
-    # Create movie mappings
-    await migrator.create_movie_mappings()
-    
-    # Save to database
-    success = await migrator.save_to_database()
-    
     if success:
         # Generate report
         report = migrator.generate_migration_report()
@@ -356,24 +732,6 @@ async def migrate_wordpress_posts(xml_file_path: str):
         return None
 
 if __name__ == "__main__":
-    # Test the migration
-    import asyncio
-    
-    async def test_migration():
-        report = await migrate_wordpress_posts('/app/wordpress_export.xml')
-        if report:
-            print("\n=== MIGRATION REPORT ===")
-            print(f"Total posts found: {report['total_posts_found']}")
-            print(f"Successfully mapped: {report['successfully_mapped']}")
-            print(f"Failed mappings: {report['failed_mappings']}")
-            print(f"Success rate: {report['success_rate']:.1f}%")
-            print(f"Posts with ratings: {report['posts_with_ratings']}")
-            print(f"Posts by year: {report['posts_by_year']}")
-            
-            if report['failed_mappings_list']:
-                print("\nFailed mappings (first 10):")
-                for failed in report['failed_mappings_list']:
-                    print(f"  - {failed['post_title']} ({failed['reason']})")
-    
-    # Run the test
-    # asyncio.run(test_migration())
\ No newline at end of file
+    # Command-line runs (NDJSON shards, dry runs, worker pools) live in migration_cli
+    from migration_cli import main
+    raise SystemExit(main())
@@ -58,6 +58,37 @@ export const useMovieSearch = () => {
   return { results, loading, error, searchMovies };
 };
 
+export const useMovieSuggestions = (query, delay = 80) => {
+  const [suggestions, setSuggestions] = useState([]);
+
+  useEffect(() => {
+    if (!query.trim()) {
+      setSuggestions([]);
+      return;
+    }
+
+    // Drop responses for keystrokes the user has already typed past
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const data = await api.movies.suggest(query, 8, controller.signal);
+        setSuggestions(data);
+      } catch (err) {
+        if (!controller.signal.aborted) {
+          console.error('Error fetching movie suggestions:', err);
+        }
+      }
+    }, delay);
+
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [query, delay]);
+
+  return suggestions;
+};
+
 export const useMovieDetails = (movieId) => {
   const [movie, setMovie] = useState(null);
   const [loading, setLoading] = useState(true);
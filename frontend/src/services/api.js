@@ -51,6 +51,16 @@ export const api = {
       return response.data;
     },
     
+    // Per keystroke: served from the backend's local index, never TMDB
+    suggest: async (query, limit = 8, signal) => {
+      const response = await apiClient.get('/movies/suggest', {
+        params: { q: query, limit },
+        signal
+      });
+      return response.data;
+    },
+
+    // On submit: searches TMDB and caches the results
     search: async (query, language = 'en-US') => {
       const response = await apiClient.get('/movies/search', {
         params: { q: query, language }
@@ -86,9 +96,9 @@ export const api = {
       return response.data;
     },
     
-    unsubscribe: async (email) => {
+    unsubscribe: async (email, token) => {
       const response = await apiClient.post('/subscriptions/unsubscribe', null, {
-        params: { email }
+        params: { email, token }
       });
       return response.data;
     },
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# Backend modules import each other by top-level name, as they do when the API runs from backend/
+BACKEND = Path(__file__).resolve().parent.parent / 'backend'
+sys.path.insert(0, str(BACKEND))
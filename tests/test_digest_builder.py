@@ -0,0 +1,60 @@
+"""Digest segments pick reviews by the industry of their cached movie"""
+import asyncio
+
+import pytest
+
+mongomock_motor = pytest.importorskip('mongomock_motor')
+
+from services.digest_builder import DigestBuilder
+
+def review(review_id, movie_id, tags):
+    return {
+        'id': review_id, 'movie_id': movie_id, 'title': f"Review {review_id}", 'author': 'Critic',
+        'excerpt': 'A film worth watching', 'rating': 4.0, 'tags': tags, 'status': 'published',
+        'image': 'https://example.com/poster.jpg'
+    }
+
+def build(reviews, movies, subscribers):
+    db = mongomock_motor.AsyncMongoMockClient()['digest_test']
+
+    async def run():
+        if movies:
+            await db.movies.insert_many(movies)
+        await db.editorial_reviews.insert_many(reviews)
+        await db.subscriptions.insert_many(subscribers)
+        builder = DigestBuilder(db, max_reviews=10, min_reviews=1)
+        return builder, await builder.build([r['id'] for r in reviews], {'is_active': True})
+
+    return asyncio.run(run())
+
+def test_movie_industry_decides_the_segment_over_tags():
+    reviews = [
+        # Tagged Hollywood, but the movie it reviews is a Bollywood film
+        review('r1', 1001, ['Hollywood']),
+        # Published reviews carry the TMDB id as a string
+        review('r2', '2002', ['Bollywood']),
+        review('r3', None, ['Tamil'])
+    ]
+    movies = [
+        {'tmdb_id': 1001, 'title': 'Dangal', 'industry': 'Bollywood', 'language': 'hi'},
+        {'tmdb_id': 2002, 'title': 'Vikram', 'industry': 'South Indian', 'language': 'ta'}
+    ]
+    subscribers = [
+        {'email': 'bolly@example.com', 'is_active': True, 'preferences': {'industries': ['Bollywood']}},
+        {'email': 'south@example.com', 'is_active': True, 'preferences': {'industries': ['South Indian']}}
+    ]
+    _, content = build(reviews, movies, subscribers)
+
+    segments = content['segments']
+    assert segments['Bollywood|en']['review_ids'] == ['r1']
+    assert segments['South Indian|en']['review_ids'] == ['r2', 'r3']
+
+def test_movie_found_by_cached_document_id():
+    db = mongomock_motor.AsyncMongoMockClient()['digest_ids']
+
+    async def run():
+        inserted = await db.movies.insert_one({'tmdb_id': 7, 'title': 'RRR', 'industry': 'South Indian'})
+        await db.editorial_reviews.insert_one(review('r1', str(inserted.inserted_id), []))
+        return await DigestBuilder(db).load_reviews(['r1'])
+
+    assert asyncio.run(run())[0]['industry'] == 'South Indian'
@@ -0,0 +1,37 @@
+"""Per-recipient substitutions must not let a signup name inject HTML"""
+import pytest
+
+from services.email_service import NAME_TAG, NAME_TEXT_TAG, email_service
+
+@pytest.fixture(autouse=True)
+def unsubscribe_secret(monkeypatch):
+    monkeypatch.setattr(email_service, 'unsubscribe_secret', 'test-secret')
+
+HOSTILE_NAME = '<img src=x onerror=alert(1)>'
+
+def substitutions(content):
+    message = email_service.build_batch_message(
+        [{'email': 'reader@example.com', 'name': HOSTILE_NAME}], content['subject'], content['html'], content['text']
+    )
+    return message.get()['personalizations'][0]['substitutions']
+
+def test_welcome_batch_escapes_name_in_html_only():
+    content = email_service.render_welcome_batch(True)
+    assert NAME_TAG in content['html'] and NAME_TEXT_TAG not in content['html']
+    assert NAME_TEXT_TAG in content['text']
+
+    values = substitutions(content)
+    assert values[NAME_TAG] == '&lt;img src=x onerror=alert(1)&gt;'
+    assert values[NAME_TEXT_TAG] == HOSTILE_NAME
+
+def test_missing_name_falls_back_to_greeting():
+    message = email_service.build_batch_message([{'email': 'reader@example.com'}], 'Subject', '<p>Hi -name-</p>')
+    assert message.get()['personalizations'][0]['substitutions'][NAME_TAG] == 'there'
+
+def test_digest_escapes_name_in_html_only():
+    review = {'id': 'r1', 'title': 'Dangal', 'excerpt': 'A sports drama', 'rating': 4.5, 'tags': ['Bollywood'],
+              'author': 'Critic', 'image': 'https://example.com/poster.jpg'}
+    content = email_service.render_weekly_digest([review])
+    assert NAME_TAG in content['html'] and NAME_TEXT_TAG not in content['html']
+    assert NAME_TEXT_TAG in content['text']
+    assert substitutions(content)[NAME_TAG] == '&lt;img src=x onerror=alert(1)&gt;'
@@ -0,0 +1,32 @@
+"""Ranking TMDB search results against a post's movie name"""
+import pytest
+
+from movie_matcher import MovieTitleIndex
+
+def test_results_sharing_no_word_with_the_name_are_still_ranked():
+    ranked = MovieTitleIndex().rank('kgf', [{'tmdb_id': 1, 'title': 'K.G.F: Chapter 1', 'year': 2018}])
+
+    assert [candidate['movie']['tmdb_id'] for candidate in ranked] == [1]
+    assert ranked[0]['score'] == 1.0
+
+@pytest.mark.parametrize("year,first", [(2015, 'Bahubali: The Beginning'), (2017, 'Baahubali 2: The Conclusion')])
+def test_every_result_is_scored_with_the_year_boost(year, first):
+    movies = [
+        {'tmdb_id': 350312, 'title': 'Baahubali 2: The Conclusion', 'year': 2017},
+        {'tmdb_id': 256040, 'title': 'Bahubali: The Beginning', 'year': 2015},
+        {'tmdb_id': 73567, 'title': 'Kahaani', 'year': 2012}
+    ]
+
+    ranked = MovieTitleIndex().rank('baahubali', movies, year)
+
+    assert len(ranked) == len(movies)
+    assert ranked[0]['movie']['title'] == first
+    assert ranked[-1]['movie']['title'] == 'Kahaani'
+    assert [candidate['score'] for candidate in ranked] == sorted((c['score'] for c in ranked), reverse=True)
+
+def test_local_search_is_unchanged_by_main_titles():
+    index = MovieTitleIndex()
+    index.add({'tmdb_id': 1, 'title': 'K.G.F: Chapter 1', 'year': 2018})
+
+    assert index.search('kgf') == []
+    assert index.search('kgf chapter 1')[0]['movie']['tmdb_id'] == 1
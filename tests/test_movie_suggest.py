@@ -0,0 +1,46 @@
+"""Movies cached while the suggest index's first build runs"""
+import asyncio
+from datetime import datetime
+
+import pytest
+
+mongomock_motor = pytest.importorskip('mongomock_motor')
+
+from services.movie_suggest import MovieSuggestIndex
+
+def movie(tmdb_id, title, **fields):
+    return {
+        '_id': f"movie-{tmdb_id}", 'tmdb_id': tmdb_id, 'title': title, 'year': 2000,
+        'popularity': 10.0, 'updated_at': datetime(2024, 1, 1), **fields
+    }
+
+@pytest.mark.parametrize("batch", [3, 250])
+def test_movies_added_during_the_first_build_are_indexed(monkeypatch, batch):
+    index = MovieSuggestIndex()
+    catalogue = [movie(i, f"Catalogue Movie {i}") for i in range(500)]
+    cached = [movie(10000 + i, f"Freshly Cached {i}") for i in range(batch)]
+    to_thread = asyncio.to_thread
+
+    async def build_with_requests_arriving(function, *args):
+        # Requests on the event loop cache movies while the build thread runs
+        index.add(movie(20000, 'Stree'))
+        index.add_many(cached)
+        # The catalogue renamed in the meantime; the newer title wins
+        index.add(movie(0, 'Renamed While Building'))
+        assert len(index) == 0
+        return await to_thread(function, *args)
+
+    monkeypatch.setattr(asyncio, 'to_thread', build_with_requests_arriving)
+
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()['suggest_test']
+        await db.movies.insert_many(catalogue)
+        return await index.sync(db)
+
+    assert asyncio.run(run()) == len(catalogue)
+    assert index.built and not index.building and index.queued == []
+    assert len(index) == len(catalogue) + batch + 1
+    assert [row['tmdb_id'] for row in index.suggest('stree')] == [20000]
+    assert index.suggest('freshly cached 1')[0]['title'].startswith('Freshly Cached 1')
+    assert [row['title'] for row in index.suggest('renamed while')] == ['Renamed While Building']
+    assert index.suggest('catalogue movie 0') == []
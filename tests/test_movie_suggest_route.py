@@ -0,0 +1,37 @@
+"""The typeahead endpoint reuses one database connection across keystrokes"""
+import os
+
+import pytest
+
+mongomock_motor = pytest.importorskip('mongomock_motor')
+
+os.environ.setdefault('MONGO_URL', 'mongodb://movie-suggest-route-test')
+os.environ.setdefault('DB_NAME', 'movie_suggest_route_test')
+
+from datetime import datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routes.movies as movie_routes
+from services.movie_suggest import MovieSuggestIndex
+
+def test_keystrokes_share_the_module_connection(monkeypatch):
+    db = mongomock_motor.AsyncMongoMockClient()['movie_suggest_route_test']
+    clients = []
+    monkeypatch.setattr(movie_routes, 'db', db)
+    monkeypatch.setattr(movie_routes, 'AsyncIOMotorClient', lambda url: clients.append(url))
+    monkeypatch.setattr(movie_routes, 'movie_suggest', MovieSuggestIndex())
+
+    app = FastAPI()
+    app.include_router(movie_routes.router, prefix='/api')
+    with TestClient(app) as client:
+        client.portal.call(db.movies.insert_one, {
+            'tmdb_id': 19404, 'title': 'Dilwale Dulhania Le Jayenge', 'year': 1995, 'updated_at': datetime(2024, 1, 1)
+        })
+        for prefix in ('d', 'di', 'dil', 'dilw'):
+            response = client.get('/api/movies/suggest', params={'q': prefix})
+            assert response.status_code == 200
+            assert [movie['tmdb_id'] for movie in response.json()] == [19404]
+
+    assert clients == []
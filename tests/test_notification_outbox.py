@@ -0,0 +1,45 @@
+"""WhatsApp outcomes are recorded against the message they belong to"""
+import asyncio
+
+import pytest
+
+mongomock_motor = pytest.importorskip('mongomock_motor')
+
+from services.notification_outbox import NotificationOutbox
+from services.whatsapp_service import whatsapp_service
+
+def test_a_message_without_a_number_does_not_shift_later_outcomes(monkeypatch):
+    messages = [
+        {'to': '+911111111111', 'name': 'Asha', 'job_id': 'job-1'},
+        {'to': None, 'name': 'No Number', 'job_id': 'job-1'},
+        {'to': '+912222222222', 'name': None, 'job_id': 'job-1'},
+        {'to': '+913333333333', 'name': 'Ravi', 'job_id': 'job-1'}
+    ]
+    sent = []
+
+    async def deliver(pairs):
+        sent.extend(pairs)
+        # The second number is rejected by Twilio, the others go through
+        return [
+            {'to': to, 'status': 'failed' if to == '+912222222222' else 'sent', 'sid': f"SM-{to}",
+             'http_status': 400 if to == '+912222222222' else 201, 'error': None}
+            for to, _ in pairs
+        ]
+
+    async def message_content(message, channel):
+        return 'Hi {name}, a new review is up'
+
+    outbox = NotificationOutbox(mongomock_motor.AsyncMongoMockClient()['outbox_test'])
+    monkeypatch.setattr(outbox, 'message_content', message_content)
+    monkeypatch.setattr(whatsapp_service, 'deliver', deliver)
+
+    results = asyncio.run(outbox.send_whatsapp_batch(messages))
+
+    assert sent == [
+        ('+911111111111', 'Hi Asha, a new review is up'),
+        ('+912222222222', 'Hi there, a new review is up'),
+        ('+913333333333', 'Hi Ravi, a new review is up')
+    ]
+    assert [result['status'] for result in results] == ['sent', 'failed', 'failed', 'sent']
+    assert [result.get('provider_id') for result in results] == ['SM-+911111111111', None, 'SM-+912222222222', 'SM-+913333333333']
+    assert results[1]['permanent'] and results[2]['permanent']
@@ -0,0 +1,34 @@
+"""Route classes decide which concurrency pool a request waits in"""
+import pytest
+
+from services.rate_limiter import route_class
+
+@pytest.mark.parametrize("path", [
+    '/api/subscriptions/import',
+    '/api/subscriptions/send-weekly-digest',
+    '/api/subscriptions/notify-new-review/review-1',
+    '/api/migration/start-wordpress-migration',
+    '/api/migration/bulk-approve',
+    '/api/migration/clear-migration-data'
+])
+def test_heavy_admin_writes_share_the_admin_pool(path):
+    assert route_class(path) == 'admin'
+
+@pytest.mark.parametrize("path", [
+    # Dashboards poll these; they must not queue behind imports and sends
+    '/api/subscriptions/stats',
+    '/api/subscriptions/welcome-stats',
+    '/api/subscriptions/schedules',
+    '/api/subscriptions/campaigns/2024-W01',
+    '/api/subscriptions/notification-jobs/job-1',
+    '/api/subscriptions/unsubscribe',
+    '/api/migration/status',
+    '/api/migration/preview-posts',
+    '/api/reviews/latest'
+])
+def test_reads_use_the_default_pool(path):
+    assert route_class(path) == 'public'
+
+def test_signups_have_their_own_pool():
+    assert route_class('/api/subscriptions/subscribe') == 'signup'
+    assert route_class('/api/subscriptions/quick-subscribe') == 'signup'
@@ -0,0 +1,109 @@
+"""A migrated post, once approved, can be read back through the review detail API"""
+import asyncio
+import os
+
+import pytest
+
+mongomock_motor = pytest.importorskip('mongomock_motor')
+
+os.environ.setdefault('MONGO_URL', 'mongodb://review-approval-test')
+os.environ.setdefault('DB_NAME', 'review_approval_test')
+
+from datetime import datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routes.migration as migration_routes
+import routes.reviews as review_routes
+from services.review_cache import review_cache
+from services.review_search import ReviewSearchIndex
+
+def migrated_post(post_id, **fields):
+    return {
+        'id': post_id,
+        'original_title': 'Dangal Movie Review',
+        'title': 'Dangal Movie Review',
+        'content': 'A sports drama that lands every punch.',
+        'author': 'Priya Sharma',
+        'published_at': datetime(2017, 1, 2),
+        'status': 'draft',
+        'migrated_at': datetime(2024, 1, 1),
+        'excerpt': 'A sports drama that lands every punch.',
+        'read_time': '1 min read',
+        'tags': ['Bollywood'],
+        'image': 'https://example.com/dangal.jpg',
+        **fields
+    }
+
+@pytest.fixture
+def api(monkeypatch):
+    client = mongomock_motor.AsyncMongoMockClient()
+    db = client[os.environ['DB_NAME']]
+    monkeypatch.setattr(review_routes, 'db', db)
+    monkeypatch.setattr(migration_routes, 'AsyncIOMotorClient', lambda url: client)
+    review_cache.clear()
+    monkeypatch.setattr(migration_routes, 'review_search', ReviewSearchIndex())
+    monkeypatch.setattr(review_routes, 'review_search', ReviewSearchIndex())
+
+    app = FastAPI()
+    app.include_router(migration_routes.router, prefix='/api')
+    app.include_router(review_routes.router, prefix='/api')
+    with TestClient(app) as test_client:
+        yield test_client, db
+
+@pytest.mark.parametrize("fields,movie_id,rating", [
+    # Mapped by the migration: TMDB id stored as an int, no rating found in the post
+    ({'movie_id': 350312, 'tmdb_id': 350312, 'rating': None}, '350312', 4.0),
+    # Never mapped to a movie
+    ({'movie_id': None, 'tmdb_id': None, 'rating': 3.5}, None, 3.5)
+])
+def test_approved_migrated_review_can_be_fetched(api, fields, movie_id, rating):
+    client, db = api
+    client.portal.call(db.migrated_reviews.insert_one, migrated_post('wp-1', **fields))
+
+    response = client.post('/api/migration/approve-review', json={'review_id': 'wp-1', 'approved': True})
+    assert response.status_code == 200
+
+    response = client.get('/api/reviews/wp-1')
+    assert response.status_code == 200
+    review = response.json()
+    assert review['movie_id'] == movie_id
+    assert review['rating'] == rating
+
+    response = client.patch('/api/reviews/wp-1', json={'featured': True})
+    assert response.status_code == 200
+    assert response.json()['featured'] is True
+
+def test_dashboard_approval_with_numeric_movie_id(api):
+    client, db = api
+    client.portal.call(db.migrated_reviews.insert_one, migrated_post('wp-2', movie_id=None, rating=4.5))
+
+    response = client.post(
+        '/api/migration/approve-review', json={'review_id': 'wp-2', 'approved': True, 'movie_id': 19404}
+    )
+    assert response.status_code == 200
+    assert client.get('/api/reviews/wp-2').json()['movie_id'] == '19404'
+
+@pytest.mark.parametrize("built", [False, True])
+def test_publishing_does_not_wait_for_the_search_index(api, monkeypatch, built):
+    client, db = api
+    client.portal.call(db.migrated_reviews.insert_one, migrated_post('wp-3', movie_id=None, rating=4.0))
+
+    async def stalled_sync(db):
+        await asyncio.sleep(3600)  # a first build over a large collection
+
+    async def start_first_build():
+        return asyncio.ensure_future(stalled_sync(db))
+
+    index = migration_routes.review_search
+    index.built = built
+    monkeypatch.setattr(index, 'catch_up', stalled_sync)
+    first_build = None if built else client.portal.call(start_first_build)
+    index.syncing = first_build
+
+    response = client.post('/api/migration/approve-review', json={'review_id': 'wp-3', 'approved': True})
+    assert response.status_code == 200
+    # A sync was scheduled in the background only when none was running
+    assert index.syncing is not None and not index.syncing.done()
+    assert (index.syncing is first_build) is not built
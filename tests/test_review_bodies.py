@@ -0,0 +1,82 @@
+"""Review bodies are only read for the full review, and live in one place at a time"""
+import asyncio
+import os
+from datetime import datetime
+
+import pytest
+
+mongomock_motor = pytest.importorskip('mongomock_motor')
+
+os.environ.setdefault('MONGO_URL', 'mongodb://review-bodies-test')
+os.environ.setdefault('DB_NAME', 'review_bodies_test')
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routes.reviews as review_routes
+from review_storage import BODY_COLLECTION, review_body_store
+from services.review_cache import review_cache
+from wordpress_migration import WordPressMigrator
+
+BODY = "Shah Rukh Khan carries the film. " * 40
+
+def post(post_id):
+    return {
+        'id': post_id, 'original_title': 'Jawan Review', 'title': 'Jawan Review', 'content': BODY,
+        'author': 'Priya Sharma', 'excerpt': BODY[:100], 'tags': ['Bollywood'], 'read_time': '2 min read',
+        'image': 'https://example.com/jawan.jpg', 'rating': 4.5, 'status': 'draft',
+        'published_at': datetime(2023, 9, 7), 'migrated_at': datetime(2024, 1, 1)
+    }
+
+@pytest.fixture
+def db():
+    return mongomock_motor.AsyncMongoMockClient()['review_bodies_test']
+
+def test_reimporting_in_the_other_mode_leaves_one_copy_of_the_body(db, monkeypatch):
+    async def stored():
+        return await db.migrated_reviews.find_one({'id': 'wp-1'}, {'_id': 0})
+
+    async def run():
+        migrator = WordPressMigrator()
+        monkeypatch.setattr(review_body_store, 'mode', 'inline')
+        await migrator.write_chunk(db, [(post('wp-1'), None, None)])
+        inline = await stored()
+
+        monkeypatch.setattr(review_body_store, 'mode', 'compressed')
+        await migrator.write_chunk(db, [(post('wp-1'), None, None)])
+        compressed = await stored()
+
+        monkeypatch.setattr(review_body_store, 'mode', 'inline')
+        await migrator.write_chunk(db, [(post('wp-1'), None, None)])
+        return inline, compressed, await stored()
+
+    inline, compressed, inline_again = asyncio.run(run())
+
+    assert inline['content'] == BODY and 'content_storage' not in inline
+    assert 'content' not in compressed and compressed['content_storage'] == 'compressed'
+    assert inline_again['content'] == BODY and 'content_storage' not in inline_again
+
+def test_only_the_full_review_reads_its_body(db, monkeypatch):
+    review, body = review_body_store.split(
+        {**post('r-1'), 'status': 'published', 'featured': False, 'created_at': datetime(2024, 1, 1)}, force=True
+    )
+    asyncio.run(db.editorial_reviews.insert_one(review))
+    asyncio.run(db[BODY_COLLECTION].insert_one(body))
+
+    decompressed = []
+    decompress = review_body_store.decompress
+    monkeypatch.setattr(review_body_store, 'decompress', lambda *args: decompressed.append(args) or decompress(*args))
+    monkeypatch.setattr(review_routes, 'db', db)
+    review_cache.clear()
+
+    app = FastAPI()
+    app.include_router(review_routes.router, prefix='/api')
+    client = TestClient(app)
+
+    latest = client.get('/api/reviews/latest').json()
+    assert [item['id'] for item in latest] == ['r-1']
+    assert 'content' not in latest[0]
+    assert decompressed == []
+
+    assert client.get('/api/reviews/r-1').json()['content'] == BODY
+    assert len(decompressed) == 1
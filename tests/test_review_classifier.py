@@ -0,0 +1,42 @@
+"""The precompiled classifier must agree with the original per-call heuristics"""
+import pytest
+
+from benchmarks.classifier_benchmark import DEFAULT_EXPORT, legacy_classify, load_posts
+from review_classifier import ReviewClassifier, review_classifier
+
+POSTS = [
+    ("Dangal Movie Review", "Aamir Khan's film is a sports drama with a gripping story. Rating: 4.5"),
+    ("Review: Sholay", "The classic Bollywood action film. 5 out of 5"),
+    ("The Lunchbox - my review of the film", "A quiet drama; the cast is superb. 4/5 from me"),
+    ("Pathaan review...", "Action thriller, box office record. 3.5 stars"),
+    ("An Evening in Paris", "Travel diary from last summer. No movie talk here."),
+    ("Kal Ho Naa Ho", "The actor and actress share a story worth telling, 9/5 is not a rating"),
+    ("Top 10 songs", "playlist 2024 with 10 tracks"),
+    ("", ""),
+    ("Review:", "review review review"),
+    ("İstanbul Hatırası REVIEW", "A FILM with a PLOT and a DIRECTOR. Rating 3"),
+    ("Gully Boy", "rating:4 / and 2 stars later, 1/5 elsewhere"),
+    ("Andhadhun...", "Thriller, Comedy, Drama: 4.0 out of 5"),
+]
+
+@pytest.mark.parametrize("title,content", POSTS)
+def test_classify_matches_original_heuristics(title, content):
+    assert review_classifier.classify(title, content) == legacy_classify(title, content)
+
+@pytest.mark.parametrize("title,content", POSTS)
+def test_single_heuristics_match_classify(title, content):
+    result = review_classifier.classify(title, content)
+    assert review_classifier.is_movie_review(title, content) == result['is_movie_review']
+    assert review_classifier.extract_rating(content) == result['rating']
+    assert review_classifier.extract_movie_name(title) == result['movie_name']
+
+@pytest.mark.skipif(not DEFAULT_EXPORT.exists(), reason="sample WordPress export not present")
+def test_batch_matches_original_heuristics_on_export():
+    posts = load_posts(str(DEFAULT_EXPORT))
+    assert posts
+    assert review_classifier.classify_batch(posts) == [legacy_classify(title, content) for title, content in posts]
+
+def test_keyword_threshold_is_configurable():
+    classifier = ReviewClassifier(min_keywords=1)
+    assert classifier.is_movie_review("A film", "")
+    assert not review_classifier.is_movie_review("A film", "")
@@ -0,0 +1,33 @@
+"""Every router the API serves is mounted on the app"""
+import os
+
+import pytest
+
+os.environ.setdefault('MONGO_URL', 'mongodb://server-routes-test')
+os.environ.setdefault('DB_NAME', 'server_routes_test')
+
+from starlette.routing import Match
+
+import server
+from services.rate_limiter import HEAVY_ADMIN_PATHS, HEAVY_ADMIN_PREFIXES
+
+def resolves(method, path):
+    scope = {'type': 'http', 'method': method, 'path': path}
+    return any(route.matches(scope)[0] == Match.FULL for route in server.app.routes)
+
+@pytest.mark.parametrize("method,path", [
+    ('POST', '/api/migration/bulk-approve'),
+    ('GET', '/api/migration/duplicate-clusters'),
+    ('GET', '/api/migration/preview-posts'),
+    ('POST', '/api/migration/approve-review'),
+    ('GET', '/api/movies/suggest'),
+    ('GET', '/api/reviews/latest')
+])
+def test_route_resolves(method, path):
+    assert resolves(method, path)
+
+def test_heavy_admin_paths_are_served():
+    paths = {route.path for route in server.app.routes}
+    assert set(HEAVY_ADMIN_PATHS) <= paths
+    for prefix in HEAVY_ADMIN_PREFIXES:
+        assert any(path.startswith(prefix) for path in paths)
@@ -0,0 +1,151 @@
+"""Concurrent subscribe/unsubscribe against the unique active-email index"""
+import asyncio
+import os
+import random
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+mongomock_motor = pytest.importorskip('mongomock_motor')
+
+import routes.subscriptions as subscription_routes
+from services.stats import reconcile_counters
+from services.subscription_store import ensure_subscription_indexes, subscribe
+
+FIELDS = {'name': 'Double Click', 'email_notifications': True, 'whatsapp_notifications': False}
+
+class RacingSubscriptions:
+    """The subscriptions collection with a real server's upsert race window
+
+    An upsert that finds no active row yields to the other requests before
+    inserting, so two of them can both miss each other and only the unique
+    index decides the winner, as happens between concurrent requests on
+    MongoDB. Everything else is passed straight through.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    async def find_one_and_update(self, filter, update, upsert=False, **kwargs):
+        await asyncio.sleep(0)
+        if not upsert or await self.collection.find_one(filter) is not None:
+            return await self.collection.find_one_and_update(filter, update, upsert=upsert, **kwargs)
+        await asyncio.sleep(0)
+        document = dict(update['$setOnInsert'])
+        await self.collection.insert_one(document)  # DuplicateKeyError when another request won
+        return document
+
+    async def find_one(self, *args, **kwargs):
+        await asyncio.sleep(0)
+        return await self.collection.find_one(*args, **kwargs)
+
+class RacingDatabase:
+    def __init__(self, db):
+        self.db = db
+        self.subscriptions = RacingSubscriptions(db.subscriptions)
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+    def __getitem__(self, name):
+        return self.subscriptions if name == 'subscriptions' else self.db[name]
+
+@pytest.fixture
+def db(monkeypatch):
+    mock = mongomock_motor.AsyncMongoMockClient()['subscription_test']
+    racing = RacingDatabase(mock)
+    # The unsubscribe route opens its own client from the environment
+    monkeypatch.setenv('MONGO_URL', 'mongodb://subscription-test')
+    monkeypatch.setenv('DB_NAME', 'subscription_test')
+    monkeypatch.setattr(subscription_routes, 'AsyncIOMotorClient', lambda url: {'subscription_test': racing})
+    asyncio.run(ensure_subscription_indexes(mock))
+    return racing
+
+def test_race_window_reaches_the_unique_index(db):
+    async def run():
+        await db.db.subscriptions.insert_one({'email': 'taken@example.com', 'is_active': True})
+        with pytest.raises(DuplicateKeyError):
+            await db.subscriptions.find_one_and_update(
+                {'email': 'taken@example.com', 'is_active': True, 'name': 'not the same row'},
+                {'$setOnInsert': {'email': 'taken@example.com', 'is_active': True}},
+                upsert=True
+            )
+
+    asyncio.run(run())
+
+def test_double_submits_create_one_active_subscription(db):
+    emails = [f"reader{i}@example.com" for i in range(20)]
+
+    async def run():
+        results = await asyncio.gather(*(
+            subscribe(db, email, dict(FIELDS)) for email in emails for _ in range(10)
+        ))
+        return results
+
+    results = asyncio.run(run())
+
+    for email in emails:
+        outcomes = [(subscription, created) for subscription, created in results if subscription['email'] == email]
+        assert sum(created for _, created in outcomes) == 1
+        # Losers get the winner's row, not a copy of their own
+        assert len({subscription['_id'] for subscription, _ in outcomes}) == 1
+
+    async def count():
+        return await db.db.subscriptions.count_documents({'is_active': True})
+
+    assert asyncio.run(count()) == len(emails)
+
+def test_interleaved_subscribe_and_unsubscribe_keep_one_active_row(db):
+    emails = [f"flaky{i}@example.com" for i in range(10)]
+    rng = random.Random(7)
+
+    async def unsubscribe(email):
+        return await subscription_routes.unsubscribe_email(email=email, token=None)
+
+    async def run():
+        await reconcile_counters(db.db, ['subscriptions'])
+        calls = [
+            subscribe(db, email, dict(FIELDS)) if rng.random() < 0.6 else unsubscribe(email)
+            for _ in range(12) for email in emails
+        ]
+        rng.shuffle(calls)
+        await asyncio.gather(*calls)
+
+        active = {}
+        async for row in db.db.subscriptions.find({'is_active': True}):
+            active[row['email']] = active.get(row['email'], 0) + 1
+        return active, await reconcile_counters(db.db, ['subscriptions'])
+
+    active, drift = asyncio.run(run())
+
+    assert all(count == 1 for count in active.values())
+    # Every subscribe that created a row and every unsubscribe that ended one
+    # adjusted the counters exactly once
+    assert drift == {}
+
+@pytest.mark.skipif(not os.environ.get('TEST_MONGO_URL'), reason="set TEST_MONGO_URL to run against a real MongoDB")
+def test_double_submits_against_mongodb():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def run():
+        client = AsyncIOMotorClient(os.environ['TEST_MONGO_URL'], serverSelectionTimeoutMS=2000)
+        db = client['filmwalla_test_subscription_store']
+        try:
+            await db.subscriptions.drop()
+            await ensure_subscription_indexes(db)
+            emails = [f"reader{i}@example.com" for i in range(50)]
+            results = await asyncio.gather(*(
+                subscribe(db, email, dict(FIELDS)) for email in emails for _ in range(20)
+            ))
+            active = await db.subscriptions.count_documents({'is_active': True})
+            return emails, results, active
+        finally:
+            await client.drop_database('filmwalla_test_subscription_store')
+            client.close()
+
+    emails, results, active = asyncio.run(run())
+    assert active == len(emails)
+    assert sum(created for _, created in results) == len(emails)
@@ -0,0 +1,42 @@
+"""Unsubscribe links are signed with a secret of their own"""
+import asyncio
+import hashlib
+import hmac
+
+import pytest
+
+mongomock_motor = pytest.importorskip('mongomock_motor')
+
+from services.email_service import EmailService
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.delenv('UNSUBSCRIBE_SECRET', raising=False)
+    monkeypatch.delenv('SENDGRID_API_KEY', raising=False)
+    return EmailService()
+
+def test_provider_key_is_never_the_secret(service, monkeypatch):
+    assert service.unsubscribe_secret is None
+    with pytest.raises(RuntimeError):
+        service.unsubscribe_url('reader@example.com')
+    # Before a secret is loaded no token is accepted, least of all one signed with the placeholder key
+    forged = hmac.new(service.api_key.encode(), b'reader@example.com', hashlib.sha256).hexdigest()
+    assert not service.verify_unsubscribe_token('reader@example.com', forged)
+
+    monkeypatch.setenv('UNSUBSCRIBE_SECRET', 'configured')
+    assert EmailService().unsubscribe_secret == 'configured'
+
+def test_generated_secret_is_shared_by_every_process(service):
+    db = mongomock_motor.AsyncMongoMockClient()['unsubscribe_test']
+    other = EmailService()
+
+    async def load():
+        await asyncio.gather(service.load_unsubscribe_secret(db), other.load_unsubscribe_secret(db))
+
+    asyncio.run(load())
+
+    assert service.unsubscribe_secret and service.unsubscribe_secret == other.unsubscribe_secret
+    assert service.unsubscribe_secret != service.api_key
+    token = service.unsubscribe_token('Reader@example.com ')
+    assert other.verify_unsubscribe_token('reader@example.com', token)
+    assert not other.verify_unsubscribe_token('someone.else@example.com', token)